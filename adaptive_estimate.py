@@ -0,0 +1,167 @@
+""" adaptive estimation of the probability that one player beats another by simulation. Matches are simulated in
+    batches and a Wilson confidence interval is updated after every batch. The run stops as soon as the interval is
+    no wider than +- half_width, and the size of the next batch is planned from the current estimate. Lopsided
+    pairings (p near 0 or 1) need far fewer matches than close ones for the same precision.
+
+        estimate = estimate_win_probability(player1, player2, half_width = 0.01, seed = 1)
+        estimate.probability, estimate.low, estimate.high, estimate.matches
+
+    engine "match" plays every match with ScoringCore, i.e. exactly what Match.simulate_match does without output,
+    and match i uses stream (i,) like simulate_matches_parallel. engine "batch" uses BatchMatch (needs numpy)
+
+    The interval is checked after every batch, which makes it a little optimistic. min_matches keeps the first check
+    from stopping on a lucky start"""
+
+import sys
+import math
+import argparse
+from statistics import NormalDist
+
+from random_streams import RandomStreams, play_match_range
+
+
+ENGINES = ("match", "batch")
+
+
+def wilson_interval(wins, matches, confidence = 0.95):
+    # Wilson score interval (low, high) for wins out of matches
+    if matches == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = wins / matches
+    denominator = 1 + z * z / matches
+    center = (p + z * z / (2 * matches)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / matches + z * z / (4 * matches * matches)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+class Estimate:
+    # result of an adaptive estimation: the estimate, its confidence interval and how much was simulated
+    __slots__ = ("player1", "player2", "wins", "matches", "batches", "low", "high", "confidence", "converged")
+
+    def __init__(self, player1, player2, wins, matches, batches, confidence, converged):
+        self.player1 = player1
+        self.player2 = player2
+        self.wins = wins
+        self.matches = matches
+        self.batches = batches
+        self.low, self.high = wilson_interval(wins, matches, confidence)
+        self.confidence = confidence
+        self.converged = converged # False when max_matches was reached first
+
+    @property
+    def probability(self):
+        return self.wins / self.matches if self.matches else 0.5
+
+    def reversed(self):
+        # the same estimate seen from player2
+        return Estimate(self.player2, self.player1, self.matches - self.wins, self.matches, self.batches,
+                        self.confidence, self.converged)
+
+    def as_dict(self):
+        return {"player1": self.player1.name, "player2": self.player2.name, "probability": self.probability,
+                "low": self.low, "high": self.high, "confidence": self.confidence, "matches": self.matches,
+                "batches": self.batches, "converged": self.converged}
+
+
+def batch_simulator(player1, player2, engine, seed):
+    # function (start, stop) -> player1 wins in matches start to stop - 1
+    if engine == "match":
+        return lambda start, stop: sum(play_match_range(player1, player2, seed, start, stop))
+    if engine == "batch":
+        from batch_simulation import BatchMatch
+
+        batch_match = BatchMatch(player1, player2)
+        streams = RandomStreams(seed)
+        return lambda start, stop: int(batch_match.simulate_matches(stop - start, streams.numpy_stream(start)).player1_won.sum())
+    raise ValueError(f"Okänd simuleringsmotor: {engine}")
+
+
+def estimate_win_probability(player1, player2, half_width = 0.01, confidence = 0.95, min_matches = 200,
+                             max_matches = 1000000, engine = "match", seed = None):
+    # simulates until the confidence interval of P(player1 beats player2) is within +- half_width, returns an Estimate
+    if not half_width > 0:
+        raise ValueError("Precisionen måste vara större än 0.")
+    if not 0 < confidence < 1:
+        raise ValueError("Konfidensnivån måste vara mellan 0 och 1.")
+    if min_matches < 1:
+        raise ValueError("Minsta antal matcher måste vara minst 1.")
+    simulate = batch_simulator(player1, player2, engine, RandomStreams(seed).seed)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+
+    wins = matches = batches = 0
+    batch = min(min_matches, max_matches)
+    while True:
+        wins += simulate(matches, matches + batch)
+        matches += batch
+        batches += 1
+
+        low, high = wilson_interval(wins, matches, confidence)
+        if (high - low) / 2 <= half_width:
+            return Estimate(player1, player2, wins, matches, batches, confidence, True)
+        if matches >= max_matches:
+            return Estimate(player1, player2, wins, matches, batches, confidence, False)
+
+        # plan the next batch from the matches the normal approximation says are needed, at least 5 % more matches
+        # each time so a run doesn't creep up in tiny steps, and never past max_matches
+        p = (wins + 1) / (matches + 2)
+        needed = math.ceil(z * z * p * (1 - p) / (half_width * half_width))
+        batch = min(max(needed - matches, matches // 20, 1), max_matches - matches)
+
+
+def estimate_matrix(players, half_width = 0.01, confidence = 0.95, min_matches = 200, max_matches = 1000000,
+                    engine = "match", seed = None):
+    # matrix[i][j] is the Estimate of players[i] beating players[j] (None on the diagonal), every pairing is simulated
+    # once with its own random streams and the opposite one is the reversed estimate
+    streams = RandomStreams(seed)
+    n = len(players)
+    matrix = [[None] * n for _ in range(n)]
+    for i in range(n):
+        for j in range(i + 1, n):
+            estimate = estimate_win_probability(players[i], players[j], half_width, confidence, min_matches,
+                                                max_matches, engine, streams.spawn(i, j).seed)
+            matrix[i][j] = estimate
+            matrix[j][i] = estimate.reversed()
+    return matrix
+
+
+def main(argv = None):
+    from player_database import PlayerDatabase, find_player
+
+    parser = argparse.ArgumentParser(description = "Skatta sannolikheten att spelare 1 vinner med så få matcher som behövs.")
+    parser.add_argument("player1", help = "spelare 1 (namn eller placering)")
+    parser.add_argument("player2", help = "spelare 2 (namn eller placering)")
+    parser.add_argument("-w", "--half-width", type = float, default = 0.01, help = "önskad precision, +- (standard 0.01)")
+    parser.add_argument("-c", "--confidence", type = float, default = 0.95, help = "konfidensnivå (standard 0.95)")
+    parser.add_argument("--max-matches", type = int, default = 1000000, help = "högst så här många matcher")
+    parser.add_argument("--engine", choices = ENGINES, default = "match", help = "simuleringsmotor")
+    parser.add_argument("-s", "--seed", type = int, default = None, help = "seed för slumptalen")
+    parser.add_argument("--file", default = "playerdata.txt", help = "spelarfil")
+    arguments = parser.parse_args(argv)
+
+    database = PlayerDatabase(arguments.file)
+    database.load_players()
+    try:
+        player1 = find_player(database, arguments.player1)
+        player2 = find_player(database, arguments.player2)
+    except ValueError as error:
+        print(error, file = sys.stderr)
+        return 2
+    if player1 is player2:
+        print("En spelare kan inte spela mot sig själv.", file = sys.stderr)
+        return 2
+
+    try:
+        estimate = estimate_win_probability(player1, player2, arguments.half_width, arguments.confidence,
+                                            max_matches = arguments.max_matches, engine = arguments.engine, seed = arguments.seed)
+    except ValueError as error:
+        print(error, file = sys.stderr)
+        return 2
+    print(f"{player1.name} slår {player2.name}: {estimate.probability:.4f} "
+          f"({estimate.confidence:.0%} konfidensintervall {estimate.low:.4f} - {estimate.high:.4f})")
+    print(f"{estimate.matches} matcher i {estimate.batches} omgångar" + ("" if estimate.converged else ", precisionen nåddes inte"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
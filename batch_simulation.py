@@ -0,0 +1,167 @@
+import numpy as np
+
+from collections import Counter
+
+
+class BatchResult:
+    # class for storing the outcome of many simulated matches between the same two players
+    def __init__(self, player1, player2, player1_won, set_scores, points_played):
+        # player1_won[i] is True if player1 won match i
+        # set_scores[i, s] holds (games player1, games player2) for set s, unplayed sets are (-1, -1)
+        # points_played[i] is the number of points played in match i
+        self.player1 = player1
+        self.player2 = player2
+        self.player1_won = player1_won
+        self.set_scores = set_scores
+        self.points_played = points_played
+
+    def __len__(self):
+        return len(self.player1_won)
+
+    def winners(self):
+        # returns the winning Tennisplayer of every match
+        return [self.player1 if won else self.player2 for won in self.player1_won]
+
+    def player1_win_probability(self):
+        # share of the matches that player1 won
+        return float(self.player1_won.mean()) if len(self) else 0.0
+
+    def set_score_distribution(self):
+        # counts the final set scores seen from player1, e.g. {"2-0": 412, "2-1": 301, ...}
+        sets_p1 = (self.set_scores[:, :, 0] > self.set_scores[:, :, 1]).sum(axis = 1)
+        sets_p2 = (self.set_scores[:, :, 1] > self.set_scores[:, :, 0]).sum(axis = 1)
+        pairs, counts = np.unique(np.stack((sets_p1, sets_p2), axis = 1), axis = 0, return_counts = True)
+        return {f"{a}-{b}": int(count) for (a, b), count in zip(pairs, counts)}
+
+    def game_score_distribution(self):
+        # counts the game scores of every played set seen from player1, e.g. {"6-4": 1032, "7-6": 211, ...}
+        played = self.set_scores[:, :, 0] >= 0
+        pairs = self.set_scores[played]
+        distribution = Counter(f"{a}-{b}" for a, b in pairs.tolist())
+        return dict(distribution.most_common())
+
+
+def game_outcome_table(serve_win_prob):
+    # cumulative probabilities of how a game ends, in the order of OUTCOME_SERVER_WON (server wins 4-0, 4-1, 4-2,
+    # receiver wins 0-4, 1-4, 2-4, deuce), derived from the point by point rules of Match.simulate_game
+    p = serve_win_prob
+    q = 1 - p
+    probabilities = [p**4, 4 * p**4 * q, 10 * p**4 * q**2, q**4, 4 * q**4 * p, 10 * q**4 * p**2, 20 * p**3 * q**3]
+    return np.cumsum(probabilities)
+
+
+# if the server won and how many points were played for the outcomes in game_outcome_table, deuce is filled in later
+OUTCOME_SERVER_WON = np.array([True, True, True, False, False, False, False])
+OUTCOME_POINTS = np.array([4, 5, 6, 4, 5, 6, 6], dtype = np.int32)
+DEUCE = 6
+
+
+class BatchMatch:
+    """ class that simulates many matches between two players at once. All matches are advanced one game per
+        iteration on numpy arrays, using the same scoring rules as Match: games are won with 4 points and a
+        2 point lead (40-40 after a lost Ad), sets with 6 games and a 2 game lead, at 6-6 a single deciding
+        game is played and the match is best of 3 sets. The first server is random and serves first in every set.
+        The winner and length of every game are drawn from the exact distribution of the point by point game,
+        so the results match looping Match.simulate_match without playing every rally"""
+    def __init__(self, player1, player2):
+        # initializes batch of matches between player1 and player2
+        self.player1 = player1
+        self.player2 = player2
+
+    def simulate_games(self, rng, n_games, serve_win_prob):
+        # simulates n_games games with the same server, returns if the server won and how many points were played
+        u = rng.random(n_games)
+        outcome = np.zeros(n_games, dtype = np.int8)
+        for limit in game_outcome_table(serve_win_prob)[:-1]:
+            outcome += u >= limit
+        server_won = OUTCOME_SERVER_WON[outcome]
+        points = OUTCOME_POINTS[outcome]
+
+        # from 40-40 the game goes on in pairs of points until one player has won two in a row
+        deuce = np.flatnonzero(outcome == DEUCE)
+        if deuce.size:
+            p = serve_win_prob
+            decided = p**2 + (1 - p)**2
+            points[deuce] = 6 + 2 * rng.geometric(decided, deuce.size)
+            server_won[deuce] = rng.random(deuce.size) < p**2 / decided
+
+        return server_won, points
+
+    def simulate_sets(self, rng, n_sets, player1_serves_first):
+        # simulates n_sets sets with the same first server, returns games won by each player and points played
+        set_games_p1 = np.zeros(n_sets, dtype = np.int8)
+        set_games_p2 = np.zeros(n_sets, dtype = np.int8)
+        set_points = np.zeros(n_sets, dtype = np.int32)
+
+        # state of the unfinished sets, compacted whenever sets are over so every step works on contiguous arrays.
+        # All sets start together and the server changes every game, so every unfinished set has the same server
+        set_id = np.arange(n_sets)
+        server_p1 = player1_serves_first
+        games_p1 = np.zeros(n_sets, dtype = np.int8)
+        games_p2 = np.zeros(n_sets, dtype = np.int8)
+        points = np.zeros(n_sets, dtype = np.int32)
+
+        while set_id.size:
+            # the deciding game at 6-6 ends the set whoever wins it
+            was_deciding = (games_p1 == 6) & (games_p2 == 6)
+
+            # play one game in every unfinished set
+            server = self.player1 if server_p1 else self.player2
+            server_won, game_points = self.simulate_games(rng, set_id.size, server.serve_win_prob)
+            points += game_points
+            if server_p1:
+                games_p1 += server_won
+                games_p2 += ~server_won
+            else:
+                games_p1 += ~server_won
+                games_p2 += server_won
+
+            # change server
+            server_p1 = not server_p1
+
+            lead = games_p1 - games_p2
+            set_over = was_deciding | ((games_p1 >= 6) & (lead >= 2)) | ((games_p2 >= 6) & (lead <= -2))
+            if set_over.any():
+                ended_ids = set_id[set_over]
+                set_games_p1[ended_ids] = games_p1[set_over]
+                set_games_p2[ended_ids] = games_p2[set_over]
+                set_points[ended_ids] = points[set_over]
+
+                keep = ~set_over
+                set_id = set_id[keep]
+                games_p1 = games_p1[keep]
+                games_p2 = games_p2[keep]
+                points = points[keep]
+
+        return set_games_p1, set_games_p2, set_points
+
+    def simulate_matches(self, n_matches, seed = None):
+        # simulates n_matches matches and returns a BatchResult
+        rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+        n = int(n_matches)
+
+        set_scores = np.full((n, 3, 2), -1, dtype = np.int8)
+        sets_won_p1 = np.zeros(n, dtype = np.int8)
+        points_played = np.zeros(n, dtype = np.int32)
+
+        # randomize first server. Every set starts with the first server, so the sets of a match are independent
+        # and the first two sets of all matches with the same first server are played together
+        first_server_p1 = rng.random(n) < 0.5
+        for player1_serves_first in (True, False):
+            group = np.flatnonzero(first_server_p1 == player1_serves_first)
+            games_p1, games_p2, points = self.simulate_sets(rng, 2 * group.size, player1_serves_first)
+            for set_index, sets in enumerate((slice(None, group.size), slice(group.size, None))):
+                set_scores[group, set_index, 0] = games_p1[sets]
+                set_scores[group, set_index, 1] = games_p2[sets]
+                points_played[group] += points[sets]
+                sets_won_p1[group] += games_p1[sets] > games_p2[sets]
+
+            # a third set is only played when the sets are 1-1
+            third = group[sets_won_p1[group] == 1]
+            games_p1, games_p2, points = self.simulate_sets(rng, third.size, player1_serves_first)
+            set_scores[third, 2, 0] = games_p1
+            set_scores[third, 2, 1] = games_p2
+            points_played[third] += points
+            sets_won_p1[third] += games_p1 > games_p2
+
+        return BatchResult(self.player1, self.player2, sets_won_p1 == 2, set_scores, points_played)
@@ -0,0 +1,245 @@
+""" benchmark suite for the hot paths: Match.simulate_point/game/set/match, PlayerDatabase.load_players, update_file,
+    reload_if_changed (what main() pays per match when the file didn't change), the toplist sort and SelectionWindow
+    construction, on synthetic rosters of 50 up to 1 000 000 players, and the start time of a new Python process that
+    imports the roster core (player_database) or all of tennis3.
+    Results are written as JSON so runs from different commits can be compared:
+
+        python benchmark.py --output benchmarks/baseline.json
+        python benchmark.py --compare benchmarks/baseline.json
+
+    SelectionWindow needs a display, without DISPLAY the benchmark starts Xvfb if it is installed and is skipped otherwise"""
+
+import io
+import os
+import sys
+import time
+import json
+import shutil
+import random
+import argparse
+import platform
+import tempfile
+import contextlib
+import subprocess
+
+from tennis3 import Tennisplayer, PlayerDatabase, Match
+
+
+HEADER = ["Format:", "Namn (max 20 tkn) / sannolikhet att vinna sin serve (0-1)", "antal vunna matcher / antal spelade matcher",
+          "Stats from season 2024:", 62*"="]
+ROSTER_SIZES = [50, 1000, 10000, 100000, 1000000]
+QUICK_ROSTER_SIZES = [50, 1000, 10000]
+
+
+def synthetic_roster(n_players, seed = 0):
+    # n_players Tennisplayer objects with unique names and realistic stats
+    rng = random.Random(seed)
+    players = []
+    for i in range(n_players):
+        matches_played = rng.randint(0, 200)
+        players.append(Tennisplayer(f"{chr(65 + i % 26)} Spelare{i}", round(rng.uniform(0.55, 0.72), 2),
+                                    rng.randint(0, matches_played), matches_played))
+    return players
+
+
+def write_roster(file_path, players):
+    # writes players in the playerdata.txt format
+    lines = list(HEADER)
+    for player in players:
+        lines += [player.name, f"{player.serve_win_prob}", f"{player.matches_won}", f"{player.matches_played}"]
+    with open(file_path, "w", encoding = "utf-8") as file:
+        file.write("\n".join(lines))
+
+
+def measure(function, repeat = 3, minimum_time = 0.2):
+    # best time of repeat runs for one call of function, calls are repeated until minimum_time has passed
+    best = float("inf")
+    for _ in range(repeat):
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            function()
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= minimum_time:
+                break
+        best = min(best, elapsed / calls)
+    return best
+
+
+def simulation_benchmarks(repeat):
+    # points/games/sets/matches per second through the Match api, console output goes to devnull and delay is 0
+    player1 = Tennisplayer("J Sinner", 0.71, 0, 0)
+    player2 = Tennisplayer("A Zverev", 0.70, 0, 0)
+    match = Match(player1, player2, None, random.Random(1))
+    results = {}
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results["simulate_point"] = ("points/s", measure(lambda: match.simulate_point(player1, player2, 0), repeat))
+        results["simulate_game"] = ("games/s", measure(lambda: match.simulate_game(player1, player2, 0, None), repeat))
+        results["simulate_set"] = ("sets/s", measure(lambda: match.simulate_set(player1, player2, 0, None), repeat))
+        results["simulate_match"] = ("matches/s", measure(lambda: match.simulate_match(0, None), repeat))
+    return results
+
+
+def startup_benchmarks(repeat):
+    # time for a new Python process to start and import a module, the best of repeat * 5 starts
+    directory = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    for module in ("player_database", "tennis3"):
+        best = float("inf")
+        for _ in range(repeat * 5):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-c", f"import {module}"], cwd = directory, check = True)
+            best = min(best, time.perf_counter() - start)
+        results[f"cold_start[{module}]"] = ("starts/s", best)
+    return results
+
+
+def roster_benchmarks(sizes, repeat):
+    # load_players, update_file and the toplist sort for every roster size, run in a temporary directory
+    results = {}
+    directory = tempfile.mkdtemp()
+    file_path = os.path.join(directory, "playerdata.txt") # the journal and lock file are put next to it
+    try:
+        for size in sizes:
+            players = synthetic_roster(size)
+            write_roster(file_path, players)
+
+            def load():
+                database = PlayerDatabase(file_path)
+                database.load_players()
+                return database
+
+            database = load()
+            small_repeat = repeat if size <= 100000 else 1
+            results[f"load_players[{size}]"] = ("players/s", measure(load, small_repeat) / size)
+            results[f"update_file[{size}]"] = ("players/s", measure(database.update_file, small_repeat) / size)
+            results[f"reload_unchanged[{size}]"] = ("iterations/s", measure(database.reload_if_changed, small_repeat))
+            results[f"toplist_sort[{size}]"] = ("players/s", measure(
+                lambda: sorted(database.players, key = lambda p: p.win_rate(), reverse = True), small_repeat) / size)
+    finally:
+        shutil.rmtree(directory)
+    return results
+
+
+@contextlib.contextmanager
+def virtual_display():
+    # yields True if a display is available, starts Xvfb when DISPLAY isn't set
+    if os.environ.get("DISPLAY"):
+        yield True
+        return
+    if shutil.which("Xvfb") is None:
+        yield False
+        return
+    server = subprocess.Popen(["Xvfb", ":99", "-screen", "0", "1280x1024x24"], stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL)
+    os.environ["DISPLAY"] = ":99"
+    time.sleep(0.5)
+    try:
+        yield True
+    finally:
+        del os.environ["DISPLAY"]
+        server.terminate()
+
+
+def window_benchmarks(sizes, repeat):
+    # time to build and lay out SelectionWindow for every roster size
+    from tennis3 import SelectionWindow
+
+    results = {}
+    with virtual_display() as available:
+        if not available:
+            return results
+        for size in sizes:
+            players = synthetic_roster(size)
+
+            def build():
+                with contextlib.redirect_stdout(io.StringIO()):
+                    window = SelectionWindow(players)
+                    window.window.update_idletasks()
+                    window.window.destroy()
+
+            results[f"selection_window[{size}]"] = ("windows/s", measure(build, repeat))
+    return results
+
+
+def run(sizes, repeat):
+    # runs all benchmarks, returns {name: {"unit": ..., "seconds": ..., "rate": ...}}
+    results = {}
+    for group in (startup_benchmarks(repeat), simulation_benchmarks(repeat), roster_benchmarks(sizes, repeat),
+                  window_benchmarks(sizes, repeat)):
+        for name, (unit, seconds) in group.items():
+            results[name] = {"unit": unit, "seconds": seconds, "rate": 1 / seconds}
+    return results
+
+
+def git_commit():
+    # short hash of HEAD, with "-dirty" when tracked files outside benchmarks/ are changed, so a result is never
+    # credited to a commit that doesn't contain the measured code
+    directory = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output = True, text = True,
+                                cwd = directory).stdout.strip()
+        changes = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no", "--", ".", ":!benchmarks"],
+                                 capture_output = True, text = True, cwd = directory).stdout.strip()
+    except OSError:
+        return None
+    if not commit:
+        return None
+    return commit + "-dirty" if changes else commit
+
+
+def compare(baseline, results, threshold):
+    # prints the change against baseline, returns the names that got slower than threshold (0.1 = 10 %)
+    regressions = []
+    print(f"\n{'Benchmark':32} {'Före':>14} {'Nu':>14} {'Ändring':>9}")
+    for name, result in results.items():
+        if name not in baseline["results"]:
+            print(f"{name:32} {'-':>14} {result['rate']:>14.1f}")
+            continue
+        before = baseline["results"][name]["rate"]
+        change = result["rate"] / before - 1
+        marker = ""
+        if change < -threshold:
+            regressions.append(name)
+            marker = "  LÅNGSAMMARE"
+        print(f"{name:32} {before:>14.1f} {result['rate']:>14.1f} {change:>+8.1%}{marker}")
+    return regressions
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Mät prestanda för start, simulering, inläsning, sparande och gui.")
+    parser.add_argument("--sizes", type = int, nargs = "+", help = "storlekar på spelarlistorna")
+    parser.add_argument("--quick", action = "store_true", help = f"bara listor med {QUICK_ROSTER_SIZES} spelare")
+    parser.add_argument("--repeat", type = int, default = 3, help = "antal mätningar, den bästa används")
+    parser.add_argument("--output", help = "spara resultatet som JSON")
+    parser.add_argument("--compare", help = "jämför med ett sparat resultat")
+    parser.add_argument("--threshold", type = float, default = 0.1, help = "tillåten försämring vid jämförelse (0.1 = 10 %%)")
+    arguments = parser.parse_args(argv)
+
+    sizes = arguments.sizes or (QUICK_ROSTER_SIZES if arguments.quick else ROSTER_SIZES)
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": run(sizes, arguments.repeat),
+    }
+
+    for name, result in report["results"].items():
+        print(f"{name:32} {result['rate']:>14.1f} {result['unit']}")
+
+    if arguments.output:
+        os.makedirs(os.path.dirname(os.path.abspath(arguments.output)), exist_ok = True)
+        with open(arguments.output, "w", encoding = "utf-8") as file:
+            json.dump(report, file, indent = 2)
+
+    if arguments.compare:
+        with open(arguments.compare, "r", encoding = "utf-8") as file:
+            baseline = json.load(file)
+        if compare(baseline, report["results"], arguments.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
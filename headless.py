@@ -0,0 +1,93 @@
+""" headless batch mode for scripts: simulates matches between two players without input(), sleeping, printing
+    or gui and writes the results as JSON or CSV. Example:
+
+        python headless.py "J Sinner" 4 --matches 10000 --seed 1 --format csv --output results.csv
+
+    players are given by name or by placement in the toplist"""
+
+import sys
+import csv
+import json
+import argparse
+
+from player_database import PlayerDatabase, find_player
+from batch_simulation import BatchMatch
+
+
+def summary(result, seed):
+    # summary of a BatchResult as a JSON-serializable dict
+    wins_p1 = int(result.player1_won.sum())
+    return {
+        "player1": result.player1.name,
+        "player2": result.player2.name,
+        "matches": len(result),
+        "seed": seed,
+        "player1_wins": wins_p1,
+        "player2_wins": len(result) - wins_p1,
+        "player1_win_probability": result.player1_win_probability(),
+        "set_scores": result.set_score_distribution(),
+        "game_scores": result.game_score_distribution(),
+        "mean_points": float(result.points_played.mean()) if len(result) else 0.0,
+    }
+
+
+def write_json(result, seed, file):
+    json.dump(summary(result, seed), file, indent = 2)
+    file.write("\n")
+
+
+def write_csv(result, seed, file):
+    # one row per match with the winner, the games of every set and the number of points
+    writer = csv.writer(file)
+    writer.writerow(["match", "winner", "set1", "set2", "set3", "points"])
+    for i, (won, sets, points) in enumerate(zip(result.player1_won.tolist(), result.set_scores.tolist(), result.points_played.tolist()), start = 1):
+        set_texts = [f"{games_p1}-{games_p2}" if games_p1 >= 0 else "" for games_p1, games_p2 in sets]
+        writer.writerow([i, result.player1.name if won else result.player2.name, *set_texts, points])
+
+
+WRITERS = {"json": write_json, "csv": write_csv}
+
+
+def parse_arguments(argv):
+    parser = argparse.ArgumentParser(description = "Simulera matcher utan gui, pauser eller utskrifter.")
+    parser.add_argument("player1", help = "spelare 1 (namn eller placering)")
+    parser.add_argument("player2", help = "spelare 2 (namn eller placering)")
+    parser.add_argument("-n", "--matches", type = int, default = 1000, help = "antal matcher (standard 1000)")
+    parser.add_argument("-s", "--seed", type = int, default = None, help = "seed för slumptalen")
+    parser.add_argument("-f", "--format", choices = sorted(WRITERS), default = "json", help = "utdataformat")
+    parser.add_argument("-o", "--output", default = "-", help = "utdatafil (standard stdout)")
+    parser.add_argument("--file", default = "playerdata.txt", help = "spelarfil")
+    return parser.parse_args(argv)
+
+
+def main(argv = None):
+    # runs the simulation and writes the results, returns exit code
+    arguments = parse_arguments(argv)
+    if arguments.matches < 1:
+        print("Antal matcher måste vara minst 1.", file = sys.stderr)
+        return 2
+
+    database = PlayerDatabase(arguments.file)
+    database.load_players()
+    try:
+        player1 = find_player(database, arguments.player1)
+        player2 = find_player(database, arguments.player2)
+    except ValueError as error:
+        print(error, file = sys.stderr)
+        return 2
+    if player1 is player2:
+        print("En spelare kan inte spela mot sig själv.", file = sys.stderr)
+        return 2
+
+    result = BatchMatch(player1, player2).simulate_matches(arguments.matches, arguments.seed)
+
+    if arguments.output == "-":
+        WRITERS[arguments.format](result, arguments.seed, sys.stdout)
+    else:
+        with open(arguments.output, "w", encoding = "utf-8", newline = "") as file:
+            WRITERS[arguments.format](result, arguments.seed, file)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+""" opt-in instrumentation for simulation runs: counters for points, games, sets, deuces and deciding games, timers
+    per phase (simulate, render, sleep, persist, load) and an optional sampling profiler. A timer started inside
+    another one (e.g. render or sleep during simulate_match) is subtracted from the outer phase, so every second is
+    counted in one phase only and the phases add up to the timed wall time. Everything goes through the
+    shared object INSTRUMENTS, which is disabled by default. Disabled, timer() hands out one shared no-op context and
+    no counting subscriber is attached to the scoring core, so the point loop runs exactly as without instrumentation.
+
+        INSTRUMENTS.enable(profile = True)
+        ... run simulations ...
+        INSTRUMENTS.report()
+        INSTRUMENTS.dump("instrumentation.json")
+
+    tennis3.main() enables it when the environment variable TENNIS_INSTRUMENT is set (to 1 or to a JSON file path)"""
+
+import os
+import sys
+import time
+from _thread import get_ident # threading.get_ident without importing threading
+from collections import Counter
+
+
+class NoTimer:
+    # context manager that does nothing, used while instrumentation is disabled
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NO_TIMER = NoTimer()
+
+
+class Timer:
+    # context manager that adds the elapsed time to a phase, minus the time of timers nested in it on the same thread
+    __slots__ = ("instruments", "phase", "start", "nested", "outer", "thread")
+
+    def __init__(self, instruments, phase):
+        self.instruments = instruments
+        self.phase = phase
+        self.nested = 0.0
+
+    def __enter__(self):
+        self.thread = get_ident()
+        self.outer = self.instruments.active.get(self.thread)
+        self.instruments.active[self.thread] = self
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        self.instruments.add_time(self.phase, elapsed - self.nested)
+        if self.outer is not None:
+            self.outer.nested += elapsed
+            self.instruments.active[self.thread] = self.outer
+        else:
+            del self.instruments.active[self.thread]
+        return False
+
+
+class CountingSubscriber:
+    # subscriber to ScoringCore that counts what is simulated
+    def __init__(self, counters):
+        self.counters = counters
+
+    def point_won(self, event):
+        self.counters["points"] += 1
+        if event.points_server == 3 and event.points_receiver == 3 and not event.tiebreak:
+            self.counters["deuces"] += 1
+
+    def game_won(self, event):
+        self.counters["games"] += 1
+        if event.deciding_game:
+            self.counters["deciding_games"] += 1
+        if event.tiebreak:
+            self.counters["tiebreaks"] += 1
+
+    def set_won(self, event):
+        self.counters["sets"] += 1
+
+    def match_won(self, event):
+        self.counters["matches"] += 1
+
+
+class SamplingProfiler:
+    # samples the stack of one thread at a fixed interval and counts where time is spent. On the main thread a SIGALRM
+    # timer takes the samples, since a sampling thread only gets the GIL when the sampled thread releases it (e.g. in
+    # sleep) and would miss pure Python work. Other threads, or platforms without setitimer, are sampled from a thread
+    def __init__(self, interval = 0.005, thread_id = None):
+        import threading # signal and threading are only imported when profiling, they add to every start otherwise
+
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.main_thread().ident
+        self.own_time = Counter() # innermost function of every sample
+        self.total_time = Counter() # every function on the stack of every sample
+        self.samples = 0
+        self.running = False
+        self.thread = None
+
+        self.uses_signal = False
+
+    def start(self):
+        import signal
+        import threading
+
+        self.running = True
+        if hasattr(signal, "setitimer") and self.thread_id == threading.main_thread().ident == threading.get_ident():
+            self.uses_signal = True
+            self.previous_handler = signal.signal(signal.SIGALRM, lambda signum, frame: self.add_sample(frame))
+            signal.setitimer(signal.ITIMER_REAL, self.interval, self.interval)
+        else:
+            self.thread = threading.Thread(target = self.sample, daemon = True)
+            self.thread.start()
+
+    def stop(self):
+        import signal
+
+        self.running = False
+        if self.uses_signal:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, self.previous_handler)
+            self.uses_signal = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def sample(self):
+        while self.running:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.add_sample(frame)
+            time.sleep(self.interval)
+
+    def add_sample(self, frame):
+        self.samples += 1
+        self.own_time[self.location(frame)] += 1
+        seen = set()
+        while frame is not None:
+            location = self.location(frame)
+            if location not in seen:
+                seen.add(location)
+                self.total_time[location] += 1
+            frame = frame.f_back
+
+    @staticmethod
+    def location(frame):
+        code = frame.f_code
+        return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+    def top(self, n = 10):
+        # the n functions with most own samples as (function, share of own samples, share of total samples)
+        if not self.samples:
+            return []
+        return [(location, count / self.samples, self.total_time[location] / self.samples)
+                for location, count in self.own_time.most_common(n)]
+
+
+class Instrumentation:
+    # class for collecting counters and phase timers during a run
+    def __init__(self):
+        self.enabled = False
+        self.counters = Counter()
+        self.times = Counter() # seconds per phase
+        self.calls = Counter() # timed calls per phase
+        self.active = {} # thread id: innermost running Timer
+        self.profiler = None
+        self.started = None
+
+    def enable(self, profile = False, interval = 0.005):
+        # starts collecting, profile = True also starts the sampling profiler on the calling thread
+        self.enabled = True
+        self.started = time.perf_counter()
+        if profile:
+            import threading
+
+            self.profiler = SamplingProfiler(interval, threading.get_ident())
+            self.profiler.start()
+
+    def disable(self):
+        self.enabled = False
+        if self.profiler is not None and self.profiler.running:
+            self.profiler.stop()
+
+    def reset(self):
+        self.counters.clear()
+        self.times.clear()
+        self.calls.clear()
+        self.started = time.perf_counter() if self.enabled else None
+
+    def timer(self, phase):
+        # context manager that times a phase, e.g. with INSTRUMENTS.timer("persist"): ...
+        if not self.enabled:
+            return NO_TIMER
+        return Timer(self, phase)
+
+    def add_time(self, phase, seconds):
+        self.times[phase] += seconds
+        self.calls[phase] += 1
+
+    def subscribers(self):
+        # subscribers to add to a ScoringCore, none while disabled
+        if not self.enabled:
+            return []
+        return [CountingSubscriber(self.counters)]
+
+    def summary(self):
+        # everything collected as a JSON-serializable dict
+        result = {
+            "wall_time": time.perf_counter() - self.started if self.started is not None else 0.0,
+            "counters": dict(self.counters),
+            "phases": {phase: {"seconds": self.times[phase], "calls": self.calls[phase]} for phase in sorted(self.times)},
+        }
+        if self.profiler is not None:
+            result["profile"] = {"samples": self.profiler.samples,
+                                 "top": [{"function": location, "own": own, "total": total} for location, own, total in self.profiler.top(20)]}
+        return result
+
+    def report(self, file = None):
+        # prints the summary
+        file = file or sys.stdout
+        summary = self.summary()
+        print("\n" + 50*"=" + "\nInstrumentering" + f" ({summary['wall_time']:.2f} s)\n" + 50*"=", file = file)
+        for name, count in sorted(summary["counters"].items()):
+            print(f"{name:24} {count:>12}", file = file)
+        print(50*"-", file = file)
+        for phase, phase_times in summary["phases"].items():
+            print(f"{phase:24} {phase_times['seconds']:>10.3f} s {phase_times['calls']:>10} anrop", file = file)
+        if "profile" in summary:
+            print(50*"-" + f"\nProfil ({summary['profile']['samples']} stickprov)", file = file)
+            for row in summary["profile"]["top"][:10]:
+                print(f"{row['function'][:34]:34} {row['own']:>6.1%} {row['total']:>7.1%}", file = file)
+
+    def dump(self, file_path):
+        # writes the summary as JSON
+        import json
+
+        with open(file_path, "w", encoding = "utf-8") as file:
+            json.dump(self.summary(), file, indent = 2)
+
+
+INSTRUMENTS = Instrumentation()
@@ -0,0 +1,220 @@
+import random
+
+
+PRIORITIES = random.Random(0) # own generator, so building a leaderboard doesn't move the random stream of the matches
+
+
+class Leaderboard:
+    """ class that keeps players ordered on win percentage without re-sorting after every match. Entries are kept in a
+        treap (a binary search tree balanced by random priorities) on (-win rate, tiebreak) where every node knows the
+        size of its subtree, so adding, removing or moving a player and finding the rank of a player or the player at
+        a rank all take O(log n). Players with the same win rate keep the order they were added in, like the stable
+        sort in PlayerDatabase. Supports index() and [] so it can be used in place of PlayerDatabase.sorted_players
+
+        The nodes are positions in parallel lists instead of objects, so a million players don't make a million objects
+        for the garbage collector to walk. A node number is also the tiebreak of its player, node 0 is the empty tree"""
+    def __init__(self, players = ()):
+        # players are added in the given order, which decides ties. The tree is built in O(n) from the sorted players
+        self.keys = {} # player -> its node
+        self.players = [None]
+        self.rates = [0.0] # -win rate per node
+        self.priorities = [0.0]
+        self.left = [0]
+        self.right = [0]
+        self.sizes = [0]
+        self.root = 0
+
+        spine = [] # the nodes on the right edge of the tree built so far
+        for player in sorted(players, key = lambda p: p.win_rate(), reverse = True):
+            node = self.new_node(player)
+            last = 0
+            while spine and self.priorities[spine[-1]] < self.priorities[node]:
+                last = spine.pop()
+                self.sizes[last] = 1 + self.sizes[self.left[last]] + self.sizes[self.right[last]] # its subtree is done
+            self.left[node] = last
+            if spine:
+                self.right[spine[-1]] = node
+            spine.append(node)
+        while spine:
+            last = spine.pop()
+            self.sizes[last] = 1 + self.sizes[self.left[last]] + self.sizes[self.right[last]]
+            self.root = last
+
+    def new_node(self, player):
+        node = len(self.players)
+        self.keys[player] = node
+        self.players.append(player)
+        self.rates.append(-player.win_rate())
+        self.priorities.append(PRIORITIES.random())
+        self.left.append(0)
+        self.right.append(0)
+        self.sizes.append(1)
+        return node
+
+    def before(self, node, other):
+        # True if node comes before other on the leaderboard
+        rate, other_rate = self.rates[node], self.rates[other]
+        return rate < other_rate or (rate == other_rate and node < other)
+
+    def split(self, node, key):
+        # splits a subtree into the nodes before key and the rest
+        if node == 0:
+            return 0, 0
+        if self.before(node, key):
+            self.right[node], right = self.split(self.right[node], key)
+            self.sizes[node] = 1 + self.sizes[self.left[node]] + self.sizes[self.right[node]]
+            return node, right
+        left, self.left[node] = self.split(self.left[node], key)
+        self.sizes[node] = 1 + self.sizes[self.left[node]] + self.sizes[self.right[node]]
+        return left, node
+
+    def merge(self, left, right):
+        # joins two subtrees where every node in left comes before every node in right
+        if left == 0:
+            return right
+        if right == 0:
+            return left
+        if self.priorities[left] > self.priorities[right]:
+            self.right[left] = self.merge(self.right[left], right)
+            self.sizes[left] = 1 + self.sizes[self.left[left]] + self.sizes[self.right[left]]
+            return left
+        self.left[right] = self.merge(left, self.left[right])
+        self.sizes[right] = 1 + self.sizes[self.left[right]] + self.sizes[self.right[right]]
+        return right
+
+    def insert(self, node):
+        left, right = self.split(self.root, node)
+        self.root = self.merge(self.merge(left, node), right)
+
+    def delete(self, node):
+        # takes a node out of the tree, the node keeps its number
+        parent, child = 0, self.root
+        while child != node:
+            self.sizes[child] -= 1
+            parent, child = child, (self.left[child] if self.before(node, child) else self.right[child])
+        replacement = self.merge(self.left[node], self.right[node])
+        if parent == 0:
+            self.root = replacement
+        elif self.left[parent] == node:
+            self.left[parent] = replacement
+        else:
+            self.right[parent] = replacement
+        self.left[node] = self.right[node] = 0
+        self.sizes[node] = 1
+
+    def __len__(self):
+        return self.sizes[self.root]
+
+    def __iter__(self):
+        return self.players_from(0)
+
+    def __getitem__(self, index):
+        # player at a 0-based position, slices give lists of players
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                return self.players_between(start, stop)
+            return [self.select(i) for i in range(start, stop, step)]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("leaderboard index out of range")
+        return self.select(index)
+
+    def __contains__(self, player):
+        return player in self.keys
+
+    def add(self, player):
+        # adds a player, ties with players already on the leaderboard are placed after them
+        self.insert(self.new_node(player))
+
+    def remove(self, player):
+        node = self.keys.pop(player)
+        self.delete(node)
+        self.players[node] = None
+
+    def update(self, player):
+        # moves a player after its stats have changed, keeps its tiebreak
+        node = self.keys[player]
+        self.delete(node)
+        self.rates[node] = -player.win_rate()
+        self.insert(node)
+
+    def record_result(self, winner, loser):
+        # adds the match to the stats of both players and moves only them
+        winner.matches_won += 1
+        winner.matches_played += 1
+        loser.matches_played += 1
+        self.update(winner)
+        self.update(loser)
+
+    def position(self, node):
+        # number of players before a node that is in the tree
+        position = 0
+        current = self.root
+        while current != node:
+            if self.before(current, node):
+                position += self.sizes[self.left[current]] + 1
+                current = self.right[current]
+            else:
+                current = self.left[current]
+        return position + self.sizes[self.left[node]]
+
+    def select(self, index):
+        # player at a 0-based position that is on the leaderboard
+        node = self.root
+        while True:
+            left_size = self.sizes[self.left[node]]
+            if index < left_size:
+                node = self.left[node]
+            elif index == left_size:
+                return self.players[node]
+            else:
+                index -= left_size + 1
+                node = self.right[node]
+
+    def players_from(self, start):
+        # the players from position start on, in order, without walking past the ones before it
+        stack = []
+        node = self.root
+        while node != 0: # the path to position start, keeping the nodes that come after it
+            left_size = self.sizes[self.left[node]]
+            if start <= left_size:
+                stack.append(node)
+                node = self.left[node]
+            else:
+                start -= left_size + 1
+                node = self.right[node]
+        while stack:
+            node = stack.pop()
+            yield self.players[node]
+            node = self.right[node]
+            while node != 0:
+                stack.append(node)
+                node = self.left[node]
+
+    def players_between(self, start, stop):
+        # players at positions start to stop - 1
+        players = []
+        if start < stop:
+            for player in self.players_from(start):
+                players.append(player)
+                if len(players) == stop - start:
+                    break
+        return players
+
+    def rank(self, player):
+        # placement of a player, 1 = best
+        return self.position(self.keys[player]) + 1
+
+    def index(self, player):
+        # 0-based position, same as sorted_players.index(player)
+        return self.position(self.keys[player])
+
+    def top(self, k):
+        # the k best players
+        return self.players_between(0, min(k, len(self)))
+
+    def rank_range(self, first_rank, last_rank):
+        # players placed first_rank to last_rank, both included
+        return self.players_between(max(first_rank - 1, 0), min(last_rank, len(self)))
@@ -0,0 +1,276 @@
+""" match formats as data and the transition tables they are compiled to. A MatchFormat says how many sets are
+    needed, how a set at games_per_set-all is decided, whether games have advantage, what the final set is and who
+    starts serving each set. compile_format() turns it into
+
+        game tables   one state per point score, which side serves the point and the next state when either side wins
+        set tables    one state per game score, which side serves and which game table the game is played with
+        a flat table  every point of the whole match as one state machine, so a match without events is just
+                      state = won[state] if rng() < probs[server[state]] else lost[state] until state < 0
+
+    The tables are compiled once per format and shared. CLASSIC is the format of Match: games with advantage, a
+    single deciding game at 6-6, best of 3 sets and the first server of the match serves first in every set"""
+
+
+GAME_OVER_A = -1 # terminal states of a game table: the side that served the first point (a) or the other side won
+GAME_OVER_B = -2
+
+SET_DECIDERS = ("game", "tiebreak", "advantage")
+FINAL_SETS = ("same", "game", "tiebreak", "advantage", "match_tiebreak")
+SERVE_ORDERS = ("match", "alternate")
+
+
+class MatchFormat:
+    # the rules of a match, see FORMATS for examples
+    __slots__ = ("name", "sets_to_win", "games_per_set", "no_ad", "set_decider", "tiebreak_points", "final_set",
+                 "final_tiebreak_points", "serve_order", "tables")
+
+    def __init__(self, name, sets_to_win = 2, games_per_set = 6, no_ad = False, set_decider = "game", tiebreak_points = 7,
+                 final_set = "same", final_tiebreak_points = 10, serve_order = "match"):
+        # set_decider: what happens at games_per_set-all, "game" (one deciding game), "tiebreak" or "advantage" (play on
+        # until someone leads by 2). final_set: "same" as the other sets, one of the set deciders (a "tiebreak" in the
+        # final set is played to final_tiebreak_points) or "match_tiebreak" (a tiebreak to final_tiebreak_points
+        # instead of the whole set). serve_order: "match" (every set starts with the first server of the match) or
+        # "alternate" (the serve keeps alternating over the sets)
+        if set_decider not in SET_DECIDERS:
+            raise ValueError(f"Okänt avgörande i set: {set_decider}")
+        if final_set not in FINAL_SETS:
+            raise ValueError(f"Okänt avgörande set: {final_set}")
+        if serve_order not in SERVE_ORDERS:
+            raise ValueError(f"Okänd serveordning: {serve_order}")
+        if sets_to_win < 1 or games_per_set < 1 or tiebreak_points < 1 or final_tiebreak_points < 1:
+            raise ValueError("Antal set, game och tiebreakpoäng måste vara minst 1")
+        self.name = name
+        self.sets_to_win = sets_to_win
+        self.games_per_set = games_per_set
+        self.no_ad = no_ad
+        self.set_decider = set_decider
+        self.tiebreak_points = tiebreak_points
+        self.final_set = final_set
+        self.final_tiebreak_points = final_tiebreak_points
+        self.serve_order = serve_order
+        self.tables = None # FormatTables, set by compile_format
+
+    def key(self):
+        # everything that decides the tables, the name doesn't
+        return (self.sets_to_win, self.games_per_set, self.no_ad, self.set_decider, self.tiebreak_points,
+                self.final_set, self.final_tiebreak_points, self.serve_order)
+
+    def __eq__(self, other):
+        return isinstance(other, MatchFormat) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __repr__(self):
+        return f"MatchFormat({self.name!r})"
+
+
+CLASSIC = MatchFormat("classic")
+FORMATS = {match_format.name: match_format for match_format in [
+    CLASSIC,
+    MatchFormat("best_of_3", set_decider = "tiebreak", serve_order = "alternate"),
+    MatchFormat("best_of_5", sets_to_win = 3, set_decider = "tiebreak", serve_order = "alternate"),
+    MatchFormat("grand_slam", sets_to_win = 3, set_decider = "tiebreak", final_set = "tiebreak", serve_order = "alternate"),
+    MatchFormat("advantage_final_set", sets_to_win = 3, set_decider = "tiebreak", final_set = "advantage", serve_order = "alternate"),
+    MatchFormat("no_ad", no_ad = True, set_decider = "tiebreak", final_set = "match_tiebreak", serve_order = "alternate"),
+    MatchFormat("short_sets", games_per_set = 4, no_ad = True, set_decider = "tiebreak", final_set = "match_tiebreak", serve_order = "alternate"),
+]}
+
+
+class GameTable:
+    # transition table of one kind of game. Side a serves the first point. serving[state] is 0 when a serves the
+    # point and 1 when b does, next_a/next_b[state] is the state after a/b wins the point, GAME_OVER_A/B when it ends
+    def __init__(self, points_to_win, lead, tiebreak):
+        self.points_to_win = points_to_win
+        self.tiebreak = tiebreak # the serve changes within the game (first point a, then b twice, a twice, ...)
+        self.serving = []
+        self.next_a = []
+        self.next_b = []
+
+        states = {}
+        scores = [(0, 0)]
+        states[(0, 0)] = 0
+        for points_a, points_b in scores:
+            self.serving.append((points_a + points_b + 1) // 2 % 2 if tiebreak else 0)
+            for side, points in ((0, (points_a + 1, points_b)), (1, (points_a, points_b + 1))):
+                if points[0] >= points_to_win and points[0] - points[1] >= lead:
+                    following = GAME_OVER_A
+                elif points[1] >= points_to_win and points[1] - points[0] >= lead:
+                    following = GAME_OVER_B
+                else:
+                    # past points_to_win - 1 all only the lead and the serve matter, 2 points less on both sides
+                    # keeps who serves (every 4th point) and makes the table finite
+                    while min(points) > points_to_win:
+                        points = (points[0] - 2, points[1] - 2)
+                    if points not in states:
+                        states[points] = len(scores)
+                        scores.append(points)
+                    following = states[points]
+                (self.next_a if side == 0 else self.next_b).append(following)
+        self.start = 0
+
+
+class SetTable:
+    # transition table of one kind of set. Side a serves the first game. serving[state] is 0 when a serves the game,
+    # games[state] is the GameTable it is played with and deciding[state] is True for the game at games_per_set-all.
+    # next_a/next_b[state] is the state after a/b wins the game, or set_over(winner, next server) when the set ends
+    def __init__(self, games_per_set, decider, game, tiebreak = None):
+        self.serving = []
+        self.games = []
+        self.deciding = []
+        self.next_a = []
+        self.next_b = []
+
+        states = {(0, 0): 0}
+        scores = [(0, 0)]
+        for games_a, games_b in scores:
+            deciding = decider in ("game", "tiebreak") and games_a == games_b == games_per_set
+            self.serving.append((games_a + games_b) % 2)
+            self.games.append(tiebreak if deciding and decider == "tiebreak" else game)
+            self.deciding.append(deciding)
+            next_server = (games_a + games_b + 1) % 2 # side that would serve the next game, starts the next set
+            for side, games in ((0, (games_a + 1, games_b)), (1, (games_a, games_b + 1))):
+                if deciding or (max(games) >= games_per_set and abs(games[0] - games[1]) >= 2):
+                    following = set_over(side, next_server)
+                else:
+                    while min(games) > games_per_set:
+                        games = (games[0] - 2, games[1] - 2)
+                    if games not in states:
+                        states[games] = len(scores)
+                        scores.append(games)
+                    following = states[games]
+                (self.next_a if side == 0 else self.next_b).append(following)
+        self.start = 0
+
+
+class MatchTiebreakTable(SetTable):
+    # a final set that is only a tiebreak, won 1-0 in games
+    def __init__(self, tiebreak):
+        self.serving = [0]
+        self.games = [tiebreak]
+        self.deciding = [True]
+        self.next_a = [set_over(0, 1)]
+        self.next_b = [set_over(1, 1)]
+        self.start = 0
+
+
+def set_over(winner, next_server):
+    # terminal state of a set table, winner and next_server are sides (0 = a, 1 = b)
+    return -1 - winner - 2 * next_server
+
+
+def set_result(state):
+    # (winner, next server) of a terminal set state
+    return (-1 - state) % 2, (-1 - state) // 2
+
+
+class FormatTables:
+    # everything compiled from one MatchFormat
+    def __init__(self, match_format):
+        self.match_format = match_format
+        game = GameTable(4, 1 if match_format.no_ad else 2, False)
+        tiebreak = GameTable(match_format.tiebreak_points, 2, True)
+        self.set = SetTable(match_format.games_per_set, match_format.set_decider, game, tiebreak)
+
+        final_set = match_format.final_set
+        if final_set == "same":
+            self.final_set = self.set
+        elif final_set == "match_tiebreak":
+            self.final_set = MatchTiebreakTable(GameTable(match_format.final_tiebreak_points, 2, True))
+        else:
+            final_tiebreak = GameTable(match_format.final_tiebreak_points, 2, True) if final_set == "tiebreak" else None
+            self.final_set = SetTable(match_format.games_per_set, final_set, game, final_tiebreak)
+        self.flatten()
+
+    def set_table(self, sets_p1, sets_p2):
+        # the set table for the next set at this set score
+        final = sets_p1 == sets_p2 == self.match_format.sets_to_win - 1
+        return self.final_set if final else self.set
+
+    def flatten(self):
+        # builds the flat table: server[state] is 0 when player1 serves the point and 1 when player2 does, won/lost
+        # the next state when the server wins or loses it. The match ends in state -1 - i where results[i] is
+        # (sets player1, sets player2). start[player1_serves_first] is the first state
+        sets_to_win = self.match_format.sets_to_win
+        alternate = self.match_format.serve_order == "alternate"
+        self.server = []
+        self.won = []
+        self.lost = []
+        self.results = []
+        result_states = {}
+        states = {}
+        keys = []
+
+        def state(key):
+            if key not in states:
+                states[key] = len(keys)
+                keys.append(key)
+            return states[key]
+
+        def start_set(sets_p1, sets_p2, player1_serves_set, player1_serves_match):
+            # state of the first point of a set, or the end of the match
+            if sets_p1 == sets_to_win or sets_p2 == sets_to_win:
+                if (sets_p1, sets_p2) not in result_states:
+                    result_states[(sets_p1, sets_p2)] = -1 - len(self.results)
+                    self.results.append((sets_p1, sets_p2))
+                return result_states[(sets_p1, sets_p2)]
+            set_table = self.set_table(sets_p1, sets_p2)
+            game = set_table.games[set_table.start]
+            return state((sets_p1, sets_p2, player1_serves_set, player1_serves_match, set_table.start, game.start))
+
+        # with alternating serve the first server of the match doesn't matter after the first set
+        self.start = {player1_serves_first: start_set(0, 0, player1_serves_first, None if alternate else player1_serves_first)
+                      for player1_serves_first in (True, False)}
+        for key in keys:
+            sets_p1, sets_p2, player1_serves_set, player1_serves_match, set_state, game_state = key
+            set_table = self.set_table(sets_p1, sets_p2)
+            game = set_table.games[set_state]
+            player1_is_game_a = player1_serves_set == (set_table.serving[set_state] == 0)
+            player1_serves = player1_is_game_a == (game.serving[game_state] == 0)
+            self.server.append(0 if player1_serves else 1)
+
+            following = {}
+            for player1_won in (True, False):
+                game_next = game.next_a[game_state] if player1_won == player1_is_game_a else game.next_b[game_state]
+                if game_next >= 0:
+                    following[player1_won] = state((sets_p1, sets_p2, player1_serves_set, player1_serves_match, set_state, game_next))
+                    continue
+                set_next = set_table.next_a[set_state] if player1_won == player1_serves_set else set_table.next_b[set_state]
+                if set_next >= 0:
+                    next_game = set_table.games[set_next]
+                    following[player1_won] = state((sets_p1, sets_p2, player1_serves_set, player1_serves_match, set_next, next_game.start))
+                    continue
+                next_server = set_result(set_next)[1]
+                player1_serves_next = (next_server == 0) == player1_serves_set if alternate else player1_serves_match
+                following[player1_won] = start_set(sets_p1 + player1_won, sets_p2 + (not player1_won),
+                                                   player1_serves_next, player1_serves_match)
+            self.won.append(following[player1_serves])
+            self.lost.append(following[not player1_serves])
+
+    def play(self, p1_serve_win_prob, p2_serve_win_prob, rng_random, player1_serves_first):
+        # plays a match point by point on the flat table, returns (sets player1, sets player2)
+        server = self.server
+        won = self.won
+        lost = self.lost
+        probs = (p1_serve_win_prob, p2_serve_win_prob)
+        state = self.start[player1_serves_first]
+        while state >= 0:
+            if rng_random() < probs[server[state]]:
+                state = won[state]
+            else:
+                state = lost[state]
+        return self.results[-1 - state]
+
+
+COMPILED = {}
+
+
+def compile_format(match_format):
+    # FormatTables for match_format, compiled the first time a format with the same rules is used
+    tables = match_format.tables
+    if tables is None:
+        tables = COMPILED.get(match_format)
+        if tables is None:
+            tables = COMPILED[match_format] = FormatTables(match_format)
+        match_format.tables = tables
+    return tables
@@ -0,0 +1,149 @@
+""" append-only journal of match results next to the player file (playerdata.txt.journal). Any number of processes
+    can record results at the same time: every append is one write made under a lock on playerdata.txt.lock.
+    PlayerDatabase.load_players replays the results that aren't folded into the player file yet, and update_file
+    (or compact()) folds them in with an atomic replace of the player file.
+
+    Journal lines:
+        F <hash of the player file>     the results before this line are folded into a player file with that hash
+        R <winner> <loser>              a played match (tab separated)
+
+    A fold appends an F line for the new player file before replacing it, then starts a new journal with just that
+    line. The results to replay are the ones after the last F line matching the current player file, or after the
+    last F line if none matches (the file was edited by hand), so a crash at any point neither loses nor repeats
+    results. A line cut off by a crash has no newline, it is ignored and removed by the next append"""
+
+import os
+import hashlib
+import contextlib
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+    import msvcrt
+
+
+def file_hash(file_path):
+    # hash of the contents of a file, "" if it doesn't exist
+    try:
+        with open(file_path, "rb") as file:
+            return hashlib.blake2b(file.read(), digest_size = 16).hexdigest()
+    except FileNotFoundError:
+        return ""
+
+
+@contextlib.contextmanager
+def file_lock(lock_path):
+    # exclusive lock between processes, held while the block runs
+    with open(lock_path, "a+b") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError: # LK_LOCK gives up after 10 seconds, keep waiting
+                    pass
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def result_line(winner_name, loser_name):
+    # the journal line of a played match
+    return f"R\t{winner_name}\t{loser_name}\n"
+
+
+def apply_results(players, results):
+    # adds (winner name, loser name) results to the stats of players, results for unknown players are skipped
+    by_name = {player.name: player for player in players}
+    for winner_name, loser_name in results:
+        winner = by_name.get(winner_name)
+        loser = by_name.get(loser_name)
+        if winner is None or loser is None:
+            continue
+        winner.matches_won += 1
+        winner.matches_played += 1
+        loser.matches_played += 1
+
+
+class MatchJournal:
+    # class for the journal of one player file
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.journal_path = file_path + ".journal"
+        self.lock_path = file_path + ".lock"
+
+    def lock(self):
+        return file_lock(self.lock_path)
+
+    def append(self, text):
+        # appends whole lines and makes sure they are on disk, call with the lock held
+        with open(self.journal_path, "a+b") as journal:
+            size = journal.seek(0, os.SEEK_END)
+            if size:
+                journal.seek(size - 1)
+                if journal.read(1) != b"\n": # a line cut off by a crash is removed, it may hold half a name
+                    journal.seek(0)
+                    size = journal.read().rfind(b"\n") + 1
+                    journal.truncate(size)
+            if size == 0:
+                journal.write(f"F\t{file_hash(self.file_path)}\n".encode("utf-8"))
+            journal.write(text.encode("utf-8"))
+            journal.flush()
+            os.fsync(journal.fileno())
+
+    def record(self, winner_name, loser_name):
+        # adds a result, safe to call from many processes at the same time
+        with self.lock():
+            self.append(result_line(winner_name, loser_name))
+
+    def pending(self, player_file_hash = None):
+        # the (winner name, loser name) results that aren't folded into the player file
+        if player_file_hash is None:
+            player_file_hash = file_hash(self.file_path)
+        try:
+            with open(self.journal_path, "r", encoding = "utf-8", newline = "\n") as journal:
+                lines = journal.readlines()
+        except FileNotFoundError:
+            return []
+
+        folds = [i for i, line in enumerate(lines) if line.startswith("F\t") and line.endswith("\n")]
+        matching = [i for i in folds if lines[i].rstrip("\n").split("\t")[1] == player_file_hash]
+        start = matching[-1] + 1 if matching else (folds[-1] + 1 if folds else 0)
+
+        results = []
+        for line in lines[start:]:
+            fields = line.rstrip("\n").split("\t")
+            if line.endswith("\n") and fields[0] == "R" and len(fields) == 3:
+                results.append((fields[1], fields[2]))
+        return results
+
+    def fold(self, new_file_path):
+        # replaces the player file with new_file_path, which holds every result in the journal, and starts a new
+        # journal. Call with the lock held
+        marker = f"F\t{file_hash(new_file_path)}\n"
+        if os.path.exists(self.journal_path):
+            self.append(marker)
+        os.replace(new_file_path, self.file_path)
+
+        with open(self.journal_path + ".tmp", "w", encoding = "utf-8", newline = "\n") as journal:
+            journal.write(marker)
+            journal.flush()
+            os.fsync(journal.fileno())
+        os.replace(self.journal_path + ".tmp", self.journal_path)
+
+
+def compact(file_path):
+    # folds the journal of a player file into it
+    from player_database import PlayerDatabase
+
+    database = PlayerDatabase(file_path)
+    database.load_players()
+    database.update_file()
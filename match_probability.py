@@ -0,0 +1,106 @@
+""" exact win probabilities for the scoring rules of Match. The game probability is memoized per serve probability,
+    so it is calculated once per distinct serve_win_prob. The set and the match are solved for each pairing by filling
+    in the table of game scores (and set scores) backwards from the end, without recursion"""
+
+from functools import lru_cache
+
+
+SET_GAMES = 6 # games to win a set, with 2 games lead and a deciding game at 6-6
+SETS_TO_WIN = 2
+
+
+@lru_cache(maxsize = None)
+def game_win_probability(serve_win_prob, points_server = 0, points_receiver = 0):
+    # probability that the server wins the game from the given point score (0, 1, 2, 3, 4 = 0, 15, 30, 40, Ad)
+    if points_server >= 4 and points_server - points_receiver >= 2:
+        return 1.0
+    if points_receiver >= 4 and points_receiver - points_server >= 2:
+        return 0.0
+
+    p = serve_win_prob
+    q = 1 - p
+    if points_server >= 3 and points_server == points_receiver:
+        # 40-40, a lost Ad-point brings the game back here so the server has to win two points in a row first
+        return p * p / (p * p + q * q)
+
+    return p * game_win_probability(p, points_server + 1, points_receiver) + q * game_win_probability(p, points_server, points_receiver + 1)
+
+
+def set_table(hold_first, hold_second):
+    # table[a][b] is the probability that the player who served the first game of the set wins it from the game score
+    # a-b (first server's games first), for a, b up to 7. hold_first and hold_second are the probabilities that the
+    # two players win their service games. The first server serves when a + b is even, and the deciding game at 6-6
+    size = SET_GAMES + 2
+    won = (hold_first, 1 - hold_second) # probability that the first server wins the game, by a + b even or odd
+    table = [[0.0] * size for _ in range(size)]
+    for games in range(SET_GAMES - 1):
+        table[SET_GAMES][games] = 1.0 # 6-0 to 6-4, and 0-6 to 4-6 stay at 0
+    table[SET_GAMES + 1][SET_GAMES - 1] = table[SET_GAMES + 1][SET_GAMES] = 1.0
+    table[SET_GAMES][SET_GAMES] = won[0]
+    odd = won[1] # 6-5 and 5-6, the twelfth game is served by the second server
+    table[SET_GAMES][SET_GAMES - 1] = odd + (1 - odd) * won[0]
+    table[SET_GAMES - 1][SET_GAMES] = odd * won[0]
+
+    # the rest is filled in backwards from 5-5, every score from the two scores after the next game
+    for a in range(SET_GAMES - 1, -1, -1):
+        row = table[a]
+        next_row = table[a + 1]
+        for b in range(SET_GAMES - 1, -1, -1):
+            p = won[(a + b) % 2]
+            row[b] = p * next_row[b] + (1 - p) * row[b + 1]
+    return table
+
+
+def set_win_probability(p1_serve_win_prob, p2_serve_win_prob, games_p1 = 0, games_p2 = 0, player1_serves = True):
+    # probability that player1 wins the set from the given game score when player1_serves the next game
+    player1_first = player1_serves == ((games_p1 + games_p2) % 2 == 0) # player1 served the first game of the set
+    if player1_first:
+        return set_table(game_win_probability(p1_serve_win_prob), game_win_probability(p2_serve_win_prob))[games_p1][games_p2]
+    return 1 - set_table(game_win_probability(p2_serve_win_prob), game_win_probability(p1_serve_win_prob))[games_p2][games_p1]
+
+
+def sets_win_probability(set_p1, sets_p1 = 0, sets_p2 = 0):
+    # probability that player1 wins the match from the set score, winning every set with probability set_p1
+    row = [1.0] * (SETS_TO_WIN + 1) # row[s2] = win probability at s1 + 1 sets, 1 when s1 + 1 == SETS_TO_WIN
+    for s1 in range(SETS_TO_WIN - 1, sets_p1 - 1, -1):
+        current = [0.0] * (SETS_TO_WIN + 1)
+        for s2 in range(SETS_TO_WIN - 1, -1, -1):
+            current[s2] = set_p1 * row[s2] + (1 - set_p1) * current[s2 + 1]
+        row = current
+    return row[sets_p2] if sets_p1 < SETS_TO_WIN else 1.0
+
+
+def match_win_probability(p1_serve_win_prob, p2_serve_win_prob, sets_p1 = 0, sets_p2 = 0, player1_serves_first = None):
+    # probability that player1 wins the best of 3 match, player1_serves_first = None averages over the coin flip.
+    # Every set starts with the player who served first in the match
+    if sets_p1 >= SETS_TO_WIN:
+        return 1.0
+    if sets_p2 >= SETS_TO_WIN:
+        return 0.0
+    hold_p1 = game_win_probability(p1_serve_win_prob)
+    hold_p2 = game_win_probability(p2_serve_win_prob)
+    probability = 0.0
+    for first, weight in ((True, 0.5), (False, 0.5)) if player1_serves_first is None else ((player1_serves_first, 1.0),):
+        set_p1 = set_table(hold_p1, hold_p2)[0][0] if first else 1 - set_table(hold_p2, hold_p1)[0][0]
+        probability += weight * sets_win_probability(set_p1, sets_p1, sets_p2)
+    return probability
+
+
+def head_to_head(player1, player2):
+    # probability that player1 beats player2
+    return match_win_probability(player1.serve_win_prob, player2.serve_win_prob)
+
+
+def win_probability_matrix(players, cache = None):
+    # matrix[i][j] is the probability that players[i] beats players[j], the diagonal is left at 0.5
+    # cache is a ProbabilityCache (probability_cache.py) to read the pairings from disk instead of calculating them
+    # The first server is drawn at random, so matrix[j][i] = 1 - matrix[i][j] and only half of it is calculated
+    probability = cache.head_to_head if cache is not None else head_to_head
+    matrix = [[0.5] * len(players) for _ in players]
+    for i, player1 in enumerate(players):
+        for j in range(i + 1, len(players)):
+            player2 = players[j]
+            if player1 is not player2:
+                matrix[i][j] = probability(player1, player2)
+                matrix[j][i] = 1 - matrix[i][j]
+    return matrix
@@ -0,0 +1,276 @@
+""" point-by-point recording of simulated matches. A match is stored as who served first and one bit per point (1 when
+    player1 won it), which is all ScoringCore needs to play the match again and emit the same events, so every score
+    state Match shows can be rebuilt from it. A best of 3 match takes about 12 bytes of header and 20 bytes of points.
+
+    File layout after the magic b"TMR1", a stream of entries that each start with one type byte:
+        b"N" <H name length> <utf-8 name>        gives the next player id (0, 1, 2, ...) to name
+        b"M" <IIHB player1 id, player2 id, number of points, flags> <points, 8 per byte, first point in the lowest bit>
+    flags: 1 = player1 served first, 2 = player1 won the match
+
+        with RecordWriter("matches.tmr") as writer:
+            ScoringCore(player1, player2, [MatchRecorder(writer)], rng).play_match()
+        for record in read_records("matches.tmr"):
+            ...
+        MatchReplay(next(read_records("matches.tmr"))).play([ConsoleOutput(...)], set_number = 2, game_number = 3)"""
+
+import sys
+import struct
+import argparse
+import itertools
+
+from scoring import ScoringCore, EVENTS
+from match_format import FORMATS
+from random_streams import RandomStreams
+
+
+MAGIC = b"TMR1"
+NAME = struct.Struct("<H")
+MATCH = struct.Struct("<IIHB")
+PLAYER1_SERVES_FIRST = 1
+PLAYER1_WON = 2
+
+
+class MatchRecord:
+    # one recorded match, points is an int with bit i set when player1 won point i
+    __slots__ = ("player1", "player2", "player1_serves_first", "player1_won", "n_points", "points")
+
+    def __init__(self, player1, player2, player1_serves_first, player1_won, n_points, points):
+        self.player1 = player1 # names
+        self.player2 = player2
+        self.player1_serves_first = player1_serves_first
+        self.player1_won = player1_won
+        self.n_points = n_points
+        self.points = points
+
+    def point_winners(self):
+        # True for every point player1 won, in order
+        points = self.points
+        return [(points >> i) & 1 == 1 for i in range(self.n_points)]
+
+    def points_won_by_player1(self):
+        return self.points.bit_count()
+
+    def winner(self):
+        return self.player1 if self.player1_won else self.player2
+
+
+class MatchRecorder:
+    # subscriber to ScoringCore that records the match and writes it to a RecordWriter (or anything with write_record)
+    # when it is over. Subscribing to the points means the scoring core plays the match with events
+    def __init__(self, writer):
+        self.writer = writer
+        self.player1 = None
+        self.player2 = None
+        self.player1_serves_first = False
+        self.points = 0
+        self.n_points = 0
+
+    def match_started(self, event):
+        self.player1 = event.player1
+        self.player2 = event.player2
+        self.player1_serves_first = event.server is event.player1
+        self.points = 0
+        self.n_points = 0
+
+    def point_won(self, event):
+        if event.winner is self.player1:
+            self.points |= 1 << self.n_points
+        self.n_points += 1
+
+    def match_won(self, event):
+        self.writer.write_record(MatchRecord(self.player1.name, self.player2.name, self.player1_serves_first,
+                                             event.winner is self.player1, self.n_points, self.points))
+
+
+class RecordWriter:
+    # class for appending recorded matches to a file, player names are written once per file
+    def __init__(self, file_path, buffer_size = 1 << 20):
+        self.file = open(file_path, "wb", buffering = buffer_size)
+        self.file.write(MAGIC)
+        self.player_ids = {}
+        self.records = 0
+
+    def player_id(self, name):
+        player_id = self.player_ids.get(name)
+        if player_id is None:
+            player_id = self.player_ids[name] = len(self.player_ids)
+            encoded = name.encode("utf-8")
+            self.file.write(b"N" + NAME.pack(len(encoded)) + encoded)
+        return player_id
+
+    def write_record(self, record):
+        flags = (PLAYER1_SERVES_FIRST if record.player1_serves_first else 0) | (PLAYER1_WON if record.player1_won else 0)
+        header = MATCH.pack(self.player_id(record.player1), self.player_id(record.player2), record.n_points, flags)
+        self.file.write(b"M" + header + record.points.to_bytes((record.n_points + 7) // 8, "little"))
+        self.records += 1
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_records(file_path, buffer_size = 1 << 20):
+    # yields the MatchRecords of a file one at a time, only the player names and one buffer are kept in memory
+    names = []
+    with open(file_path, "rb", buffering = buffer_size) as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{file_path} är ingen matchinspelning")
+        read = file.read
+        while True:
+            entry_type = read(1)
+            if not entry_type:
+                return
+            if entry_type == b"M":
+                player1_id, player2_id, n_points, flags = MATCH.unpack(read(MATCH.size))
+                points = int.from_bytes(read((n_points + 7) // 8), "little")
+                yield MatchRecord(names[player1_id], names[player2_id], bool(flags & PLAYER1_SERVES_FIRST),
+                                  bool(flags & PLAYER1_WON), n_points, points)
+            elif entry_type == b"N":
+                (length,) = NAME.unpack(read(NAME.size))
+                names.append(read(length).decode("utf-8"))
+            else:
+                raise ValueError(f"Okänd post {entry_type!r} i {file_path}")
+
+
+def record_matches(player1, player2, n_matches, file_path, seed = None, match_format = None):
+    # simulates and records n_matches matches, match i is played with stream (i,) like simulate_matches_parallel
+    streams = RandomStreams(seed)
+    with RecordWriter(file_path) as writer:
+        recorder = MatchRecorder(writer)
+        for i in range(n_matches):
+            ScoringCore(player1, player2, [recorder], streams.stream(i), match_format).play_match()
+    return streams.seed
+
+
+class ReplayCore(ScoringCore):
+    # scoring core that takes the first server and every point winner from a MatchRecord instead of the rng
+    fast_path = False
+
+    def __init__(self, record, player1, player2, subscribers = (), match_format = None):
+        super().__init__(player1, player2, subscribers, rng = None, match_format = match_format)
+        self.record = record
+        self.position = 0
+
+    def player1_serves_first(self):
+        return self.record.player1_serves_first
+
+    def play_point(self, server, receiver):
+        player1_won = (self.record.points >> self.position) & 1
+        self.position += 1
+        return self.player1 if player1_won else self.player2
+
+
+class SeekGate:
+    # subscriber that passes the events of the match on to subscribers from the start of game game_number in set
+    # set_number (both from 1). Before that only the start of the match and finished sets are passed on, so the
+    # subscribers show the sets that were skipped and then the match point by point from where it was sought
+    def __init__(self, subscribers, set_number = 1, game_number = 1):
+        self.set_number = set_number
+        self.game_number = game_number
+        self.current_set = 1
+        self.reached = set_number <= 1 and game_number <= 1
+        self.handlers = {event.handler: [getattr(subscriber, event.handler) for subscriber in subscribers
+                                         if getattr(subscriber, event.handler, None) is not None]
+                         for event in EVENTS}
+
+    def forward(self, event):
+        for handler in self.handlers[event.handler]:
+            handler(event)
+
+    def match_started(self, event):
+        self.forward(event)
+
+    def server_changed(self, event):
+        if self.reached:
+            self.forward(event)
+
+    def game_started(self, event):
+        if not self.reached and (self.current_set > self.set_number or
+                                 (self.current_set == self.set_number and event.games_p1 + event.games_p2 + 1 >= self.game_number)):
+            self.reached = True
+        if self.reached:
+            self.forward(event)
+
+    def point_won(self, event):
+        if self.reached:
+            self.forward(event)
+
+    def game_won(self, event):
+        if self.reached:
+            self.forward(event)
+
+    def set_won(self, event):
+        self.current_set += 1
+        self.forward(event)
+
+    def match_won(self, event):
+        self.forward(event)
+
+
+class MatchReplay:
+    # class for playing a recorded match again through subscribers, e.g. ConsoleOutput or ScoreDisplaySubscriber from
+    # tennis3, the speed is the delay given to those subscribers
+    def __init__(self, record, player1 = None, player2 = None, match_format = None):
+        # player1/player2 are the Tennisplayer objects to show, by default players with the recorded names.
+        # match_format must be the MatchFormat the match was played with, the classic rules by default
+        from player_database import Tennisplayer
+
+        self.record = record
+        self.match_format = match_format
+        self.player1 = player1 if player1 is not None else Tennisplayer(record.player1, 0.0, 0, 0)
+        self.player2 = player2 if player2 is not None else Tennisplayer(record.player2, 0.0, 0, 0)
+
+    def play(self, subscribers, set_number = 1, game_number = 1):
+        # plays the match from game game_number of set set_number, returns the winner
+        core = ReplayCore(self.record, self.player1, self.player2, [SeekGate(subscribers, set_number, game_number)], self.match_format)
+        return core.play_match()
+
+
+def main(argv = None):
+    from tennis3 import ConsoleOutput, ScoreDisplay, ScoreDisplaySubscriber, PlayerDatabase
+    from leaderboard import Leaderboard
+
+    parser = argparse.ArgumentParser(description = "Spela upp en inspelad match.")
+    parser.add_argument("file", help = "fil med inspelade matcher")
+    parser.add_argument("-m", "--match", type = int, default = 1, help = "matchens nummer i filen (från 1)")
+    parser.add_argument("--set", type = int, default = 1, help = "börja från detta set")
+    parser.add_argument("--game", type = int, default = 1, help = "börja från detta game i setet")
+    parser.add_argument("-d", "--delay", type = float, default = 0.5, help = "sekunder mellan poängen")
+    parser.add_argument("--display-mode", type = int, choices = [1, 2, 3], default = 1, help = "1 (Poäng), 2 (Game), 3 (Set)")
+    parser.add_argument("--format", choices = sorted(FORMATS), default = "classic", help = "matchformatet matchen spelades med")
+    parser.add_argument("--gui", action = "store_true", help = "visa poängställningen i en gui")
+    parser.add_argument("--players", default = "playerdata.txt", help = "spelarfil för placeringarna i gui")
+    arguments = parser.parse_args(argv)
+
+    record = next(itertools.islice(read_records(arguments.file), arguments.match - 1, None), None)
+    if record is None:
+        print(f"Match {arguments.match} finns inte i filen.")
+        return 1
+
+    match_format = FORMATS[arguments.format]
+    replay = MatchReplay(record, match_format = match_format)
+    subscribers = []
+    if arguments.gui:
+        database = PlayerDatabase(arguments.players)
+        database.load_players()
+        players = {player.name: player for player in database.sorted_players}
+        replay = MatchReplay(record, players.get(record.player1), players.get(record.player2), match_format)
+        leaderboard = database.leaderboard() if replay.player1 in database.players and replay.player2 in database.players \
+                      else Leaderboard([replay.player1, replay.player2])
+        subscribers.append(ScoreDisplaySubscriber(ScoreDisplay(replay.player1, replay.player2, leaderboard), arguments.delay))
+        subscribers.append(ConsoleOutput(replay.player1, replay.player2, 0, 4))
+    else:
+        subscribers.append(ConsoleOutput(replay.player1, replay.player2, arguments.delay, arguments.display_mode))
+
+    winner = replay.play(subscribers, arguments.set, arguments.game)
+    print(f"Matchvinnare: {winner.name}\n" + 40*"=")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+""" local HTTP/JSON service for simulating matches, so other tools can ask for matchups without starting Python and
+    reading the player file every time. The player database is kept in memory (and read again when the player file
+    or its journal changes), requests are handled with asyncio and the matches are played on a process pool.
+    Example:
+
+        python match_service.py --port 8765
+        curl "http://127.0.0.1:8765/simulate?player1=J%20Sinner&player2=4&matches=10000&seed=1"
+
+    Endpoints:
+        GET  /players                   the players in toplist order with their stats
+        GET  /simulate?player1=...&player2=...&matches=1000&seed=...&format=classic
+        POST /simulate                  the same parameters as a JSON object
+        GET  /health                    counters of requests, runs and simulated matches
+
+    Players are given by name or by placement in the toplist, like in headless.py. Match i of a run uses random
+    stream (i,) like play_match_range, so a request gets the same answer whether it is batched or not. Requests for
+    the same pairing, format and seed that come within batch_window seconds of each other, or while a run that plays
+    enough matches is going on, share one run. Requests without a seed that are batched get the same random seed"""
+
+import os
+import sys
+import json
+import asyncio
+import argparse
+from urllib.parse import urlsplit, parse_qsl
+from concurrent.futures import ProcessPoolExecutor
+
+from adaptive_estimate import wilson_interval
+from match_format import FORMATS
+from player_database import PlayerDatabase, find_player
+from random_streams import RandomStreams
+from scoring import ScoringCore
+
+
+CHUNK_SIZE = 10000 # matches per pool task
+MAX_BODY = 65536 # bytes of a POST body
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+           500: "Internal Server Error"}
+
+
+class SetScore:
+    # subscriber to ScoringCore that keeps the set score of the last match, doesn't turn off the fast path
+    def match_won(self, event):
+        self.sets_p1 = event.sets_p1
+        self.sets_p2 = event.sets_p2
+
+
+def play_outcomes(player1, player2, format_name, seed, start, stop):
+    # plays matches start to stop - 1 like play_match_range, runs in the worker processes. Returns one byte per match,
+    # sets won by player1 * 8 + sets won by player2
+    streams = RandomStreams(seed)
+    match_format = FORMATS[format_name]
+    score = SetScore()
+    outcomes = bytearray(stop - start)
+    for i in range(start, stop):
+        ScoringCore(player1, player2, [score], rng = streams.stream(i), match_format = match_format).play_match()
+        outcomes[i - start] = score.sets_p1 * 8 + score.sets_p2
+    return outcomes
+
+
+def summary(player1, player2, format_name, seed, outcomes):
+    # win probability with a 95 % confidence interval and the set score distribution of outcomes
+    set_scores = {}
+    wins_p1 = 0
+    for outcome in sorted(set(outcomes)):
+        count = outcomes.count(outcome)
+        sets_p1, sets_p2 = outcome // 8, outcome % 8
+        set_scores[f"{sets_p1}-{sets_p2}"] = count
+        if sets_p1 > sets_p2:
+            wins_p1 += count
+    low, high = wilson_interval(wins_p1, len(outcomes))
+    return {
+        "player1": player1.name,
+        "player2": player2.name,
+        "format": format_name,
+        "matches": len(outcomes),
+        "seed": seed,
+        "player1_wins": wins_p1,
+        "player2_wins": len(outcomes) - wins_p1,
+        "player1_win_probability": wins_p1 / len(outcomes),
+        "confidence_interval": [low, high],
+        "set_scores": set_scores,
+    }
+
+
+class Run:
+    # one simulation run that requests for the same pairing can join until it starts
+    def __init__(self, seed):
+        self.seed = seed
+        self.matches = 0
+        self.started = False
+        self.requests = 0
+        self.outcomes = asyncio.get_running_loop().create_future()
+
+
+class MatchService:
+    """ class that answers requests from the players of one player file. Runs for the same (player1, player2, format,
+        seed) are shared: a request joins the run that is waiting to start, or one that has started and plays at least
+        as many matches, otherwise it starts a new run. A run is split into chunks of CHUNK_SIZE matches on the pool,
+        so a large run uses all workers and runs of other pairings get their turn between chunks"""
+    def __init__(self, file_path, pool, batch_window = 0.005, max_matches = 1000000):
+        self.file_path = file_path
+        self.pool = pool
+        self.batch_window = batch_window
+        self.max_matches = max_matches
+        self.database = None
+        self.failed_versions = None # disk_versions() of the last player file that couldn't be read
+        self.runs = {} # key: the newest Run for it
+        self.counters = {"requests": 0, "simulations": 0, "batched": 0, "runs": 0, "matches": 0}
+        self.refresh()
+
+    def refresh(self):
+        # reads the player file again if it or its journal changed since the last time. A version of the files that
+        # couldn't be read is remembered, so a broken file is parsed and reported once and not on every request
+        if self.database is not None and not self.database.changed_on_disk():
+            return
+        database = PlayerDatabase(self.file_path)
+        versions = database.disk_versions()
+        if versions == self.failed_versions:
+            return
+        try:
+            database.load_players()
+        except SystemExit: # load_players has printed why, keep the players from before if there are any
+            self.failed_versions = versions
+            if self.database is None:
+                raise
+            return
+        self.failed_versions = None
+        self.database = database
+
+    def players(self):
+        self.refresh()
+        return [{"placement": placement, "name": player.name, "serve_win_prob": player.serve_win_prob,
+                 "matches_won": player.matches_won, "matches_played": player.matches_played}
+                for placement, player in enumerate(self.database.sorted_players, start = 1)]
+
+    async def simulate(self, parameters):
+        # answers a simulation request, parameters is a dict of strings or JSON values
+        self.refresh()
+        try:
+            player1 = find_player(self.database, str(parameters["player1"]))
+            player2 = find_player(self.database, str(parameters["player2"]))
+        except KeyError as error:
+            raise ValueError(f"Parametern saknas: {error.args[0]}")
+        if player1 is player2:
+            raise ValueError("En spelare kan inte spela mot sig själv.")
+        format_name = str(parameters.get("format", "classic"))
+        if format_name not in FORMATS:
+            raise ValueError(f"Okänt matchformat: {format_name}")
+        try:
+            matches = int(parameters.get("matches", 1000))
+            seed = None if parameters.get("seed") in (None, "") else int(parameters["seed"])
+        except (TypeError, ValueError):
+            raise ValueError("matches och seed måste vara heltal")
+        if not 1 <= matches <= self.max_matches:
+            raise ValueError(f"matches måste vara mellan 1 och {self.max_matches}")
+
+        self.counters["simulations"] += 1
+        key = (player1.name, player1.serve_win_prob, player2.name, player2.serve_win_prob, format_name, seed)
+        run = self.runs.get(key)
+        if run is None or (run.started and run.matches < matches):
+            run = self.runs[key] = Run(RandomStreams(seed).seed)
+            asyncio.get_running_loop().create_task(self.play(key, run, player1, player2, format_name))
+        else:
+            self.counters["batched"] += 1
+        if not run.started:
+            run.matches = max(run.matches, matches)
+        run.requests += 1
+
+        outcomes = await asyncio.shield(run.outcomes)
+        return summary(player1, player2, format_name, run.seed, outcomes[:matches])
+
+    async def play(self, key, run, player1, player2, format_name):
+        # waits batch_window for more requests, then plays the run on the pool
+        try:
+            await asyncio.sleep(self.batch_window)
+            run.started = True
+            self.counters["runs"] += 1
+            self.counters["matches"] += run.matches
+            loop = asyncio.get_running_loop()
+            chunks = await asyncio.gather(*[
+                loop.run_in_executor(self.pool, play_outcomes, player1, player2, format_name, run.seed,
+                                     start, min(start + CHUNK_SIZE, run.matches))
+                for start in range(0, run.matches, CHUNK_SIZE)])
+            run.outcomes.set_result(bytes().join(chunks))
+        except Exception as error:
+            run.outcomes.set_exception(error)
+        finally:
+            if self.runs.get(key) is run:
+                del self.runs[key]
+
+    async def dispatch(self, method, target, body):
+        # (status, JSON payload) for a request
+        url = urlsplit(target)
+        if url.path == "/simulate":
+            if method == "GET":
+                parameters = dict(parse_qsl(url.query))
+            elif method == "POST":
+                try:
+                    parameters = json.loads(body or b"{}")
+                except ValueError:
+                    return 400, {"error": "Felaktig JSON"}
+                if not isinstance(parameters, dict):
+                    return 400, {"error": "Ett JSON-objekt behövs"}
+            else:
+                return 405, {"error": "Använd GET eller POST"}
+            try:
+                return 200, await self.simulate(parameters)
+            except ValueError as error:
+                return 400, {"error": str(error)}
+        if url.path in ("/players", "/health"):
+            if method != "GET":
+                return 405, {"error": "Använd GET"}
+            if url.path == "/players":
+                return 200, self.players()
+            return 200, dict(self.counters, pending_runs = len(self.runs))
+        return 404, {"error": "Okänd adress"}
+
+    async def handle_connection(self, reader, writer):
+        # reads HTTP/1.1 requests from one connection and answers them in order, keep-alive is supported
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                self.counters["requests"] += 1
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    await self.respond(writer, 400, {"error": "Felaktig förfrågan"}, False)
+                    break
+                if not 0 <= length <= MAX_BODY:
+                    await self.respond(writer, 413, {"error": "För stor förfrågan"}, False)
+                    break
+                body = await reader.readexactly(length)
+
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                try:
+                    status, payload = await self.dispatch(method, target, body)
+                except Exception as error:
+                    status, payload = 500, {"error": f"{type(error).__name__}: {error}"}
+                await self.respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass # the client went away or sent a line longer than the stream limit
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status, payload, keep_alive):
+        data = json.dumps(payload, ensure_ascii = False).encode("utf-8")
+        writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                     f"Content-Type: application/json; charset=utf-8\r\n"
+                     f"Content-Length: {len(data)}\r\n"
+                     f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data)
+        await writer.drain()
+
+
+async def serve(file_path, host = "127.0.0.1", port = 8765, unix_path = None, workers = None, batch_window = 0.005,
+                max_matches = 1000000):
+    # runs the service until it is cancelled
+    with ProcessPoolExecutor(max_workers = workers or os.cpu_count() or 1) as pool:
+        service = MatchService(file_path, pool, batch_window, max_matches)
+        if unix_path is not None:
+            server = await asyncio.start_unix_server(service.handle_connection, unix_path)
+            print(f"Lyssnar på {unix_path}")
+        else:
+            server = await asyncio.start_server(service.handle_connection, host, port)
+            print(f"Lyssnar på http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Lokal tjänst som simulerar matcher och svarar med JSON över HTTP.")
+    parser.add_argument("--host", default = "127.0.0.1", help = "adress att lyssna på (standard 127.0.0.1)")
+    parser.add_argument("--port", type = int, default = 8765, help = "port (standard 8765)")
+    parser.add_argument("--unix", default = None, help = "lyssna på en unix-socket i stället för en port")
+    parser.add_argument("-w", "--workers", type = int, default = None, help = "antal processer")
+    parser.add_argument("--batch-window", type = float, default = 0.005, help = "sekunder som en körning väntar på fler förfrågningar")
+    parser.add_argument("--max-matches", type = int, default = 1000000, help = "högsta antal matcher per förfrågan")
+    parser.add_argument("--file", default = "playerdata.txt", help = "spelarfil")
+    arguments = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(arguments.file, arguments.host, arguments.port, arguments.unix, arguments.workers,
+                          arguments.batch_window, arguments.max_matches))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
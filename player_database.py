@@ -0,0 +1,206 @@
+""" the player roster without any gui or simulation code: Tennisplayer and PlayerDatabase, which reads and writes
+    playerdata.txt (with the journal in match_journal.py), and find_player for choosing players by placement or name.
+    Scripts and services that only need the players import this module instead of tennis3, so they start without
+    loading the rest of the program"""
+
+import os
+import sys
+import time
+import hashlib
+
+from instrumentation import INSTRUMENTS
+from match_journal import MatchJournal, apply_results, result_line
+
+
+class Tennisplayer:
+    # class for creating Tennisplayer objects with their name and stats
+    def __init__(self, name: str, serve_win_prob: float, matches_won: int, matches_played: int):
+        self.name = name
+        self.serve_win_prob = serve_win_prob
+        self.matches_won = matches_won
+        self.matches_played = matches_played
+
+    def win_percentage(self):
+        # calculates win percentage for Tennisplayer
+        if self.matches_played == 0:
+            return 0
+        return format(self.matches_won / self.matches_played, '.3f')
+
+    def win_rate(self):
+        # numeric win rate, used as sort key so the toplist isn't sorted on formatted strings
+        if self.matches_played == 0:
+            return 0.0
+        return self.matches_won / self.matches_played
+
+    def last_name(self):
+        # returns last name of player
+        last_name = self.name.strip()[2:]
+        return last_name
+
+
+class PlayerDatabase:
+    # class for gathering player stats, creating Tennisplayer objects, reuploading to the input-file and displaying players and stats
+    def __init__(self, file_path):
+        # initializes player database, players are first stored in self.players and then sorted and stored in self.sorted_players
+        self.file_path = file_path
+        self.players = []
+        self.sorted_players = []
+        self.ranking = None # Leaderboard over the players, built by leaderboard() when it is first needed
+        self.journal = MatchJournal(file_path) # results recorded by other processes, see match_journal.py
+        self.synced = {} # {name: (matches_won, matches_played)} as last read from or written to the file and journal
+        self.versions = None # disk_versions() when the players were last the same as the file and journal
+
+    def read_file(self):
+        # reads the header lines, the players and the hash of the input-file, in one read so they always belong together
+        with open(self.file_path, "rb") as file:
+            contents = file.read()
+        lines = contents.decode("utf-8").splitlines()
+
+        players = []
+        for line in range(5, len(lines), 4):
+            name = lines[line].strip()
+            serve_win_prob = float(lines[line + 1].strip())
+            matches_won = int(lines[line + 2].strip())
+            matches_played = int(lines[line + 3].strip())
+
+            players.append(Tennisplayer(name, serve_win_prob, matches_won, matches_played))
+        return lines[:5], players, hashlib.blake2b(contents, digest_size = 16).hexdigest()
+
+    def disk_versions(self):
+        # (modification time, size, inode) of the input-file and the journal, None for a file that doesn't exist
+        versions = []
+        for path in (self.file_path, self.journal.journal_path):
+            try:
+                stat = os.stat(path)
+                versions.append((stat.st_mtime_ns, stat.st_size, stat.st_ino))
+            except FileNotFoundError:
+                versions.append(None)
+        return versions
+
+    def changed_on_disk(self):
+        # True if another process (or an editor) changed the input-file or the journal since the players were loaded
+        return self.disk_versions() != self.versions
+
+    def reload_if_changed(self):
+        # loads the players again if the input-file or journal changed, changes that aren't saved are lost
+        if self.versions is not None and not self.changed_on_disk():
+            return False
+        self.players = []
+        self.load_players()
+        return True
+
+    def load_players(self):
+        # reads from input-file and adds the results in the journal that aren't folded into it yet
+        versions = self.disk_versions() # taken before reading, so a change during the read is seen next time
+        try:
+            with INSTRUMENTS.timer("load"):
+                _, players, file_hash = self.read_file()
+                apply_results(players, self.journal.pending(file_hash))
+                self.players.extend(players)
+
+        except FileNotFoundError:
+            print("Spelarfilen hittades inte.")
+            sys.exit()
+
+        except (ValueError, IndexError):
+            print("Felaktigt format i spelarfilen.")
+            sys.exit()
+
+        self.remember_synced()
+        self.versions = versions
+        self.sorted_players = sorted(self.players, key=lambda p: p.win_rate(), reverse=True)
+        self.ranking = None
+
+    def leaderboard(self):
+        # the players as a Leaderboard (leaderboard.py), where ranks are found without searching sorted_players. It is
+        # built the first time it is asked for after load_players or update_file and then moved by record_result
+        from leaderboard import Leaderboard # imports random, which scripts that never ask for ranks don't need
+
+        if self.ranking is None:
+            self.ranking = Leaderboard(self.players)
+        return self.ranking
+
+    def remember_synced(self):
+        # the stats are now the same as in the file and journal
+        self.synced = {player.name: (player.matches_won, player.matches_played) for player in self.players}
+
+    def record_result(self, winner, loser):
+        # adds a played match to the stats and to the journal, where other processes see it without update_file
+        with self.journal.lock():
+            up_to_date = not self.changed_on_disk()
+            self.journal.append(result_line(winner.name, loser.name))
+            if up_to_date: # only our own line was added
+                self.versions = self.disk_versions()
+        for player, won in ((winner, 1), (loser, 0)):
+            player.matches_won += won
+            player.matches_played += 1
+            matches_won, matches_played = self.synced.get(player.name, (0, 0))
+            self.synced[player.name] = (matches_won + won, matches_played + 1)
+            if self.ranking is not None:
+                self.ranking.update(player)
+
+    def update_file(self):
+        # updates file with new stats after played matches. The file and journal are read again under the journal lock
+        # and the changes made here since load_players (or the last update) are added to them, so results recorded by
+        # other processes in the meantime aren't lost. The new file replaces the old one and the journal is folded into it
+        with INSTRUMENTS.timer("persist"), self.journal.lock():
+            header, players, file_hash = self.read_file()
+            apply_results(players, self.journal.pending(file_hash))
+
+            on_file = {player.name: player for player in players}
+            for player in self.players:
+                current = on_file.pop(player.name, None)
+                if current is not None:
+                    matches_won, matches_played = self.synced.get(player.name, (0, 0))
+                    player.matches_won += current.matches_won - matches_won
+                    player.matches_played += current.matches_played - matches_played
+            self.players.extend(on_file.values()) # players added to the file by someone else
+
+            new_document = [line + "\n" for line in header] # keeps the header of the input-file
+
+            self.sorted_players = sorted(self.players, key = lambda p: p.win_rate(), reverse = True)
+            self.ranking = None # other processes' results may have moved any player
+
+            for player in self.sorted_players:
+                new_document.append(player.name + "\n")
+                new_document.append(f"{player.serve_win_prob}\n")
+                new_document.append(f"{player.matches_won}\n")
+
+                if player != self.sorted_players[-1]: # makes sure there is no blank line added at the end
+                    new_document.append(f"{player.matches_played}\n")
+                else:
+                    new_document.append(f"{player.matches_played}")
+
+            # written to a temporary file that replaces the old one, so an interrupted write never leaves half a file
+            with open(self.file_path + ".tmp", "w", encoding="utf-8") as file:
+                file.writelines(new_document)
+                file.flush()
+                os.fsync(file.fileno())
+            self.journal.fold(self.file_path + ".tmp")
+            self.versions = self.disk_versions()
+        self.remember_synced()
+
+    def win_probabilities(self, cache):
+        # head-to-head matrix over sorted_players from a ProbabilityCache (probability_cache.py), rows are looked up
+        # when first used. Entries of serve probabilities that no player has any more are pruned first
+        cache.prune(self.players)
+        return cache.matrix(self.sorted_players)
+
+    def display_players(self):
+        # presents players in toplist based on win percentage 
+        print("\n" + 60*"=" + "\n" + "Placering Namn                   Vunna  Spelade  Andel vunna" + "\n" + 60*"=")
+        for i, player in enumerate(self.sorted_players, start = 1):
+            time.sleep(0.02)
+            print(f"{i:^9} {player.name:24} {player.matches_won:<6} {player.matches_played:<8} {player.win_percentage()}")
+
+
+def find_player(database, choice):
+    # finds a player by placement (1 = first in the toplist) or by name, case insensitive
+    if choice.isdigit():
+        index = int(choice) - 1
+        if 0 <= index < len(database.sorted_players):
+            return database.sorted_players[index]
+    for player in database.sorted_players:
+        if player.name.lower() == choice.strip().lower():
+            return player
+    raise ValueError(f"Spelaren hittades inte: {choice}")
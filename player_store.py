@@ -0,0 +1,162 @@
+""" fixed-width binary player store. The file starts with a header block followed by one 48 byte record per player:
+
+        name            32 bytes, utf-8, padded with zeros
+        serve_win_prob  float64
+        matches_won     uint32
+        matches_played  uint32
+
+    the file is memory-mapped, so opening it does not read the roster and stats are updated by writing the two
+    counters of a single record in place. import_text/export_text convert from and to the playerdata.txt format"""
+
+import os
+import mmap
+import struct
+
+from player_database import Tennisplayer
+
+
+MAGIC = b"TPS1"
+HEADER = struct.Struct("<4sHHQI") # magic, version, record size, number of players, length of the text header
+HEADER_SIZE = 512 # the rest of the header block holds the 5-line text header of playerdata.txt
+RECORD = struct.Struct("<32sdII")
+STATS = struct.Struct("<II")
+STATS_OFFSET = 40 # offset of matches_won in a record
+NAME_SIZE = 32
+VERSION = 1
+
+
+class PlayerStore:
+    # class for reading and updating players in a memory-mapped binary player file
+    def __init__(self, file_path):
+        # opens an existing store, use PlayerStore.create() or import_text() to make a new one
+        self.file_path = file_path
+        self.file = open(file_path, "r+b")
+        self.map = mmap.mmap(self.file.fileno(), 0)
+
+        magic, version, record_size, self.count, text_length = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            self.close()
+            raise ValueError(f"Felaktigt format i spelarfilen: {file_path}")
+        self.header_text = bytes(self.map[HEADER.size:HEADER.size + text_length]).decode("utf-8")
+        self.name_index = None
+
+    @classmethod
+    def create(cls, file_path, players, header_text = ""):
+        # writes a new store with the given Tennisplayer objects and returns it opened
+        text = header_text.encode("utf-8")
+        if HEADER.size + len(text) > HEADER_SIZE:
+            raise ValueError("Filhuvudet är för långt.")
+
+        with open(file_path, "wb") as file:
+            header = bytearray(HEADER_SIZE)
+            HEADER.pack_into(header, 0, MAGIC, VERSION, RECORD.size, len(players), len(text))
+            header[HEADER.size:HEADER.size + len(text)] = text
+            file.write(header)
+            for player in players:
+                file.write(pack_player(player))
+        return cls(file_path)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self.read(index)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        # writes changes to disk and closes the file
+        if not self.map.closed:
+            self.map.flush()
+            self.map.close()
+        self.file.close()
+
+    def offset(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError(f"Spelare {index} finns inte.")
+        return HEADER_SIZE + index * RECORD.size
+
+    def read(self, index):
+        # returns the player at index as a Tennisplayer
+        name, serve_win_prob, matches_won, matches_played = RECORD.unpack_from(self.map, self.offset(index))
+        return Tennisplayer(name.rstrip(b"\0").decode("utf-8"), serve_win_prob, matches_won, matches_played)
+
+    def read_stats(self, index):
+        # returns (matches_won, matches_played) for the player at index
+        return STATS.unpack_from(self.map, self.offset(index) + STATS_OFFSET)
+
+    def write_stats(self, index, matches_won, matches_played):
+        # overwrites the stats of a single player in place
+        STATS.pack_into(self.map, self.offset(index) + STATS_OFFSET, matches_won, matches_played)
+
+    def record_result(self, winner_index, loser_index):
+        # adds a played match to both players and a win to the winner
+        won, played = self.read_stats(winner_index)
+        self.write_stats(winner_index, won + 1, played + 1)
+        won, played = self.read_stats(loser_index)
+        self.write_stats(loser_index, won, played + 1)
+
+    def write_player(self, index, player):
+        # overwrites the whole record at index
+        self.map[self.offset(index):self.offset(index) + RECORD.size] = pack_player(player)
+        self.name_index = None
+
+    def append(self, player):
+        # adds a player at the end of the file and returns its index. The record is packed first, so a name that is too
+        # long leaves the file as it was
+        record = pack_player(player)
+        self.map.resize(HEADER_SIZE + (self.count + 1) * RECORD.size)
+        self.count += 1
+        HEADER.pack_into(self.map, 0, MAGIC, VERSION, RECORD.size, self.count, len(self.header_text.encode("utf-8")))
+        self.map[self.offset(self.count - 1):self.offset(self.count - 1) + RECORD.size] = record
+        self.name_index = None
+        return self.count - 1
+
+    def find(self, name):
+        # returns the index of the player with the given name, the name index is built on the first call
+        if self.name_index is None:
+            self.name_index = {}
+            for index in range(self.count):
+                start = self.offset(index)
+                self.name_index[bytes(self.map[start:start + NAME_SIZE]).rstrip(b"\0").decode("utf-8")] = index
+        return self.name_index[name]
+
+    def flush(self):
+        self.map.flush()
+
+
+def pack_player(player):
+    # packs a Tennisplayer into a record
+    name = player.name.encode("utf-8")
+    if len(name) > NAME_SIZE:
+        raise ValueError(f"Namnet är för långt: {player.name}")
+    return RECORD.pack(name, player.serve_win_prob, player.matches_won, player.matches_played)
+
+
+def import_text(text_path, store_path):
+    # converts a playerdata.txt file (5 header lines, then 4 lines per player) to a binary store and returns it opened
+    with open(text_path, "r", encoding = "utf-8") as file:
+        lines = file.read().splitlines()
+
+    players = []
+    for line in range(5, len(lines) - 3, 4):
+        players.append(Tennisplayer(lines[line].strip(), float(lines[line + 1]), int(lines[line + 2]), int(lines[line + 3])))
+    return PlayerStore.create(store_path, players, "\n".join(lines[:5]) + "\n")
+
+
+def export_text(store, text_path):
+    # writes the players of a store to a playerdata.txt file sorted on win percentage, in the same format as update_file
+    sorted_players = sorted(store, key = lambda p: p.win_rate(), reverse = True)
+    lines = store.header_text.splitlines()[:5]
+    for player in sorted_players:
+        lines += [player.name, f"{player.serve_win_prob}", f"{player.matches_won}", f"{player.matches_played}"]
+
+    temporary_path = text_path + ".tmp"
+    with open(temporary_path, "w", encoding = "utf-8") as file:
+        file.write("\n".join(lines)) # no blank line at the end, same as update_file
+    os.replace(temporary_path, text_path)
@@ -0,0 +1,145 @@
+""" struct-of-arrays player roster. Every stat is stored in its own typed array and players are handed out as small
+    PlayerView objects with __slots__ that behave like Tennisplayer, so they can be used by Match, ScoreDisplay and
+    PlayerDatabase.display_players. The win rate is kept as a numeric column so sorting never formats strings"""
+
+from array import array
+
+from player_store import HEADER_SIZE, RECORD
+
+
+class PlayerView:
+    # lightweight Tennisplayer-compatible view of one row in a PlayerTable
+    __slots__ = ("table", "index")
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    @property
+    def name(self):
+        return self.table.name(self.index)
+
+    @property
+    def serve_win_prob(self):
+        return self.table.serve_win_prob[self.index]
+
+    @serve_win_prob.setter
+    def serve_win_prob(self, value):
+        self.table.serve_win_prob[self.index] = value
+
+    @property
+    def matches_won(self):
+        return self.table.matches_won[self.index]
+
+    @matches_won.setter
+    def matches_won(self, value):
+        self.table.set_stats(self.index, value, self.table.matches_played[self.index])
+
+    @property
+    def matches_played(self):
+        return self.table.matches_played[self.index]
+
+    @matches_played.setter
+    def matches_played(self, value):
+        self.table.set_stats(self.index, self.table.matches_won[self.index], value)
+
+    def win_rate(self):
+        return self.table.win_rate[self.index]
+
+    def win_percentage(self):
+        # same format as Tennisplayer.win_percentage
+        if self.matches_played == 0:
+            return 0
+        return format(self.win_rate(), '.3f')
+
+    def last_name(self):
+        return self.name.strip()[2:]
+
+    def __eq__(self, other):
+        return isinstance(other, PlayerView) and other.table is self.table and other.index == self.index
+
+    def __hash__(self):
+        return hash((id(self.table), self.index))
+
+    def __repr__(self):
+        return f"PlayerView({self.name!r}, {self.serve_win_prob}, {self.matches_won}, {self.matches_played})"
+
+
+class PlayerTable:
+    # class for storing a roster as parallel typed arrays, one entry per player
+    def __init__(self):
+        self.name_data = bytearray() # all names after each other in utf-8, player i is name_data[name_end[i - 1]:name_end[i]]
+        self.name_end = array("I")
+        self.serve_win_prob = array("d")
+        self.matches_won = array("I")
+        self.matches_played = array("I")
+        self.win_rate = array("d") # matches_won / matches_played, 0 for players without matches
+
+    @classmethod
+    def from_players(cls, players):
+        # builds a table from Tennisplayer objects (e.g. PlayerDatabase.players)
+        table = cls()
+        for player in players:
+            table.append(player.name, player.serve_win_prob, player.matches_won, player.matches_played)
+        return table
+
+    @classmethod
+    def from_store(cls, store):
+        # builds a table straight from the records of a PlayerStore without creating Tennisplayer objects
+        table = cls()
+        records = store.map[HEADER_SIZE:HEADER_SIZE + len(store) * RECORD.size]
+        for name, serve_win_prob, matches_won, matches_played in RECORD.iter_unpack(records):
+            table.append(name.rstrip(b"\0").decode("utf-8"), serve_win_prob, matches_won, matches_played)
+        return table
+
+    def __len__(self):
+        return len(self.name_end)
+
+    def __getitem__(self, index):
+        if not -len(self) <= index < len(self):
+            raise IndexError(f"Spelare {index} finns inte.")
+        return PlayerView(self, index % len(self))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield PlayerView(self, index)
+
+    def append(self, name, serve_win_prob, matches_won, matches_played):
+        # adds a player and returns its index
+        self.name_data += name.encode("utf-8")
+        self.name_end.append(len(self.name_data))
+        self.serve_win_prob.append(serve_win_prob)
+        self.matches_won.append(matches_won)
+        self.matches_played.append(matches_played)
+        self.win_rate.append(matches_won / matches_played if matches_played else 0.0)
+        return len(self.name_end) - 1
+
+    def name(self, index):
+        start = self.name_end[index - 1] if index else 0
+        return self.name_data[start:self.name_end[index]].decode("utf-8")
+
+    def set_stats(self, index, matches_won, matches_played):
+        # updates the stats of a player and its win rate
+        self.matches_won[index] = matches_won
+        self.matches_played[index] = matches_played
+        self.win_rate[index] = matches_won / matches_played if matches_played else 0.0
+
+    def record_result(self, winner_index, loser_index):
+        # adds a played match to both players and a win to the winner
+        self.set_stats(winner_index, self.matches_won[winner_index] + 1, self.matches_played[winner_index] + 1)
+        self.set_stats(loser_index, self.matches_won[loser_index], self.matches_played[loser_index] + 1)
+
+    def sorted_indices(self):
+        # indices of the players sorted on win rate, best first. Ties keep the table order like sorted() in PlayerDatabase
+        return array("q", sorted(range(len(self)), key = self.win_rate.__getitem__, reverse = True))
+
+    def ranks(self):
+        # ranks[i] is the placement (1 = best) of player i
+        ranks = array("q", bytes(8 * len(self)))
+        for rank, index in enumerate(self.sorted_indices(), start = 1):
+            ranks[index] = rank
+        return ranks
+
+    def sorted_players(self):
+        # PlayerView objects in toplist order, can be used in place of PlayerDatabase.sorted_players
+        return [PlayerView(self, index) for index in self.sorted_indices()]
@@ -0,0 +1,149 @@
+""" disk-backed cache of head-to-head match win probabilities, kept in a sqlite database next to playerdata.txt.
+    Entries are keyed on the two serve probabilities, so a pairing is calculated once and then read back in every
+    later run. The cache holds at most max_entries pairings and evicts the least recently used ones. Since the key is
+    the pair of serve probabilities and not the players, an entry can never go stale: a player whose serve
+    probability changes just looks up another key. prune() is only garbage collection, it compares the serve
+    probabilities of the players with the ones seen last time and drops the entries of old probabilities that no
+    player has any more, so they don't take up space until the LRU eviction gets to them.
+
+        with ProbabilityCache("winprobabilities.sqlite") as cache:
+            cache.prune(database.players)
+            probabilities = cache.matrix(database.sorted_players)
+            probabilities[0][1] # calculated or read from disk the first time, from memory after that"""
+
+import sqlite3
+
+from match_probability import match_win_probability
+
+
+DEFAULT_PATH = "winprobabilities.sqlite"
+
+
+class ProbabilityCache:
+    # class for looking up match win probabilities in memory, then on disk and calculating them only when both miss
+    def __init__(self, file_path = DEFAULT_PATH, max_entries = 100000):
+        self.file_path = file_path
+        self.max_entries = max_entries
+        self.connection = sqlite3.connect(file_path)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS probabilities (low REAL, high REAL, probability REAL, used INTEGER,
+                                                      PRIMARY KEY (low, high)) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS probabilities_used ON probabilities (used);
+            CREATE TABLE IF NOT EXISTS players (name TEXT PRIMARY KEY, serve_win_prob REAL);
+        """)
+        self.clock = self.connection.execute("SELECT COALESCE(MAX(used), 0) FROM probabilities").fetchone()[0]
+        self.memory = {} # (low, high): probability that low beats high
+        self.used = {} # (low, high): clock value of the last lookup, written to disk by flush()
+        self.new = {} # calculated entries that aren't on disk yet
+        self.hits = self.disk_hits = self.misses = 0
+
+    def lookup(self, low, high):
+        # probability that the player with serve probability low beats the one with high, low <= high
+        key = (low, high)
+        self.clock += 1
+        self.used[key] = self.clock
+        probability = self.memory.get(key)
+        if probability is not None:
+            self.hits += 1
+            return probability
+
+        row = self.connection.execute("SELECT probability FROM probabilities WHERE low = ? AND high = ?", key).fetchone()
+        if row is not None:
+            self.disk_hits += 1
+            probability = row[0]
+        else:
+            self.misses += 1
+            probability = self.new[key] = match_win_probability(low, high)
+        self.memory[key] = probability
+        return probability
+
+    def probability(self, p1_serve_win_prob, p2_serve_win_prob):
+        # probability that a player with p1_serve_win_prob beats one with p2_serve_win_prob, the rules are the same for
+        # both players (the first server is random) so only one order of every pair is stored
+        if p1_serve_win_prob <= p2_serve_win_prob:
+            return self.lookup(p1_serve_win_prob, p2_serve_win_prob)
+        return 1 - self.lookup(p2_serve_win_prob, p1_serve_win_prob)
+
+    def head_to_head(self, player1, player2):
+        # probability that player1 beats player2
+        return self.probability(player1.serve_win_prob, player2.serve_win_prob)
+
+    def matrix(self, players):
+        # LazyWinMatrix over players, rows are looked up the first time they are used
+        return LazyWinMatrix(players, self)
+
+    def prune(self, players):
+        # drops the entries of serve probabilities that changed since the last prune and no player has any more, returns
+        # those serve probabilities. Only frees space, lookups are correct without it
+        current = {player.name: player.serve_win_prob for player in players}
+        stored = dict(self.connection.execute("SELECT name, serve_win_prob FROM players"))
+        in_use = set(current.values())
+        stale = {serve_win_prob for name, serve_win_prob in stored.items()
+                 if current.get(name) != serve_win_prob and serve_win_prob not in in_use}
+
+        with self.connection:
+            for serve_win_prob in stale:
+                self.connection.execute("DELETE FROM probabilities WHERE low = ? OR high = ?", (serve_win_prob, serve_win_prob))
+            self.connection.execute("DELETE FROM players")
+            self.connection.executemany("INSERT INTO players VALUES (?, ?)", current.items())
+
+        for key in [key for key in self.memory if key[0] in stale or key[1] in stale]:
+            del self.memory[key]
+            self.used.pop(key, None)
+            self.new.pop(key, None)
+        return stale
+
+    def flush(self):
+        # writes new entries and lookup times to disk and evicts the least recently used entries above max_entries
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO probabilities VALUES (?, ?, ?, ?)",
+                                        [(low, high, probability, self.used[(low, high)])
+                                         for (low, high), probability in self.new.items()])
+            self.connection.executemany("UPDATE probabilities SET used = ? WHERE low = ? AND high = ?",
+                                        [(used, low, high) for (low, high), used in self.used.items()
+                                         if (low, high) not in self.new])
+            excess = self.connection.execute("SELECT COUNT(*) FROM probabilities").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self.connection.execute("DELETE FROM probabilities WHERE (low, high) IN "
+                                        "(SELECT low, high FROM probabilities ORDER BY used LIMIT ?)", (excess,))
+        self.new.clear()
+        self.used.clear()
+        if len(self.memory) > self.max_entries:
+            self.memory.clear()
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class LazyWinMatrix:
+    # matrix[i][j] is the probability that players[i] beats players[j] with the diagonal at 0.5, like
+    # win_probability_matrix, but a row is only looked up in the cache when it is first used
+    def __init__(self, players, cache):
+        self.players = list(players)
+        self.cache = cache
+        self.rows = [None] * len(self.players)
+
+    def __len__(self):
+        return len(self.players)
+
+    def __getitem__(self, i):
+        row = self.rows[i]
+        if row is None:
+            player1 = self.players[i]
+            row = self.rows[i] = [0.5 if player1 is player2 else self.cache.head_to_head(player1, player2)
+                                  for player2 in self.players]
+        return row
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def tolist(self):
+        # every row as a plain list of lists, e.g. to send to other processes
+        return [list(row) for row in self]
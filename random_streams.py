@@ -0,0 +1,59 @@
+""" reproducible random number streams for simulations. A RandomStreams object is created from one seed and hands out
+    independent generators for keys like (match number,) or (batch number, worker number). The seed of every stream
+    is a hash of the root seed and the key, so the stream for a key is the same no matter which process asks for it
+    or in which order, and a run split over any number of workers gives bit-identical results"""
+
+import os
+import random
+import struct
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+from scoring import ScoringCore
+
+
+def derive_seed(seed, *key):
+    # 64-bit seed for the stream with the given key (non-negative integers) under seed
+    data = struct.pack(f"<{len(key) + 1}Q", seed % 2**64, *key)
+    return int.from_bytes(hashlib.blake2b(data, digest_size = 8).digest(), "little")
+
+
+class RandomStreams:
+    # class for deriving independent, seedable random streams from one root seed
+    def __init__(self, seed = None):
+        # without a seed a random root seed is drawn, it is kept in self.seed so the run can be repeated
+        self.seed = seed if seed is not None else int.from_bytes(os.urandom(8), "little")
+
+    def stream(self, *key):
+        # random.Random for the key, can be passed as rng to Match and ScoringCore
+        return random.Random(derive_seed(self.seed, *key))
+
+    def numpy_stream(self, *key):
+        # numpy Generator for the key, can be passed as seed to BatchMatch.simulate_matches
+        import numpy as np
+        return np.random.default_rng(np.random.SeedSequence(self.seed % 2**64, spawn_key = key))
+
+    def spawn(self, *key):
+        # child RandomStreams, e.g. one per tournament repetition with its own streams per match
+        return RandomStreams(derive_seed(self.seed, *key))
+
+
+def play_match_range(player1, player2, seed, start, stop):
+    # plays matches start to stop - 1, match i with stream (i,), returns a bytearray with 1 where player1 won
+    streams = RandomStreams(seed)
+    player1_won = bytearray(stop - start)
+    for i in range(start, stop):
+        player1_won[i - start] = ScoringCore(player1, player2, rng = streams.stream(i)).play_match() is player1
+    return player1_won
+
+
+def simulate_matches_parallel(player1, player2, n_matches, seed, workers = None, chunk_size = 10000):
+    # plays n_matches matches over a process pool, the result only depends on seed and not on workers or chunk_size
+    chunks = [(start, min(start + chunk_size, n_matches)) for start in range(0, n_matches, chunk_size)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(chunks) <= 1:
+        results = [play_match_range(player1, player2, seed, start, stop) for start, stop in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers = workers) as pool:
+            results = pool.map(play_match_range, *zip(*[(player1, player2, seed, start, stop) for start, stop in chunks]))
+    return bytearray().join(results)
@@ -0,0 +1,201 @@
+""" streaming import of played match results into the player file. The result files are read line by line through a
+    chain of generators, player names are looked up in a dict over the names of the players, and the wins and played
+    matches are added up per player, so memory use only depends on the number of players and not on the number of
+    results. The sums are added to the stats in one pass and saved with one update_file(). Example:
+
+        python result_import.py results2023.csv results2024.jsonl.gz
+
+    csv files have one match per line, "winner,loser", optionally with a header line that names the winner and loser
+    columns. jsonl files have one object per line, {"winner": ..., "loser": ...}. Files ending in .gz are decompressed
+    while reading. Names are matched exactly first and then case insensitive, results with an unknown player or a
+    malformed line are counted and skipped. A file that can't be read or decoded (not utf-8, a broken .gz) stops the
+    import before anything is saved, with the path of the file in the error. Importing the same file twice counts its
+    matches twice"""
+
+import sys
+import csv
+import gzip
+import json
+import zlib
+import argparse
+import contextlib
+
+
+MAX_UNKNOWN_NAMES = 10 # unknown names kept for the report
+
+
+class ImportStats:
+    # counts of what happened to the lines of the result files
+    def __init__(self):
+        self.lines = 0
+        self.imported = 0
+        self.malformed = 0
+        self.unknown = 0
+        self.unknown_names = [] # the first MAX_UNKNOWN_NAMES unknown names
+
+    def add_unknown(self, name):
+        self.unknown += 1
+        if len(self.unknown_names) < MAX_UNKNOWN_NAMES and name not in self.unknown_names:
+            self.unknown_names.append(name)
+
+    def report(self, file = sys.stdout):
+        print(f"Importerade {self.imported} matcher från {self.lines} rader.", file = file)
+        if self.malformed:
+            print(f"{self.malformed} felaktiga rader hoppades över.", file = file)
+        if self.unknown:
+            print(f"{self.unknown} matcher med okända spelare hoppades över, t.ex. {', '.join(self.unknown_names)}", file = file)
+
+
+def open_results(file_path):
+    # opens a result file as text, .gz files are decompressed
+    if file_path.endswith(".gz"):
+        return gzip.open(file_path, "rt", encoding = "utf-8", newline = "")
+    return open(file_path, "r", encoding = "utf-8", newline = "")
+
+
+@contextlib.contextmanager
+def reading(file_path):
+    # opens a result file like open_results, an error from opening, reading or decoding it while the block runs is
+    # raised again as an OSError that names the file. gzip.BadGzipFile is an OSError, a truncated .gz gives EOFError
+    # and a corrupt one zlib.error
+    try:
+        with open_results(file_path) as file:
+            yield file
+    except (OSError, UnicodeDecodeError, EOFError, zlib.error) as error:
+        raise OSError(f"Kunde inte läsa {file_path}: {error}") from error
+
+
+def is_jsonl(file_path):
+    return file_path.removesuffix(".gz").endswith((".jsonl", ".ndjson"))
+
+
+def csv_results(file, stats):
+    # (winner name, loser name) for every line of a csv file
+    winner_column, loser_column = 0, 1
+    for line_number, row in enumerate(csv.reader(file)):
+        stats.lines += 1
+        if line_number == 0:
+            columns = [field.strip().lower() for field in row]
+            if "winner" in columns and "loser" in columns: # header line
+                winner_column, loser_column = columns.index("winner"), columns.index("loser")
+                stats.lines -= 1
+                continue
+        try:
+            yield row[winner_column], row[loser_column]
+        except IndexError:
+            if "".join(row).strip():
+                stats.malformed += 1
+            else:
+                stats.lines -= 1 # blank line
+
+
+def jsonl_results(file, stats):
+    # (winner name, loser name) for every line of a jsonl file
+    for line in file:
+        if not line.strip():
+            continue
+        stats.lines += 1
+        try:
+            result = json.loads(line)
+            winner, loser = result["winner"], result["loser"]
+        except (ValueError, KeyError, TypeError):
+            stats.malformed += 1
+            continue
+        if isinstance(winner, str) and isinstance(loser, str):
+            yield winner, loser
+        else:
+            stats.malformed += 1
+
+
+def read_results(file_paths, stats):
+    # (winner name, loser name) for every result in the files, one file open at a time
+    for file_path in file_paths:
+        with reading(file_path) as file:
+            yield from (jsonl_results if is_jsonl(file_path) else csv_results)(file, stats)
+
+
+class NameIndex:
+    # hash index from player name to position in players, exact names first and then case insensitive
+    def __init__(self, players):
+        self.exact = {player.name: i for i, player in enumerate(players)}
+        self.folded = {}
+        for i, player in enumerate(players):
+            self.folded.setdefault(player.name.strip().lower(), i)
+
+    def find(self, name):
+        # position of the player, None if there is no player with that name
+        i = self.exact.get(name)
+        if i is None:
+            i = self.folded.get(name.strip().lower())
+        return i
+
+
+def resolve(results, index, stats):
+    # (winner position, loser position) for the results where both players are known
+    find = index.find
+    for winner_name, loser_name in results:
+        winner, loser = find(winner_name), find(loser_name)
+        if winner is None or loser is None:
+            for name, i in ((winner_name, winner), (loser_name, loser)):
+                if i is None:
+                    stats.add_unknown(name)
+                    break
+            continue
+        if winner == loser:
+            stats.malformed += 1
+            continue
+        yield winner, loser
+
+
+def aggregate(resolved, n_players, stats):
+    # adds up (wins, played matches) per player position
+    won = [0] * n_players
+    played = [0] * n_players
+    for winner, loser in resolved:
+        won[winner] += 1
+        played[winner] += 1
+        played[loser] += 1
+        stats.imported += 1
+    return won, played
+
+
+def import_results(database, file_paths, save = True):
+    # adds the results in file_paths to the players of a loaded PlayerDatabase, saves with one update_file() when
+    # save is True and returns the ImportStats
+    stats = ImportStats()
+    players = database.players
+    resolved = resolve(read_results(file_paths, stats), NameIndex(players), stats)
+    won, played = aggregate(resolved, len(players), stats)
+
+    for player, matches_won, matches_played in zip(players, won, played):
+        player.matches_won += matches_won
+        player.matches_played += matches_played
+    if save and stats.imported:
+        database.update_file()
+    else:
+        database.sorted_players = sorted(players, key = lambda p: p.win_rate(), reverse = True)
+    return stats
+
+
+def main(argv = None):
+    from player_database import PlayerDatabase
+
+    parser = argparse.ArgumentParser(description = "Importera spelade matcher från csv- eller jsonl-filer till spelarfilen.")
+    parser.add_argument("results", nargs = "+", help = "resultatfiler, .csv eller .jsonl (även .gz)")
+    parser.add_argument("--file", default = "playerdata.txt", help = "spelarfil")
+    parser.add_argument("--dry-run", action = "store_true", help = "läs och räkna men spara inget")
+    arguments = parser.parse_args(argv)
+
+    database = PlayerDatabase(arguments.file)
+    database.load_players()
+    try:
+        stats = import_results(database, arguments.results, save = not arguments.dry_run)
+    except OSError as error:
+        print(error, file = sys.stderr)
+        return 2
+    stats.report()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,272 @@
+""" scoring core for simulated matches. ScoringCore plays points, games, sets and matches with the same rules as
+    Match and emits typed events to subscribers. A subscriber is any object with one or more of the methods
+    match_started, server_changed, game_started, point_won, game_won, set_won and match_won, each taking the event.
+    A subscriber that only wants some of the events it has methods for lists their names in handled_events.
+    Printing, sleeping and the gui are all subscribers (see ConsoleOutput and ScoreDisplaySubscriber in tennis3).
+    Events nobody subscribes to are never built, and when nobody follows the sets, games or points play_match runs
+    the flat transition table of the match format without any events in it. The rules come from a MatchFormat
+    (match_format.py), CLASSIC by default"""
+
+import random
+
+from match_format import CLASSIC, compile_format, set_result
+
+
+POINT_NAMES = ["0", "15", "30", "40", "Ad"] # tennis point system
+
+
+class MatchStarted:
+    __slots__ = ("player1", "player2", "server")
+    handler = "match_started"
+
+    def __init__(self, player1, player2, server):
+        self.player1 = player1
+        self.player2 = player2
+        self.server = server
+
+
+class ServerChanged:
+    __slots__ = ("server", "receiver")
+    handler = "server_changed"
+
+    def __init__(self, server, receiver):
+        self.server = server
+        self.receiver = receiver
+
+
+class GameStarted:
+    __slots__ = ("server", "receiver", "games_p1", "games_p2")
+    handler = "game_started"
+
+    def __init__(self, server, receiver, games_p1, games_p2):
+        self.server = server
+        self.receiver = receiver
+        self.games_p1 = games_p1
+        self.games_p2 = games_p2
+
+
+class PointWon:
+    # points are counted 0-4 (0, 15, 30, 40, Ad), after a lost Ad-point the score goes back to 3-3. In a tiebreak
+    # they are counted 0, 1, 2, ... and server is the player who served its first point
+    __slots__ = ("winner", "server", "receiver", "points_server", "points_receiver", "game_over", "tiebreak")
+    handler = "point_won"
+
+    def __init__(self, winner, server, receiver, points_server, points_receiver, game_over, tiebreak = False):
+        self.winner = winner
+        self.server = server
+        self.receiver = receiver
+        self.points_server = points_server
+        self.points_receiver = points_receiver
+        self.game_over = game_over
+        self.tiebreak = tiebreak
+
+
+class GameWon:
+    # games_p1/games_p2 are the game score of the set after this game, deciding_game is True for the game at 6-6
+    __slots__ = ("winner", "server", "receiver", "games_p1", "games_p2", "deciding_game", "tiebreak")
+    handler = "game_won"
+
+    def __init__(self, winner, server, receiver, games_p1, games_p2, deciding_game, tiebreak = False):
+        self.winner = winner
+        self.server = server
+        self.receiver = receiver
+        self.games_p1 = games_p1
+        self.games_p2 = games_p2
+        self.deciding_game = deciding_game
+        self.tiebreak = tiebreak
+
+
+class SetWon:
+    __slots__ = ("winner", "games_p1", "games_p2", "sets_p1", "sets_p2")
+    handler = "set_won"
+
+    def __init__(self, winner, games_p1, games_p2, sets_p1, sets_p2):
+        self.winner = winner
+        self.games_p1 = games_p1
+        self.games_p2 = games_p2
+        self.sets_p1 = sets_p1
+        self.sets_p2 = sets_p2
+
+
+class MatchWon:
+    __slots__ = ("winner", "sets_p1", "sets_p2")
+    handler = "match_won"
+
+    def __init__(self, winner, sets_p1, sets_p2):
+        self.winner = winner
+        self.sets_p1 = sets_p1
+        self.sets_p2 = sets_p2
+
+
+EVENTS = [MatchStarted, ServerChanged, GameStarted, PointWon, GameWon, SetWon, MatchWon]
+
+
+def point_names(event):
+    # the point score of a PointWon as shown to the user, (server, receiver)
+    if event.tiebreak:
+        return f"{event.points_server}", f"{event.points_receiver}"
+    return POINT_NAMES[event.points_server], POINT_NAMES[event.points_receiver]
+
+
+class ScoringCore:
+    """ class that plays a match between player1 and player2 and tells its subscribers what happens. The rules come
+        from match_format, by default the ones of Match: games to 4 points with 2 points lead, sets to 6 games with
+        2 games lead and a deciding game at 6-6, best of 3 sets with a random first server who serves first in every
+        set. Who wins a game or a set and who serves next is looked up in the compiled transition tables"""
+    fast_path = True # subclasses that decide points or servers some other way (e.g. ReplayCore) set this to False
+
+    def __init__(self, player1, player2, subscribers = (), rng = random, match_format = None):
+        # rng is anything with a random() method, the random module by default
+        self.player1 = player1
+        self.player2 = player2
+        self.rng = rng
+        self.match_format = match_format if match_format is not None else CLASSIC
+        self.tables = compile_format(self.match_format)
+        self.subscribers = []
+        self.handlers = {event: [] for event in EVENTS}
+        for subscriber in subscribers:
+            self.subscribe(subscriber)
+
+        self.reset()
+
+    def reset(self):
+        # clears the score, so the core can play a new game, set or match as if it was just created
+        self.games = {self.player1: 0, self.player2: 0}
+        self.last_server = None
+        self.next_set_server = None
+
+    def subscribe(self, subscriber):
+        # adds a subscriber, only the event methods it has are called, and of those only the ones in its
+        # handled_events if it has that attribute
+        self.subscribers.append(subscriber)
+        handled_events = getattr(subscriber, "handled_events", None)
+        for event in EVENTS:
+            if handled_events is not None and event.handler not in handled_events:
+                continue
+            handler = getattr(subscriber, event.handler, None)
+            if handler is not None:
+                self.handlers[event].append(handler)
+
+    def emit(self, event):
+        for handler in self.handlers[type(event)]:
+            handler(event)
+
+    def play_point(self, server, receiver):
+        # plays a point, returns the winner
+        return server if self.rng.random() < server.serve_win_prob else receiver
+
+    def play_game(self, server, receiver, game = None, deciding_game = None):
+        # plays a game and adds it to the game score of the set, returns the winner. game is the GameTable to play
+        # (a normal game by default), server serves its first point
+        games = self.games
+        if game is None:
+            game = self.tables.set.games[0]
+        if deciding_game is None:
+            deciding_game = games[self.player1] == games[self.player2] == self.match_format.games_per_set
+        handlers = self.handlers
+        if server is not self.last_server:
+            self.last_server = server
+            if handlers[ServerChanged]:
+                self.emit(ServerChanged(server, receiver))
+        if handlers[GameStarted]:
+            self.emit(GameStarted(server, receiver, games[self.player1], games[self.player2]))
+
+        point_handlers = handlers[PointWon]
+        serving = game.serving
+        next_server = game.next_a
+        next_receiver = game.next_b
+        tiebreak = game.tiebreak
+        state = game.start
+        points_server = points_receiver = 0
+        # the point is drawn here like play_point does, unless a subclass decides points some other way
+        draw = self.rng.random if self.fast_path else None
+        server_prob = server.serve_win_prob
+        receiver_prob = receiver.serve_win_prob
+        while True:
+            if draw is None:
+                winner = self.play_point(server, receiver) if serving[state] == 0 else self.play_point(receiver, server)
+            elif serving[state] == 0:
+                winner = server if draw() < server_prob else receiver
+            else:
+                winner = receiver if draw() < receiver_prob else server
+            if winner is server:
+                points_server += 1
+                state = next_server[state]
+            else:
+                points_receiver += 1
+                state = next_receiver[state]
+
+            # handles case of lost Ad-point
+            if points_server == 4 and points_receiver == 4 and not tiebreak:
+                points_server = points_receiver = 3
+
+            game_over = state < 0
+            if point_handlers:
+                self.emit(PointWon(winner, server, receiver, points_server, points_receiver, game_over, tiebreak))
+            if game_over:
+                break
+
+        games[winner] += 1
+        if handlers[GameWon]:
+            self.emit(GameWon(winner, server, receiver, games[self.player1], games[self.player2], deciding_game, tiebreak))
+        return winner
+
+    def play_set(self, server, receiver, sets_p1 = 0, sets_p2 = 0):
+        # plays a set, returns the winner and the game score {player: games}. Who serves the first game of the next
+        # set is left in self.next_set_server
+        self.games = games = {self.player1: 0, self.player2: 0}
+        set_table = self.tables.set_table(sets_p1, sets_p2)
+
+        state = set_table.start
+        while state >= 0:
+            if set_table.serving[state] == 0:
+                winner = self.play_game(server, receiver, set_table.games[state], set_table.deciding[state])
+            else:
+                winner = self.play_game(receiver, server, set_table.games[state], set_table.deciding[state])
+            state = set_table.next_a[state] if winner is server else set_table.next_b[state]
+
+        next_server = set_result(state)[1]
+        self.next_set_server = server if next_server == 0 else receiver
+        if winner is self.player1:
+            sets_p1 += 1
+        else:
+            sets_p2 += 1
+        if self.handlers[SetWon]:
+            self.emit(SetWon(winner, games[self.player1], games[self.player2], sets_p1, sets_p2))
+        return winner, games
+
+    def play_match(self):
+        # plays a match, returns the winner
+        player1_serves_first = self.player1_serves_first()
+        server, receiver = (self.player1, self.player2) if player1_serves_first else (self.player2, self.player1)
+        self.last_server = server
+        self.emit(MatchStarted(self.player1, self.player2, server))
+
+        if self.fast_path and not any(self.handlers[event] for event in (ServerChanged, GameStarted, PointWon, GameWon, SetWon)):
+            # nobody follows the match as it goes on
+            sets_p1, sets_p2 = self.play_sets_fast(player1_serves_first)
+        else:
+            sets_to_win = self.match_format.sets_to_win
+            alternate = self.match_format.serve_order == "alternate"
+            set_server = server
+            sets_won = {self.player1: 0, self.player2: 0}
+            while sets_won[self.player1] < sets_to_win and sets_won[self.player2] < sets_to_win:
+                set_receiver = self.player2 if set_server is self.player1 else self.player1
+                winner, _ = self.play_set(set_server, set_receiver, sets_won[self.player1], sets_won[self.player2])
+                sets_won[winner] += 1
+                if alternate:
+                    set_server = self.next_set_server
+            sets_p1, sets_p2 = sets_won[self.player1], sets_won[self.player2]
+
+        winner = self.player1 if sets_p1 > sets_p2 else self.player2
+        self.emit(MatchWon(winner, sets_p1, sets_p2))
+        return winner
+
+    def player1_serves_first(self):
+        # randomize first server
+        return self.rng.random() < 0.5
+
+    def play_sets_fast(self, player1_serves_first):
+        # plays the sets of a match on the flat transition table, with the same random numbers as play_set but without
+        # events, returns sets won
+        return self.tables.play(self.player1.serve_win_prob, self.player2.serve_win_prob, self.rng.random, player1_serves_first)
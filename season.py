@@ -0,0 +1,229 @@
+""" season simulation: plays every match of a schedule with the stats kept in memory, for one season or many
+    seasons in parallel, and counts where every player finishes in the toplist and with which win percentage.
+    The toplist is ordered like PlayerDatabase.sorted_players, on matches won / matches played including the stats
+    from before the season. Nothing is written to playerdata.txt unless write_back() is called, which stores the
+    stats after the first season with one update_file(). Example:
+
+        python season.py --rounds 2 --seasons 10000 --seed 1          what-if run, prints the distributions
+        python season.py --schedule schedule.csv --save               plays the season once and saves the stats
+
+    a schedule file has one match per line, "player 1,player 2", with the names as in the player file"""
+
+import os
+import csv
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from match_probability import win_probability_matrix
+from random_streams import RandomStreams
+from scoring import ScoringCore
+
+
+CHUNK_SIZE = 100 # seasons per pool task
+WIN_RATE_BINS = 1000 # win percentages are counted in steps of 0.1 %
+
+
+def round_robin_schedule(n_players, rounds = 1):
+    # every player meets every other player rounds times, as (player index, player index)
+    return [(i, j) if round_number % 2 == 0 else (j, i)
+            for round_number in range(rounds) for i in range(n_players) for j in range(i + 1, n_players)]
+
+
+def load_schedule(file_path, players):
+    # reads a schedule file with one match per line, "player 1,player 2", returns (player index, player index)
+    indices = {player.name.lower(): i for i, player in enumerate(players)}
+    schedule = []
+    with open(file_path, "r", encoding = "utf-8", newline = "") as file:
+        for line_number, row in enumerate(csv.reader(file), start = 1):
+            if not row or not "".join(row).strip():
+                continue
+            if len(row) != 2:
+                raise ValueError(f"Rad {line_number} i {file_path}: ange två spelare")
+            for name in row:
+                if name.strip().lower() not in indices:
+                    raise ValueError(f"Rad {line_number} i {file_path}: spelaren hittades inte: {name.strip()}")
+            player1, player2 = (indices[name.strip().lower()] for name in row)
+            if player1 == player2:
+                raise ValueError(f"Rad {line_number} i {file_path}: en spelare kan inte spela mot sig själv")
+            schedule.append((player1, player2))
+    return schedule
+
+
+def toplist_order(matches_won, matches_played):
+    # player indices in toplist order, same order as sorting on Tennisplayer.win_rate()
+    return sorted(range(len(matches_won)), key = lambda i: -(matches_won[i] / matches_played[i]) if matches_played[i] else 0.0)
+
+
+def play_season(schedule, matches_won, rng, probabilities = None, players = None, match_format = None):
+    # plays the schedule once and adds the wins to matches_won. The winners are drawn from probabilities (a win
+    # probability matrix) or, when it is None, every match is played point by point with ScoringCore
+    for player1, player2 in schedule:
+        if probabilities is not None:
+            player1_won = rng.random() < probabilities[player1][player2]
+        else:
+            player1_won = ScoringCore(players[player1], players[player2], rng = rng, match_format = match_format).play_match() is players[player1]
+        matches_won[player1 if player1_won else player2] += 1
+
+
+def play_seasons(schedule, start_won, end_played, first_season, n_seasons, seed, probabilities, players, match_format):
+    # plays seasons first_season to first_season + n_seasons - 1, season s with stream (s,), runs in the worker
+    # processes. Returns the position counts, the win percentage histograms and the stats after first_season
+    streams = RandomStreams(seed)
+    n = len(start_won)
+    position_counts = [[0] * (n + 1) for _ in range(n)]
+    win_rate_counts = [[0] * (WIN_RATE_BINS + 1) for _ in range(n)]
+    first_won = None
+
+    for season in range(first_season, first_season + n_seasons):
+        matches_won = list(start_won)
+        play_season(schedule, matches_won, streams.stream(season), probabilities, players, match_format)
+        if season == first_season:
+            first_won = matches_won
+        for position, i in enumerate(toplist_order(matches_won, end_played), start = 1):
+            position_counts[i][position] += 1
+        for i in range(n):
+            if end_played[i]:
+                win_rate_counts[i][round(matches_won[i] / end_played[i] * WIN_RATE_BINS)] += 1
+    return position_counts, win_rate_counts, first_won
+
+
+class SeasonResult:
+    # class for storing the distributions over all simulated seasons and the stats after the first one
+    def __init__(self, players, position_counts, win_rate_counts, first_season_won, matches_played, seasons):
+        self.players = players
+        self.position_counts = position_counts # position_counts[i][position] for players[i]
+        self.win_rate_counts = win_rate_counts # win_rate_counts[i][bin], bin = win percentage * WIN_RATE_BINS
+        self.first_season_won = first_season_won
+        self.matches_played = matches_played # after the season, the same in every season
+        self.seasons = seasons
+
+    def position_probabilities(self):
+        # {player name: {position: probability}}
+        return {player.name: {position: self.position_counts[i][position] / self.seasons
+                              for position in range(1, len(self.players) + 1)}
+                for i, player in enumerate(self.players)}
+
+    def win_rate_quantile(self, i, quantile):
+        # the win percentage of players[i] that quantile of the seasons ended at or below
+        target = quantile * self.seasons
+        seen = 0
+        for bin_number, count in enumerate(self.win_rate_counts[i]):
+            seen += count
+            if seen >= target and seen:
+                return bin_number / WIN_RATE_BINS
+        return 0.0
+
+    def mean_win_rate(self, i):
+        return sum(bin_number * count for bin_number, count in enumerate(self.win_rate_counts[i])) / WIN_RATE_BINS / self.seasons
+
+    def expected_position(self, i):
+        return sum(position * count for position, count in enumerate(self.position_counts[i])) / self.seasons
+
+    def display(self):
+        # presents the players in order of expected finishing position
+        print("\n" + 82*"=" + "\n" + "Placering Namn                    Snittplats  Etta   Andel vunna (5 % - 95 %)" + "\n" + 82*"=")
+        order = sorted(range(len(self.players)), key = self.expected_position)
+        for place, i in enumerate(order, start = 1):
+            player = self.players[i]
+            print(f"{place:^9} {player.name:24} {self.expected_position(i):>8.1f} {self.position_counts[i][1] / self.seasons:>7.3f}"
+                  f"   {self.mean_win_rate(i):.3f} ({self.win_rate_quantile(i, 0.05):.3f} - {self.win_rate_quantile(i, 0.95):.3f})")
+
+    def write_back(self, database):
+        # stores the stats after the first season in the players of database and saves them with one update_file()
+        for player, matches_won, matches_played in zip(self.players, self.first_season_won, self.matches_played):
+            player.matches_won = matches_won
+            player.matches_played = matches_played
+        database.update_file()
+
+
+class Season:
+    """ class that plays a schedule between players many times, with the stats in memory. The seasons are spread over a
+        process pool in chunks like Tournament, and season s always uses random stream (s,) so the result only depends
+        on the seed. With match_format = None the match winners are drawn from the exact probabilities in
+        match_probability, otherwise every match is played point by point in that format"""
+    def __init__(self, players, schedule, match_format = None, cache = None):
+        # players are Tennisplayer objects (e.g. PlayerDatabase.players), schedule is (index, index) pairs into players
+        self.players = list(players)
+        self.schedule = list(schedule)
+        self.match_format = match_format
+        self.cache = cache # ProbabilityCache for the win probabilities
+
+    def simulate(self, seasons = 1, workers = None, seed = None):
+        # plays the schedule seasons times and returns a SeasonResult
+        if seasons < 1:
+            raise ValueError("Antal säsonger måste vara minst 1.")
+        seed = RandomStreams(seed).seed
+        start_won = [player.matches_won for player in self.players]
+        end_played = [player.matches_played for player in self.players]
+        for player1, player2 in self.schedule:
+            end_played[player1] += 1
+            end_played[player2] += 1
+
+        if self.match_format is None:
+            probabilities, players = win_probability_matrix(self.players, self.cache), None
+        else:
+            probabilities, players = None, self.players
+        chunks = [(self.schedule, start_won, end_played, start, min(CHUNK_SIZE, seasons - start), seed,
+                   probabilities, players, self.match_format) for start in range(0, seasons, CHUNK_SIZE)]
+
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(chunks) == 1:
+            results = [play_seasons(*chunk) for chunk in chunks]
+        else:
+            with ProcessPoolExecutor(max_workers = workers) as pool:
+                results = list(pool.map(play_seasons, *zip(*chunks)))
+
+        n = len(self.players)
+        position_counts = [[0] * (n + 1) for _ in range(n)]
+        win_rate_counts = [[0] * (WIN_RATE_BINS + 1) for _ in range(n)]
+        for chunk_positions, chunk_win_rates, _ in results:
+            for i in range(n):
+                for position, count in enumerate(chunk_positions[i]):
+                    position_counts[i][position] += count
+                for bin_number, count in enumerate(chunk_win_rates[i]):
+                    win_rate_counts[i][bin_number] += count
+        return SeasonResult(self.players, position_counts, win_rate_counts, results[0][2], end_played, seasons)
+
+
+def main(argv = None):
+    from player_database import PlayerDatabase
+    from match_format import FORMATS
+
+    parser = argparse.ArgumentParser(description = "Simulera en hel säsong, en gång eller många gånger.")
+    parser.add_argument("--schedule", help = "spelschema, en match per rad: spelare 1,spelare 2")
+    parser.add_argument("--rounds", type = int, default = 1, help = "utan schema: alla möter alla så här många gånger")
+    parser.add_argument("-n", "--seasons", type = int, default = 1, help = "antal säsonger (standard 1)")
+    parser.add_argument("-s", "--seed", type = int, default = None, help = "seed för slumptalen")
+    parser.add_argument("-w", "--workers", type = int, default = None, help = "antal processer")
+    parser.add_argument("--format", choices = sorted(FORMATS), help = "spela varje match poäng för poäng i detta format")
+    parser.add_argument("--save", action = "store_true", help = "spara statistiken efter säsongen (bara med en säsong)")
+    parser.add_argument("--file", default = "playerdata.txt", help = "spelarfil")
+    arguments = parser.parse_args(argv)
+    if arguments.seasons < 1:
+        print("Antal säsonger måste vara minst 1.", file = sys.stderr)
+        return 2
+    if arguments.save and arguments.seasons != 1:
+        print("--save kan bara användas när en säsong spelas.", file = sys.stderr)
+        return 2
+
+    database = PlayerDatabase(arguments.file)
+    database.load_players()
+    try:
+        schedule = load_schedule(arguments.schedule, database.players) if arguments.schedule else \
+                   round_robin_schedule(len(database.players), arguments.rounds)
+    except (OSError, ValueError) as error:
+        print(error, file = sys.stderr)
+        return 2
+
+    match_format = FORMATS[arguments.format] if arguments.format else None
+    result = Season(database.players, schedule, match_format).simulate(arguments.seasons, arguments.workers, arguments.seed)
+    result.display()
+    if arguments.save:
+        result.write_back(database)
+        database.display_players()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
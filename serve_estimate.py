@@ -0,0 +1,290 @@
+""" estimates serve_win_prob for the players from logs of played points or service games and writes the values back
+    through PlayerDatabase. The logs are read in chunks and summed with numpy into one table of points won and played
+    per (server, receiver) pair, so memory only depends on the number of players. Example:
+
+        python serve_estimate.py points2024.csv --half-life 180 --adjust
+
+    Log files are csv with a header line or jsonl, optionally .gz, with the columns
+        server, receiver, won                               one point, won is 1 if the server won it
+        server, receiver, points_won, points_played         a service game or any other sum of points
+    and an optional date column (YYYY-MM-DD). Names are matched like in result_import.py, lines with unknown players
+    are counted and skipped.
+
+    The estimate is the share of serve points won, pulled towards the average of all players by prior_points points
+    so players with few points don't get extreme values. With half_life (days) every point counts half as much per
+    half_life before the newest date (or as_of). With adjust the estimate is corrected for the strength of the
+    receivers, from a logistic model fitted to the pair table: logit P(server i wins a point against j) =
+    a + serve[i] - return[j], and the new value is the probability against an average receiver"""
+
+import sys
+import csv
+import json
+import math
+import argparse
+from itertools import islice
+from operator import itemgetter
+from datetime import date
+
+import numpy as np
+
+from result_import import NameIndex, reading, is_jsonl
+
+
+CHUNK_SIZE = 4096 # log lines converted and summed at a time
+DECIMALS = 3 # decimals of the values written to the player file
+COLUMNS = ("server", "receiver", "date", "won", "points_won", "points_played")
+
+
+class Lookup(dict):
+    # cache of name or date text: number, the value is computed by function the first time a key is seen
+    def __init__(self, function):
+        super().__init__()
+        self.function = function
+
+    def __missing__(self, key):
+        value = self[key] = self.function(key)
+        return value
+
+
+def parse_day(text):
+    return date.fromisoformat(text.strip()).toordinal()
+
+
+class PointTable:
+    """ weighted points won and played per (server, receiver) pair, summed from log lines. A chunk of lines is
+        converted column by column to numpy arrays and added with bincount; a chunk with a line that can't be
+        converted is added line by line instead, so only the bad lines are skipped. With half_life the weights are
+        2 ** ((day - newest day so far) / half_life), at most 1 so they can't overflow however long the logs are. When
+        a later day turns up the sums are scaled down to it, so the logs don't have to be sorted or read twice"""
+    def __init__(self, players, half_life = None):
+        self.players = list(players)
+        self.half_life = half_life
+        n = len(self.players)
+        self.won = np.zeros(n * n)
+        self.played = np.zeros(n * n)
+        self.last_day = None
+        self.lines = 0
+        self.malformed = 0
+        self.unknown = 0
+        index = NameIndex(self.players)
+        self.names = Lookup(lambda name: -1 if (i := index.find(name)) is None else i) # -1 for unknown players
+        self.days = Lookup(parse_day) # dates and numbers repeat a lot in logs
+        self.values = Lookup(float)
+
+    def numbers(self, column):
+        # a column of whole numbers as a float array, raises ValueError for anything else
+        values = np.array(list(map(self.values.__getitem__, column)), dtype = float)
+        if not np.all(values == np.floor(values)):
+            raise ValueError("inte ett heltal")
+        return values
+
+    def add_columns(self, columns, count):
+        # adds count lines given as {column name: list of values}, raises on a value that can't be converted
+        servers = np.array(list(map(self.names.__getitem__, columns["server"])), dtype = np.int64)
+        receivers = np.array(list(map(self.names.__getitem__, columns["receiver"])), dtype = np.int64)
+        if columns.get("won", [None])[0] not in (None, ""):
+            won = self.numbers(columns["won"])
+            played = np.ones(count)
+        else:
+            won = self.numbers(columns["points_won"])
+            played = self.numbers(columns["points_played"])
+        valid = (won >= 0) & (won <= played) & (played >= 1)
+        days = None
+        if self.half_life is not None:
+            days = np.array(list(map(self.days.__getitem__, columns["date"])), dtype = float)
+
+        known = (servers >= 0) & (receivers >= 0)
+        self.malformed += int(np.count_nonzero(~valid))
+        self.unknown += int(np.count_nonzero(valid & ~known))
+        keep = valid & known
+        pairs = servers[keep] * len(self.players) + receivers[keep]
+        won, played = won[keep], played[keep]
+
+        if days is not None and len(pairs):
+            days = days[keep]
+            last_day = days.max()
+            if self.last_day is None:
+                self.last_day = last_day
+            elif last_day > self.last_day:
+                scale = np.exp2((self.last_day - last_day) / self.half_life)
+                self.won *= scale
+                self.played *= scale
+                self.last_day = last_day
+            weights = np.exp2((days - self.last_day) / self.half_life)
+            won = won * weights
+            played = played * weights
+        size = len(self.players) ** 2
+        self.won += np.bincount(pairs, won, size)
+        self.played += np.bincount(pairs, played, size)
+
+    def add_chunk(self, columns, count):
+        # adds a chunk of count lines, {column name: list of values}
+        self.lines += count
+        if "server" not in columns or "receiver" not in columns or (self.half_life is not None and "date" not in columns):
+            self.malformed += count
+            return
+        try:
+            self.add_columns(columns, count)
+        except (KeyError, ValueError, TypeError, AttributeError):
+            for line in range(count):
+                try:
+                    self.add_columns({name: values[line:line + 1] for name, values in columns.items()}, 1)
+                except (KeyError, ValueError, TypeError, AttributeError):
+                    self.malformed += 1
+
+    def read_files(self, file_paths):
+        for file_path in file_paths:
+            with reading(file_path) as file:
+                for columns, count in log_chunks(file, is_jsonl(file_path)):
+                    self.add_chunk(columns, count)
+
+    def tables(self, as_of = None):
+        # (won, played) as n x n arrays, weights relative to as_of (a date) or the newest date in the logs
+        won = self.won.reshape(len(self.players), -1)
+        played = self.played.reshape(len(self.players), -1)
+        if self.half_life is not None and self.last_day is not None and as_of is not None:
+            scale = np.exp2((self.last_day - as_of.toordinal()) / self.half_life)
+            won, played = won * scale, played * scale
+        return won, played
+
+
+def log_chunks(file, jsonl):
+    # ({column name: list of values}, number of lines) for chunks of CHUNK_SIZE lines of a log file
+    if jsonl:
+        lines = (line for line in file if line.strip())
+        while chunk := list(islice(lines, CHUNK_SIZE)):
+            rows = []
+            for line in chunk:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    row = None
+                rows.append(row if isinstance(row, dict) else {})
+            names = [name for name in COLUMNS if any(name in row for row in rows)] # a bad line doesn't hide the rest
+            yield {name: [row.get(name) for row in rows] for name in names}, len(rows)
+    else:
+        reader = csv.reader(file)
+        header = [column.strip().lower() for column in next(reader, [])]
+        width = len(header)
+        while chunk := list(islice(reader, CHUNK_SIZE)):
+            if set(map(len, chunk)) == {width}:
+                yield {name: list(map(itemgetter(i), chunk)) for i, name in enumerate(header)}, len(chunk)
+                continue
+            rows = [row for row in chunk if row]
+            if rows:
+                yield {name: [row[i] if i < len(row) else None for row in rows] for i, name in enumerate(header)}, len(rows)
+
+
+def shrunk_estimates(won, played, prior_points):
+    # share of serve points won per player, pulled towards the average by prior_points points
+    served_won = won.sum(axis = 1)
+    served = played.sum(axis = 1)
+    average = served_won.sum() / served.sum() if served.sum() else 0.5
+    return (served_won + prior_points * average) / (served + prior_points), served
+
+
+def adjusted_estimates(won, played, prior_points, iterations = 200, tolerance = 1e-10):
+    # serve probability against an average receiver from the logistic model, fitted with one Newton step per
+    # parameter group and round. The serve and return strengths have a normal prior that works like prior_points
+    # points at the average, and the return strengths are kept centered so the intercept is the average server
+    n = len(won)
+    served = played.sum(axis = 1)
+    total = played.sum()
+    average = won.sum() / total if total else 0.5
+    a = math.log(average / (1 - average)) if 0 < average < 1 else 0.0
+    serve = np.zeros(n)
+    returns = np.zeros(n)
+    strength = prior_points * average * (1 - average) # curvature of prior_points points at the average
+
+    for _ in range(iterations):
+        p = 1 / (1 + np.exp(-(a + serve[:, None] - returns[None, :])))
+        variance = played * p * (1 - p)
+        serve_step = ((won - played * p).sum(axis = 1) - strength * serve) / (variance.sum(axis = 1) + strength)
+        serve += serve_step
+
+        p = 1 / (1 + np.exp(-(a + serve[:, None] - returns[None, :])))
+        variance = played * p * (1 - p)
+        return_step = (-(won - played * p).sum(axis = 0) - strength * returns) / (variance.sum(axis = 0) + strength)
+        returns += return_step
+
+        p = 1 / (1 + np.exp(-(a + serve[:, None] - returns[None, :])))
+        variance = played * p * (1 - p)
+        a_step = (won - played * p).sum() / variance.sum() if variance.sum() else 0.0
+        a += a_step
+
+        a -= returns.mean()
+        returns -= returns.mean()
+        if max(abs(serve_step).max(), abs(return_step).max(), abs(a_step)) < tolerance:
+            break
+    return 1 / (1 + np.exp(-(a + serve))), served
+
+
+def estimate_serve_probabilities(players, file_paths, half_life = None, as_of = None, adjust = False, prior_points = 200):
+    # (estimates, points served, PointTable) for players from the log files
+    table = PointTable(players, half_life)
+    table.read_files(file_paths)
+    won, played = table.tables(as_of)
+    if adjust:
+        estimates, served = adjusted_estimates(won, played, prior_points)
+    else:
+        estimates, served = shrunk_estimates(won, played, prior_points)
+    return estimates, served, table
+
+
+def write_back(database, estimates, served, min_points = 100, save = True):
+    # sets serve_win_prob of the players with at least min_points (weighted) served points, the order of estimates is
+    # database.players. Estimates that aren't finite numbers are skipped. Returns [(player, old value)] for the changed
+    # players and saves them with one update_file()
+    changed = []
+    for player, estimate, points in zip(database.players, estimates, served):
+        if not (math.isfinite(estimate) and math.isfinite(points)):
+            continue
+        value = round(float(estimate), DECIMALS)
+        if points >= min_points and value != player.serve_win_prob:
+            changed.append((player, player.serve_win_prob))
+            player.serve_win_prob = value
+    if changed and save:
+        database.update_file()
+    return changed
+
+
+def main(argv = None):
+    from player_database import PlayerDatabase
+
+    parser = argparse.ArgumentParser(description = "Skatta sannolikheten att vinna sin serve från poäng- eller gameloggar.")
+    parser.add_argument("logs", nargs = "+", help = "loggfiler, .csv med rubrikrad eller .jsonl (även .gz)")
+    parser.add_argument("--half-life", type = float, default = None, help = "halveringstid i dagar för äldre poäng")
+    parser.add_argument("--as-of", type = date.fromisoformat, default = None, help = "datum som vikterna räknas från (ÅÅÅÅ-MM-DD)")
+    parser.add_argument("--adjust", action = "store_true", help = "justera för mottagarnas styrka")
+    parser.add_argument("--prior-points", type = float, default = 200, help = "poäng som drar mot snittet (standard 200)")
+    parser.add_argument("--min-points", type = float, default = 100, help = "minsta antal servepoäng för att ändra en spelare")
+    parser.add_argument("--dry-run", action = "store_true", help = "visa de nya värdena men spara inget")
+    parser.add_argument("--file", default = "playerdata.txt", help = "spelarfil")
+    arguments = parser.parse_args(argv)
+    if arguments.half_life is not None and arguments.half_life <= 0:
+        print("Halveringstiden måste vara större än 0.", file = sys.stderr)
+        return 2
+    if arguments.prior_points <= 0:
+        print("--prior-points måste vara större än 0.", file = sys.stderr)
+        return 2
+
+    database = PlayerDatabase(arguments.file)
+    database.load_players()
+    try:
+        estimates, served, table = estimate_serve_probabilities(database.players, arguments.logs, arguments.half_life,
+                                                                arguments.as_of, arguments.adjust, arguments.prior_points)
+    except OSError as error:
+        print(error, file = sys.stderr)
+        return 2
+
+    print(f"{table.lines} rader lästa, {table.malformed} felaktiga, {table.unknown} med okända spelare.")
+    changed = write_back(database, estimates, served, arguments.min_points, save = not arguments.dry_run)
+    for player, old_value in changed:
+        print(f"{player.name:24} {old_value:.{DECIMALS}f} -> {player.serve_win_prob:.{DECIMALS}f}")
+    if not changed:
+        print("Inga värden ändrades.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,95 +1,29 @@
+import os
 import sys
 import time
+import atexit
+import queue
 import random
 import math
-import tkinter as tk
-from tkinter import ttk
+import threading
+from bisect import bisect_left
 
+from scoring import ScoringCore, POINT_NAMES, point_names
+from instrumentation import INSTRUMENTS
+from player_database import Tennisplayer, PlayerDatabase
 
+tk = None # tkinter is imported by load_tkinter() when a window is created, so simulations can run without gui
+ttk = None
 
-class Tennisplayer:
-    # class for creating Tennisplayer objects with their name and stats
-    def __init__(self, name: str, serve_win_prob: float, matches_won: int, matches_played: int):
-        self.name = name
-        self.serve_win_prob = serve_win_prob
-        self.matches_won = matches_won
-        self.matches_played = matches_played
 
-    def win_percentage(self):
-        # calculates win percentage for Tennisplayer
-        if self.matches_played == 0:
-            return 0
-        return format(self.matches_won / self.matches_played, '.3f')
+def load_tkinter():
+    # imports tkinter the first time it is needed
+    global tk, ttk
+    if tk is None:
+        import tkinter
+        from tkinter import ttk as tkinter_ttk, messagebox
+        tk, ttk = tkinter, tkinter_ttk
 
-    def last_name(self):
-        # returns last name of player
-        last_name = self.name.strip()[2:]
-        return last_name
-
-
-class PlayerDatabase:
-    # class for gathering player stats, creating Tennisplayer objects, reuploading to the input-file and displaying players and stats
-    def __init__(self, file_path):
-        # initializes player database, players are first stored in self.players and then sorted and stored in self.sorted_players
-        self.file_path = file_path
-        self.players = []
-        self.sorted_players = []
-
-    def load_players(self):
-        # reads from input-file
-        try:
-            with open(self.file_path, "r") as file:
-
-                lines = file.readlines()[5:]
-
-                for line in range(0, len(lines), 4):
-                    name = lines[line].strip()
-                    serve_win_prob = float(lines[line + 1].strip())
-                    matches_won = int(lines[line + 2].strip())
-                    matches_played = int(lines[line + 3].strip())
-
-                    self.players.append(Tennisplayer(name, serve_win_prob, matches_won, matches_played))
-
-        except FileNotFoundError:
-            print("Spelarfilen hittades inte.")
-            sys.exit()
-
-        except ValueError:
-            print("Felaktigt format i spelarfilen.")
-            sys.exit()
-
-        self.sorted_players = sorted(self.players, key=lambda p: p.win_percentage(), reverse=True)
-
-    def update_file(self):
-        # updates file with new stats after played matches
-        with open("playerdata.txt", "r", encoding="utf-8") as file:
-            lines = file.readlines()
-
-            new_document = lines[:5] # keeps the header of the "playerdata.txt" file
-
-            self.sorted_players = sorted(self.players, key = lambda p: p.win_percentage(), reverse = True)
-
-            for player in self.sorted_players:
-                new_document.append(player.name + "\n")
-                new_document.append(f"{player.serve_win_prob}\n")
-                new_document.append(f"{player.matches_won}\n")
-
-                if player != self.sorted_players[-1]: # makes sure there is no blank line added at the end
-                    new_document.append(f"{player.matches_played}\n")
-                else:
-                    new_document.append(f"{player.matches_played}")
-
-        with open("playerdata.txt", "w", encoding="utf-8") as file:
-            file.writelines(new_document)
-
-    
-    def display_players(self):
-        # presents players in toplist based on win percentage 
-        print("\n" + 60*"=" + "\n" + "Placering Namn                   Vunna  Spelade  Andel vunna" + "\n" + 60*"=")
-        for i, player in enumerate(self.sorted_players, start = 1):
-            time.sleep(0.02)
-            print(f"{i:^9} {player.name:24} {player.matches_won:<6} {player.matches_played:<8} {player.win_percentage()}")
-            
 
 def manual_match(p1_index, p2_index):
     # asks for winner among two players -> the stats for the players are then updated in main() function
@@ -105,10 +39,37 @@ def manual_match(p1_index, p2_index):
     return winner_index - 1
 
 
+class PlayerNameIndex:
+    # prefix index over player names, a search matches the start of the full name or the last name
+    def __init__(self, players):
+        keys = []
+        for i, player in enumerate(players):
+            name = player.name.strip().lower()
+            keys.append((name, i))
+            last_name = player.last_name().lower()
+            if last_name and last_name != name:
+                keys.append((last_name, i))
+        keys.sort()
+        self.names = [name for name, _ in keys]
+        self.indices = [i for _, i in keys]
+
+    def search(self, prefix):
+        # returns the indices of the matching players in toplist order
+        prefix = prefix.strip().lower()
+        start = bisect_left(self.names, prefix)
+        end = bisect_left(self.names, prefix + "\uffff")
+        return sorted(set(self.indices[start:end]))
+
+
 class SelectionWindow:
-    # class for creating selection window for player and delay choice (GUI)
+    """ class for creating selection window for player and delay choice (GUI). The player list is virtual: only the
+        rows that fit in the window are created as buttons and they are refilled when scrolling or searching, so the
+        window opens just as fast with a few thousand players as with fifty"""
+    ROWS = 18 # number of player buttons, the visible part of the list
+
     def __init__(self, sorted_players):
         # initializes selection window for player and delay choice
+        load_tkinter()
         self.window = tk.Tk()
         self.window.geometry("550x800") 
         self.window.resizable(False, False)
@@ -119,58 +80,113 @@ class SelectionWindow:
 
         self.player_selections = [] # storage for player selections
 
-        # creates canvas and scrollbar
-        self.canvas = tk.Canvas(self.window)
-        self.scrollbar = ttk.Scrollbar(master =self.window, orient = "vertical", command = self.canvas.yview)
-
-        # creates frame in canvas
-        self.scrollable_frame = ttk.Frame(master = self.canvas)
-
-        # adds the frame to the canvas
-        self.canvas.create_window((0, 0), window = self.scrollable_frame, anchor = "nw")
-
-        # confgures the scrollbar
-        self.canvas.configure(yscrollcommand = self.scrollbar.set)
+        self.name_index = None # built on the first search
+        self.visible_players = range(len(sorted_players)) # indices in sorted_players of the players in the list
+        self.first_row = 0 # position in visible_players of the top button
 
-        # packs canvas and scrollbar onto the window
-        self.canvas.pack(side = "left", fill = "both", expand = True)
-        self.scrollbar.pack(side = "right", fill = "y")
-
-        # adds all my content to the frame
+        # adds all my content to the window
         self.add_content()
-
-        # added to make the scrolling work as it should
-        self.scrollable_frame.update_idletasks()
-        self.canvas.configure(scrollregion = self.canvas.bbox("all"))
+        self.refresh_rows()
 
     def add_content(self):
         # creates header for the page
-        tk.Label(self.scrollable_frame, text = "Välj 2 spelare och tidsfördröjning:", font = ("Arial", 14)).pack(pady = 10)
-        tk.Label(self.scrollable_frame, text = "Placering  Namn                   Vunna  Spelade  Andel vunna", font = ("Courier", 10, "bold")).pack(fill = "x")
+        tk.Label(self.window, text = "Välj 2 spelare och tidsfördröjning:", font = ("Arial", 14)).pack(pady = 10)
+
+        # creates search line, searches on the start of first or last name, a number jumps to that placement
+        search_frame = ttk.Frame(self.window)
+        search_frame.pack(pady = 5, fill = "x")
+        tk.Label(search_frame, text = "Sök (namn eller placering):", font = ("Arial", 12)).pack(side = "left", padx = 5)
+        self.search_entry = ttk.Entry(search_frame)
+        self.search_entry.pack(side = "left", padx = 5, fill = "x", expand = True)
+        self.search_entry.bind("<KeyRelease>", lambda event: self.search())
+
+        tk.Label(self.window, text = "Placering  Namn                   Vunna  Spelade  Andel vunna", font = ("Courier", 10, "bold")).pack(fill = "x")
+
+        # creates the player buttons and the scrollbar for the list
+        list_frame = ttk.Frame(self.window)
+        list_frame.pack(fill = "x")
+        self.scrollbar = ttk.Scrollbar(master = list_frame, orient = "vertical", command = self.scroll)
+        self.scrollbar.pack(side = "right", fill = "y")
+        rows_frame = ttk.Frame(list_frame)
+        rows_frame.pack(side = "left", fill = "x", expand = True)
 
-        # creates all the buttons for the players
-        for i, player in enumerate(self.sorted_players, start = 1):
-            button_text = f"{i:^9} {player.name:24} {player.matches_won:<6} {player.matches_played:<6} {player.win_percentage():>9}"
+        self.row_buttons = []
+        for row in range(self.ROWS):
             player_button = tk.Button(
-                self.scrollable_frame,
-                text = button_text,
+                rows_frame,
                 font = ("Courier", 10), # choose a monospace-font to make formatting easier
                 anchor = "w",
-                command = lambda i = i: self.click_player(i)
+                command = lambda row = row: self.click_row(row)
             )
             player_button.pack(fill = "x", pady = 2)
+            self.row_buttons.append(player_button)
+
+        # scrolling with the mouse wheel (Windows/macOS and Linux)
+        for widget in [list_frame, rows_frame, *self.row_buttons]:
+            widget.bind("<MouseWheel>", lambda event: self.scroll("scroll", -1 if event.delta > 0 else 1, "units"))
+            widget.bind("<Button-4>", lambda event: self.scroll("scroll", -1, "units"))
+            widget.bind("<Button-5>", lambda event: self.scroll("scroll", 1, "units"))
 
         # adds entry line for delay-input and button to start the match
-        delay_frame = ttk.Frame(self.scrollable_frame)
+        delay_frame = ttk.Frame(self.window)
         delay_frame.pack(pady = 10, fill = "x")
 
         tk.Label(delay_frame, text = "Bestäm fördröjningen (sekunder):", font = ("Arial", 12)).pack(side = "left", padx = 5)
         self.delay_entry = ttk.Entry(delay_frame)
         self.delay_entry.pack(side = "left", padx = 5)
 
-        submit_button = ttk.Button(self.scrollable_frame, text = "Starta Matchen", command = self.submit_selection)
+        submit_button = ttk.Button(self.window, text = "Starta Matchen", command = self.submit_selection)
         submit_button.pack(pady=20)
 
+    def refresh_rows(self):
+        # fills the buttons with the players from first_row and updates the scrollbar
+        for row, player_button in enumerate(self.row_buttons):
+            position = self.first_row + row
+            if position < len(self.visible_players):
+                i = self.visible_players[position] + 1
+                player = self.sorted_players[i - 1]
+                button_text = f"{i:^9} {player.name:24} {player.matches_won:<6} {player.matches_played:<6} {player.win_percentage():>9}"
+                player_button.configure(text = button_text, state = "normal")
+            else:
+                player_button.configure(text = "", state = "disabled")
+
+        total = max(len(self.visible_players), 1)
+        self.scrollbar.set(self.first_row / total, min(self.first_row + self.ROWS, total) / total)
+
+    def scroll(self, action, amount, unit = None):
+        # called by the scrollbar and the mouse wheel, ("moveto", fraction) or ("scroll", steps, "units"/"pages")
+        if action == "moveto":
+            first_row = int(float(amount) * len(self.visible_players))
+        elif unit == "pages":
+            first_row = self.first_row + int(amount) * self.ROWS
+        else:
+            first_row = self.first_row + int(amount)
+        self.first_row = max(0, min(first_row, len(self.visible_players) - self.ROWS))
+        self.refresh_rows()
+
+    def search(self):
+        # filters the list on the text in the search line
+        text = self.search_entry.get().strip()
+        if text.isdigit():
+            # jump to the placement
+            self.visible_players = range(len(self.sorted_players))
+            self.first_row = max(0, min(int(text) - 1, len(self.sorted_players) - self.ROWS))
+        elif text:
+            if self.name_index is None:
+                self.name_index = PlayerNameIndex(self.sorted_players)
+            self.visible_players = self.name_index.search(text)
+            self.first_row = 0
+        else:
+            self.visible_players = range(len(self.sorted_players))
+            self.first_row = 0
+        self.refresh_rows()
+
+    def click_row(self, row):
+        # translates a click on a button to the placement of the player shown on it
+        position = self.first_row + row
+        if position < len(self.visible_players):
+            self.click_player(self.visible_players[position] + 1)
+
     def click_player(self, player_index):
         # function that is activated by button-click, determines wether the choice is accepted or not, if accepted its added to player_selections
         if len(self.player_selections) < 2:
@@ -208,8 +224,9 @@ class SelectionWindow:
 
 class ScoreDisplay:
     # class for initializing and updating graphic scorecard (GUI)
-    def __init__(self, player1, player2, sorted_players):
-        # initialize the tkinter window for displaying scores
+    def __init__(self, player1, player2, leaderboard):
+        # initialize the tkinter window for displaying scores, leaderboard gives the placements (PlayerDatabase.leaderboard())
+        load_tkinter()
         self.window = tk.Tk()
         self.window.geometry("1200x200+0+0")
         self.window.title("Scorecard")
@@ -223,7 +240,7 @@ class ScoreDisplay:
 
         self.player1 = player1
         self.player2 = player2
-        self.sorted_players = sorted_players
+        self.leaderboard = leaderboard
 
         # labels for indicating server
         self.serve_1 = ttk.Label(master = self.window, text = "//", font = "Aharoni 45 bold", background = "#185224", foreground = "#f7f7f5", anchor = "center")
@@ -233,10 +250,10 @@ class ScoreDisplay:
         self.serve_2.grid(row = 1, column = 0, sticky = "nwse")
 
         # labels for player names
-        self.name_1 = ttk.Label(master = self.window, text = f"{self.player1.last_name()} ({self.sorted_players.index(self.player1) + 1})".upper(), font = "Aharoni 45 bold", background = "#185224", foreground = "#f7f7f5")
+        self.name_1 = ttk.Label(master = self.window, text = f"{self.player1.last_name()} ({self.leaderboard.rank(self.player1)})".upper(), font = "Aharoni 45 bold", background = "#185224", foreground = "#f7f7f5")
         self.name_1.grid(row = 0, column = 1, sticky = "nwse")
 
-        self.name_2 = ttk.Label(master = self.window, text = f"{self.player2.last_name()} ({self.sorted_players.index(self.player2) + 1})".upper(), font = "Aharoni 45 bold", background = "#185224", foreground = "#f7f7f5")
+        self.name_2 = ttk.Label(master = self.window, text = f"{self.player2.last_name()} ({self.leaderboard.rank(self.player2)})".upper(), font = "Aharoni 45 bold", background = "#185224", foreground = "#f7f7f5")
         self.name_2.grid(row = 1, column = 1, sticky = "nwse")
 
 
@@ -320,147 +337,301 @@ class ScoreDisplay:
         self.games_p2.configure(text = "0")
         self.window.update()
 
+    def render_state(self, state):
+        # shows a ScoreboardState, tk redraws it on its own loop
+        self.points_p1.configure(text = state.points_p1)
+        self.points_p2.configure(text = state.points_p2)
+        self.games_p1.configure(text = f"{state.games_p1}")
+        self.games_p2.configure(text = f"{state.games_p2}")
+
+        # the last set is shown to the right, like update_set_scores
+        sets = [("", "")] * (3 - len(state.sets)) + list(state.sets[-3:])
+        set_labels = [(self.set_1_p1, self.set_1_p2), (self.set_2_p1, self.set_2_p2), (self.set_3_p1, self.set_3_p2)]
+        for (label_p1, label_p2), (games_p1, games_p2) in zip(set_labels, sets):
+            label_p1.configure(text = f"{games_p1}")
+            label_p2.configure(text = f"{games_p2}")
+
+        self.serve_1.configure(text = "//" if state.player1_serves else "")
+        self.serve_2.configure(text = "" if state.player1_serves else "//")
+
+    def render_from_queue(self, state_queue, frame_rate = 30):
+        # starts rendering the states the simulation puts in state_queue, frame_rate times per second
+        self.frame_interval = max(1, round(1000 / frame_rate))
+        self.window.after(self.frame_interval, self.render_frame, state_queue)
+
+    def render_frame(self, state_queue):
+        # renders only the latest state in the queue, older ones are skipped
+        state = None
+        try:
+            while True:
+                state = state_queue.get_nowait()
+        except queue.Empty:
+            pass
+
+        if state is not None:
+            with INSTRUMENTS.timer("render"):
+                self.render_state(state)
+            if state.finished:
+                self.window.quit() # stops mainloop, the window stays on screen with the final score
+                return
+        self.window.after(self.frame_interval, self.render_frame, state_queue)
 
-class Match:
-    """ class that creates a simulated match between two players. The logic is based on chain iteration, 
-        simulate_match() iterates over simulate_set(), which iterates over simulate_game(), which iterates over simulate_point()"""
-    def __init__(self, player1, player2, score_display):
-        # initializes match between player1 and player2
-        self.player1 = player1
-        self.player2 = player2
-        self.score_display = score_display # helps decide what the functions should do with and without gui
-
-    def simulate_point(self, server, receiver, delay, display_mode = 4):
-        # simulates point
-        if display_mode == 1:
-            time.sleep(delay)
-        return server if random.random() < server.serve_win_prob else receiver
-
-    def simulate_game(self, server, receiver, delay, score_display, display_mode = 4):
-        # simulates game
-        points = {server: 0, receiver: 0}
-        point_names = ["0", "15", "30", "40", "Ad"]  # tennis point system
 
-        if display_mode <= 2: # display who serves the game
-            time.sleep(delay)
-            print(f"\nGamet börjar: {server.last_name()} servar")
-        if display_mode == 1: # start each game on 0-0
-            time.sleep(delay)
-            print(f"Poäng: {server.last_name()} 0 - 0 {receiver.last_name()}")
+def pause(delay):
+    # sleeps between score displays, timed as its own phase so waiting isn't mistaken for simulation time
+    with INSTRUMENTS.timer("sleep"):
+        time.sleep(delay)
 
 
-        while True:
+class ScoreboardState:
+    # snapshot of everything the scorecard shows, sent from the simulation thread to the gui
+    __slots__ = ("points_p1", "points_p2", "games_p1", "games_p2", "sets", "player1_serves", "finished")
 
-            if score_display != None:
-                self.score_display.update_point_scores(point_names[points[server]], point_names[points[receiver]], server)
-                time.sleep(delay)
-
-            winner = self.simulate_point(server, receiver, delay, display_mode)
-            points[winner] += 1
-
-            # handles case of lost Ad-point
-            if points[server] == 4 and points[receiver] == 4:
-                points[server] -= 1
-                points[receiver] -= 1
-
-            # print current score based on display_mode and game-winning criteria
-            if points[server] >= 4 and points[server] - points[receiver] >= 2:
-                if display_mode <= 2:  # display game winner after each game 
-                    time.sleep(delay)
-                    print(f"\n{server.last_name()} vann gamet\n")
-                return server
-            elif points[receiver] >= 4 and points[receiver] - points[server] >= 2:
-                if display_mode <= 2:  # display game winner after each game 
-                    time.sleep(delay)
-                    print(f"\n{receiver.last_name()} vann gamet\n")
-                return receiver
-            else:
-                if display_mode == 1:  # display scores after each point
-                    print(f"Poäng: {server.last_name()} {point_names[points[server]]} - {point_names[points[receiver]]} {receiver.last_name()}")
-  
+    def __init__(self, points_p1, points_p2, games_p1, games_p2, sets, player1_serves, finished = False):
+        self.points_p1 = points_p1
+        self.points_p2 = points_p2
+        self.games_p1 = games_p1
+        self.games_p2 = games_p2
+        self.sets = sets # ((games player1, games player2), ...) for the finished sets
+        self.player1_serves = player1_serves
+        self.finished = finished
 
-    def simulate_set(self, server, receiver, delay, score_display, display_mode = 4):
-        # simulates set
-        games = {self.player1: 0, self.player2: 0}
 
-        while True:
-
-            if score_display != None:
-                score_display.update_game_scores(games[self.player1], games[self.player2])
-                score_display.update_server(server)
-
-            # if the score is 6-6 a deciding game is played
-            if games[self.player1] == 6 and games[self.player2] == 6:
-                winner = self.simulate_game(server, receiver, delay, score_display, display_mode)
-                games[winner] += 1
-                if display_mode <= 3:  # for all display_modes
-                    time.sleep(delay)
-                    print(40*"-" + f"\n{self.player1.last_name()} vann setet\n" + 40*"-")
-                return winner, games
-
-            winner = self.simulate_game(server, receiver, delay, score_display, display_mode)
-            games[winner] += 1
-
-            # display current set score
-            if display_mode <= 2:  # display scores after each game
-                time.sleep(delay)
-                print(40*"-" + "\n" + f"Game-ställning: {self.player1.last_name()} {games[self.player1]} - {games[self.player2]} {self.player2.last_name()}" + "\n" + 40*"-")
-
-            # change server
-            server, receiver = receiver, server
-
-            # player 1 wins set
-            if games[self.player1] >= 6 and games[self.player1] - games[self.player2] >= 2:
-                if display_mode <= 3:  # for all display_modes
-                    time.sleep(delay)
-                    print(40*"-" + f"\n{self.player1.last_name()} vann setet\n" + 40*"-")
-                return self.player1, games
-            # player 2 wins set
-            elif games[self.player2] >= 6 and games[self.player2] - games[self.player1] >= 2:
-                if display_mode <= 3:  # for all display_modes
-                    time.sleep(delay)
-                    print(40*"-" + f"\n{self.player2.last_name()} vann setet\n" + 40*"-")
-                return self.player2, games
-
-    def simulate_match(self, delay, score_display, display_mode = 4):
-        # simulates entire match
-        sets_won = {self.player1: 0, self.player2: 0}
+class ConsoleOutput:
+    # subscriber to ScoringCore that prints the match in the terminal, display_mode decides how often (1: points, 2: games, 3: sets, 4: only result)
+    def __init__(self, player1, player2, delay, display_mode = 4):
+        self.player1 = player1
+        self.player2 = player2
+        self.delay = delay
+        self.display_mode = display_mode
+
+        # events that print nothing in this display_mode aren't subscribed to, so the scoring core can skip them
+        self.handled_events = {"match_started", "match_won"}
+        if display_mode <= 3:
+            self.handled_events.add("set_won")
+        if display_mode <= 2:
+            self.handled_events.update(("game_started", "game_won"))
+        if display_mode <= 1:
+            self.handled_events.add("point_won")
+
+    def match_started(self, event):
         print("\nMatchen börjar!\n")
-        print(f"{self.player1.name} vs {self.player2.name}\n")
+        print(f"{event.player1.name} vs {event.player2.name}\n")
+        print(f"{event.server.last_name()} servar först")
+
+    def game_started(self, event):
+        if self.display_mode <= 2: # display who serves the game
+            pause(self.delay)
+            print(f"\nGamet börjar: {event.server.last_name()} servar")
+        if self.display_mode == 1: # start each game on 0-0
+            pause(self.delay)
+            print(f"Poäng: {event.server.last_name()} 0 - 0 {event.receiver.last_name()}")
+
+    def point_won(self, event):
+        if self.display_mode == 1:
+            pause(self.delay)
+            if not event.game_over: # display scores after each point
+                points_server, points_receiver = point_names(event)
+                print(f"Poäng: {event.server.last_name()} {points_server} - {points_receiver} {event.receiver.last_name()}")
+
+    def game_won(self, event):
+        if self.display_mode <= 2: # display game winner after each game
+            pause(self.delay)
+            print(f"\n{event.winner.last_name()} vann {'tiebreaket' if event.tiebreak else 'gamet'}\n")
+        if self.display_mode <= 2 and not event.deciding_game: # display scores after each game
+            pause(self.delay)
+            print(40*"-" + "\n" + f"Game-ställning: {self.player1.last_name()} {event.games_p1} - {event.games_p2} {self.player2.last_name()}" + "\n" + 40*"-")
+
+    def set_won(self, event):
+        if self.display_mode <= 3: # for all display_modes
+            pause(self.delay)
+            print(40*"-" + f"\n{event.winner.last_name()} vann setet\n" + 40*"-")
+            pause(self.delay)
+            print(40*"-" + f"\nSet-ställning: {self.player1.last_name()} {event.sets_p1} - {event.sets_p2} {self.player2.last_name()}\n" + 40*"-")
+
+    def match_won(self, event):
+        pause(self.delay)
+        print(40*"=" + f"\nGame, Set and Match {event.winner.last_name()}!")
+
+
+class ScoreDisplaySubscriber:
+    # subscriber to ScoringCore that keeps a ScoreDisplay up to date and paces the match with delay between points
+    def __init__(self, score_display, delay):
+        self.score_display = score_display
+        self.delay = delay
+
+    def game_started(self, event):
+        with INSTRUMENTS.timer("render"):
+            self.score_display.update_game_scores(event.games_p1, event.games_p2)
+            self.score_display.update_server(event.server)
+            self.score_display.update_point_scores(POINT_NAMES[0], POINT_NAMES[0], event.server)
+        pause(self.delay)
+
+    def point_won(self, event):
+        if not event.game_over:
+            with INSTRUMENTS.timer("render"):
+                self.score_display.update_point_scores(*point_names(event), event.server)
+            pause(self.delay)
+
+    def set_won(self, event):
+        with INSTRUMENTS.timer("render"):
+            self.score_display.update_set_scores(event.games_p1, event.games_p2)
+
+    def match_won(self, event):
+        with INSTRUMENTS.timer("render"):
+            self.score_display.final_score() # to get the correct format of final score (gui)
+
+
+class QueuedScoreDisplaySubscriber:
+    # subscriber to ScoringCore that puts ScoreboardStates in a queue instead of drawing, so the simulation never waits for tk
+    def __init__(self, state_queue, player1, delay):
+        self.state_queue = state_queue
+        self.player1 = player1
+        self.delay = delay
+        self.points = (POINT_NAMES[0], POINT_NAMES[0])
+        self.games = (0, 0)
+        self.sets = ()
+        self.player1_serves = True
+
+    def push(self, finished = False):
+        self.state_queue.put(ScoreboardState(*self.points, *self.games, self.sets, self.player1_serves, finished))
+
+    def game_started(self, event):
+        self.points = (POINT_NAMES[0], POINT_NAMES[0])
+        self.games = (event.games_p1, event.games_p2)
+        self.player1_serves = event.server == self.player1
+        self.push()
+        pause(self.delay)
+
+    def point_won(self, event):
+        if not event.game_over:
+            points_server, points_receiver = point_names(event)
+            self.points = (points_server, points_receiver) if self.player1_serves else (points_receiver, points_server)
+            self.push()
+            pause(self.delay)
+
+    def set_won(self, event):
+        self.sets += ((event.games_p1, event.games_p2),)
+        self.push()
+
+    def match_won(self, event):
+        # to get the correct format of final score (gui)
+        self.points = (POINT_NAMES[0], POINT_NAMES[0])
+        self.games = (0, 0)
+        self.push(finished = True)
 
-        # randomize first server
-        server, receiver = (self.player1, self.player2) if random.random() < 0.5 else (self.player2, self.player1)
-        print(f"{server.last_name()} servar först")
 
+class Match:
+    """ class that creates a simulated match between two players. The scoring is done by ScoringCore (scoring.py),
+        simulate_match() plays the sets, which play the games, which play the points, and the console output and the
+        gui are subscribers to its events"""
+    def __init__(self, player1, player2, score_display, rng = None, match_format = None):
+        # initializes match between player1 and player2
+        self.player1 = player1
+        self.player2 = player2
+        self.score_display = score_display # helps decide what the functions should do with and without gui
+        self.rng = rng if rng is not None else random # random stream, e.g. RandomStreams(seed).stream(match number)
+        self.match_format = match_format # MatchFormat (match_format.py), None plays the classic rules
+        self.core = None # the ScoringCore of the last simulate_game or simulate_set, reused while core_key is the same
+        self.core_key = None
+
+    def reused_core(self, delay, score_display, display_mode, rng):
+        # scoring core for simulate_game and simulate_set, only built again when the arguments or the instrumentation
+        # change, so playing game after game doesn't build a core and its subscribers every time
+        key = (delay, score_display, display_mode, rng if rng is not None else self.rng, INSTRUMENTS.enabled)
+        if self.core is None or self.core_key != key:
+            self.core = self.scoring_core(delay, score_display, display_mode, rng)
+            self.core_key = key
+        else:
+            self.core.reset()
+        return self.core
+
+    def scoring_core(self, delay, score_display, display_mode = 4, rng = None, recorder = None):
+        # creates the scoring core with, with gui, the scorecard and console output as subscribers
+        subscribers = [recorder] if recorder is not None else []
+        if score_display != None:
+            subscribers.append(ScoreDisplaySubscriber(score_display, delay))
+        subscribers.append(ConsoleOutput(self.player1, self.player2, delay, display_mode))
+        subscribers += INSTRUMENTS.subscribers() # counters, only when instrumentation is enabled
+        return ScoringCore(self.player1, self.player2, subscribers, rng if rng is not None else self.rng, self.match_format)
+
+    def simulate_point(self, server, receiver, delay, display_mode = 4, rng = None):
+        # simulates point, with the same draw as ScoringCore.play_point but without building a core for one point
+        if rng is None:
+            rng = self.rng
+        if display_mode != 1 and not INSTRUMENTS.enabled: # nothing to wait for or time
+            return server if rng.random() < server.serve_win_prob else receiver
+        with INSTRUMENTS.timer("simulate_point"):
+            if display_mode == 1:
+                pause(delay)
+            return server if rng.random() < server.serve_win_prob else receiver
+
+    def simulate_game(self, server, receiver, delay, score_display, display_mode = 4, rng = None):
+        # simulates game
+        with INSTRUMENTS.timer("simulate_game"):
+            return self.reused_core(delay, score_display, display_mode, rng).play_game(server, receiver)
+
+    def simulate_set(self, server, receiver, delay, score_display, display_mode = 4, rng = None):
+        # simulates set, returns the winner and the game score {player: games}
+        with INSTRUMENTS.timer("simulate_set"):
+            return self.reused_core(delay, score_display, display_mode, rng).play_set(server, receiver)
+
+    def simulate_match(self, delay, score_display, display_mode = 4, rng = None, recorder = None):
+        # simulates entire match, recorder is e.g. a MatchRecorder (match_recording.py) that saves it point by point
+        with INSTRUMENTS.timer("simulate_match"):
+            return self.scoring_core(delay, score_display, display_mode, rng, recorder).play_match()
+
+    def simulate_match_queued(self, delay, score_display, frame_rate = 30, rng = None):
+        # simulates entire match on a separate thread while score_display renders the latest score frame_rate times per second
+        # on the tk loop, so the simulation is never blocked by redraws. Returns the winner when the final score is shown
+        state_queue = queue.Queue()
+        display_subscriber = QueuedScoreDisplaySubscriber(state_queue, self.player1, delay)
+        core = ScoringCore(self.player1, self.player2, [display_subscriber, ConsoleOutput(self.player1, self.player2, 0)] + INSTRUMENTS.subscribers(),
+                           rng if rng is not None else self.rng, self.match_format)
+        result = []
+        errors = []
+
+        def play():
+            try:
+                with INSTRUMENTS.timer("simulate_match"):
+                    result.append(core.play_match())
+            except BaseException as error:
+                # the gui would otherwise wait for a final score forever, the error is raised again on the main thread
+                errors.append(error)
+                display_subscriber.push(finished = True)
 
-        while sets_won[self.player1] < 2 and sets_won[self.player2] < 2:
-            result = self.simulate_set(server, receiver, delay, score_display, display_mode)
-            winner = result[0]
-            games_player1 = result[1][self.player1]
-            games_player2 = result[1][self.player2]
-            sets_won[winner] += 1
+        simulation = threading.Thread(target = play, daemon = True)
 
-            if score_display != None:
-                score_display.update_set_scores(games_player1, games_player2)
+        score_display.render_from_queue(state_queue, frame_rate)
+        simulation.start()
+        score_display.window.mainloop()
+        simulation.join()
+        if errors:
+            raise errors[0]
+        return result[0]
 
-            # display set scores
-            if display_mode <= 3: # for all display_modes
-                time.sleep(delay)
-                print(40*"-" + f"\nSet-ställning: {self.player1.last_name()} {sets_won[self.player1]} - {sets_won[self.player2]} {self.player2.last_name()}\n" + 40*"-")
-        
-        if score_display != None: # to get the correct format of final score (gui)
-            score_display.final_score()
-        time.sleep(delay)
-        print(40*"=" + f"\nGame, Set and Match {self.player1.last_name() if sets_won[self.player1] == 2 else self.player2.last_name()}!")
-        return self.player1 if sets_won[self.player1] == 2 else self.player2
+
+def report_instrumentation(target):
+    # prints what was collected during the run, target is "1" or a path for the JSON dump
+    INSTRUMENTS.disable()
+    INSTRUMENTS.report()
+    if target != "1":
+        INSTRUMENTS.dump(target)
 
 
 def main():
     # main function that connects all other classes and functions
+    # TENNIS_INSTRUMENT=1 (or =path.json) profiles the run and prints a report when the program ends
+    instrument = os.environ.get("TENNIS_INSTRUMENT")
+    if instrument and not INSTRUMENTS.enabled:
+        INSTRUMENTS.enable(profile = True)
+        atexit.register(report_instrumentation, instrument)
+
+    # create PlayerDatabase object with our file, the players are kept between matches and only read again when the
+    # file or its journal was changed by someone else
+    database = PlayerDatabase("playerdata.txt")
     while True:
-        # create PlayerDatabase object with our file and load players
-        database = PlayerDatabase("playerdata.txt")
-        database.load_players()
+        database.reload_if_changed()
 
 
         # choose if you want gui or not 
@@ -543,16 +714,17 @@ def main():
                 player1 = selections.player_selections[0]
                 player2 = selections.player_selections[1]
                 delay = float(selections.delay_selection)
-                score_display = ScoreDisplay(player1, player2, database.sorted_players)
+                score_display = ScoreDisplay(player1, player2, database.leaderboard())
 
             match = Match(player1, player2, score_display)
-            winner = match.simulate_match(delay, score_display, display_mode)
+            if scorecard_choice == "ja":
+                winner = match.simulate_match_queued(delay, score_display)
+            else:
+                winner = match.simulate_match(delay, score_display, display_mode)
             print(f"Matchvinnare: {winner.name}\n" + 40*"=")
 
         # update stats
-        winner.matches_won += 1
-        player1.matches_played += 1
-        player2.matches_played += 1
+        database.record_result(winner, player2 if winner is player1 else player1)
 
         # update file and show new list of players
         database.update_file()
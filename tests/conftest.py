@@ -0,0 +1,37 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # the modules are in the repo root
+
+from player_database import Tennisplayer
+
+
+HEADER = ["Format:", "Namn (max 20 tkn) / sannolikhet att vinna sin serve (0-1)", "antal vunna matcher / antal spelade matcher",
+          "Stats from season 2024:", 62*"="]
+
+
+def write_players(file_path, players):
+    # writes players in the playerdata.txt format
+    lines = list(HEADER)
+    for player in players:
+        lines += [player.name, f"{player.serve_win_prob}", f"{player.matches_won}", f"{player.matches_played}"]
+    with open(file_path, "w", encoding = "utf-8") as file:
+        file.write("\n".join(lines))
+
+
+@pytest.fixture
+def roster():
+    # a small roster with different serve probabilities and stats
+    return [Tennisplayer("J Sinner", 0.71, 120, 155), Tennisplayer("C Alcaraz", 0.69, 90, 120),
+            Tennisplayer("A Zverev", 0.68, 70, 110), Tennisplayer("D Medvedev", 0.66, 60, 100),
+            Tennisplayer("G Dimitrov", 0.64, 52, 95), Tennisplayer("T Fritz", 0.67, 40, 80)]
+
+
+@pytest.fixture
+def player_file(tmp_path, roster):
+    # path of a playerdata.txt with roster in a temporary directory
+    file_path = str(tmp_path / "playerdata.txt")
+    write_players(file_path, roster)
+    return file_path
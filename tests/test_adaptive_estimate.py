@@ -0,0 +1,44 @@
+import pytest
+
+from adaptive_estimate import estimate_win_probability, wilson_interval
+from match_probability import head_to_head
+
+
+def test_wilson_interval():
+    assert wilson_interval(0, 0) == (0.0, 1.0)
+    # 50 of 100 at 95 %: the centre stays at 0.5 and the margin is z * sqrt(25 + z * z / 4) / (100 + z * z)
+    low, high = wilson_interval(50, 100)
+    assert (low + high) / 2 == pytest.approx(0.5)
+    z = 1.959964
+    assert (high - low) / 2 == pytest.approx(z * (25 + z * z / 4) ** 0.5 / (100 + z * z), abs = 1e-6)
+    # unlike the normal approximation the interval stays inside [0, 1] and is not empty at 0 or all wins
+    low, high = wilson_interval(0, 20)
+    assert low == pytest.approx(0, abs = 1e-12) and 0 < high < 0.2
+    low, high = wilson_interval(20, 20)
+    assert 0.8 < low < 1 and high == pytest.approx(1)
+    assert wilson_interval(30, 100, 0.99)[1] - wilson_interval(30, 100, 0.99)[0] > \
+           wilson_interval(30, 100, 0.9)[1] - wilson_interval(30, 100, 0.9)[0]
+
+
+def test_lopsided_pairing_converges_near_the_exact_probability(roster):
+    # J Sinner (0.71) against G Dimitrov (0.64) is far from 0.5, so it needs fewer matches than a close pairing
+    sinner, dimitrov, zverev = roster[0], roster[4], roster[2]
+    estimate = estimate_win_probability(sinner, dimitrov, half_width = 0.02, seed = 3)
+    assert estimate.converged
+    assert (estimate.high - estimate.low) / 2 <= 0.02
+    assert estimate.low - 0.01 <= head_to_head(sinner, dimitrov) <= estimate.high + 0.01
+    close = estimate_win_probability(zverev, roster[5], half_width = 0.02, seed = 3)
+    assert estimate.matches < close.matches
+
+
+def test_same_estimate_for_the_same_seed(roster):
+    first = estimate_win_probability(roster[0], roster[1], half_width = 0.05, seed = 8)
+    second = estimate_win_probability(roster[0], roster[1], half_width = 0.05, seed = 8)
+    assert (first.wins, first.matches, first.batches) == (second.wins, second.matches, second.batches)
+
+
+@pytest.mark.parametrize("arguments", [{"half_width": 0}, {"half_width": -0.01}, {"confidence": 0}, {"confidence": 1},
+                                       {"confidence": 1.5}, {"min_matches": 0}])
+def test_rejects_bad_arguments(roster, arguments):
+    with pytest.raises(ValueError):
+        estimate_win_probability(roster[0], roster[1], **arguments)
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from batch_simulation import BatchMatch, game_outcome_table
+from match_probability import match_win_probability, set_win_probability
+from player_database import Tennisplayer
+
+
+FINAL_SET_SCORES = {(6, games) for games in range(5)} | {(7, 5), (7, 6)}
+
+
+@pytest.fixture(scope = "module")
+def result():
+    # C Alcaraz against D Medvedev, player1 wins about 68 % of the matches
+    return BatchMatch(Tennisplayer("C Alcaraz", 0.69, 0, 0), Tennisplayer("D Medvedev", 0.66, 0, 0)).simulate_matches(200000, seed = 5)
+
+
+def test_win_probability_agrees_with_the_exact_one(result):
+    expected = match_win_probability(0.69, 0.66)
+    standard_error = (expected * (1 - expected) / len(result)) ** 0.5
+    assert result.player1_win_probability() == pytest.approx(expected, abs = 4 * standard_error)
+
+    # every set starts with the first server of the match, so the first set is won as often as from 0-0 on either serve
+    first_set = (result.set_scores[:, 0, 0] > result.set_scores[:, 0, 1]).mean()
+    expected = (set_win_probability(0.69, 0.66, player1_serves = True) + set_win_probability(0.69, 0.66, player1_serves = False)) / 2
+    assert first_set == pytest.approx(expected, abs = 4 * (expected * (1 - expected) / len(result)) ** 0.5)
+
+
+def test_every_set_ends_on_a_final_score(result):
+    played = result.set_scores[:, :, 0] >= 0
+    # 6-6 is decided by a single game, so 7-6 is the only score after it and there are no 8-6 sets
+    distribution = result.game_score_distribution()
+    assert distribution["7-6"] > 0 and distribution["6-7"] > 0
+    assert sum(distribution.values()) == played.sum()
+    assert set(distribution) == {f"{a}-{b}" for a, b in FINAL_SET_SCORES} | {f"{b}-{a}" for a, b in FINAL_SET_SCORES}
+
+
+def test_matches_are_best_of_three(result):
+    sets_p1 = (result.set_scores[:, :, 0] > result.set_scores[:, :, 1]).sum(axis = 1)
+    sets_p2 = (result.set_scores[:, :, 1] > result.set_scores[:, :, 0]).sum(axis = 1)
+    assert np.array_equal(sets_p1 == 2, result.player1_won)
+    assert np.all((sets_p1 == 2) ^ (sets_p2 == 2))
+    # the third set is played exactly when the first two are split, unplayed sets are (-1, -1)
+    split = (result.set_scores[:, 0, 0] > result.set_scores[:, 0, 1]) != (result.set_scores[:, 1, 0] > result.set_scores[:, 1, 1])
+    assert np.array_equal(result.set_scores[:, 2, 0] >= 0, split)
+    assert np.all(result.set_scores[~split, 2] == -1)
+    assert set(result.set_score_distribution()) == {"2-0", "2-1", "1-2", "0-2"}
+    assert sum(result.set_score_distribution().values()) == len(result)
+    # at least 4 points a game and 6 games a set
+    assert np.all(result.points_played >= 4 * 6 * 2)
+
+
+def test_same_matches_for_the_same_seed(roster):
+    first = BatchMatch(roster[0], roster[1]).simulate_matches(500, seed = 2)
+    second = BatchMatch(roster[0], roster[1]).simulate_matches(500, seed = np.random.default_rng(2))
+    assert np.array_equal(first.set_scores, second.set_scores)
+    assert np.array_equal(first.points_played, second.points_played)
+
+
+def test_game_outcomes_add_up_to_one():
+    for serve_win_prob in (0.3, 0.5, 0.69):
+        table = game_outcome_table(serve_win_prob)
+        assert table[-1] == pytest.approx(1)
+        assert np.all(np.diff(table) >= 0)
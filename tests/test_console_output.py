@@ -0,0 +1,36 @@
+import pytest
+
+from player_database import Tennisplayer
+from scoring import EVENTS, ScoringCore
+from tennis3 import ConsoleOutput
+
+
+PLAYER1 = Tennisplayer("A Ett", 0.65, 0, 0)
+PLAYER2 = Tennisplayer("B Två", 0.62, 0, 0)
+
+
+@pytest.mark.parametrize("display_mode, handlers", [
+    (1, {"match_started", "game_started", "point_won", "game_won", "set_won", "match_won"}),
+    (2, {"match_started", "game_started", "game_won", "set_won", "match_won"}),
+    (3, {"match_started", "set_won", "match_won"}),
+    (4, {"match_started", "match_won"})])
+def test_only_handled_events_are_subscribed(display_mode, handlers):
+    console = ConsoleOutput(PLAYER1, PLAYER2, 0, display_mode)
+    core = ScoringCore(PLAYER1, PLAYER2, [console])
+    assert {event.handler for event in EVENTS if core.handlers[event]} == handlers
+    assert callable(console.point_won) # the methods aren't hidden
+
+
+def test_handled_events_limits_any_subscriber():
+    class Subscriber:
+        handled_events = {"match_won"}
+
+        def point_won(self, event):
+            raise AssertionError("point_won isn't handled")
+
+        def match_won(self, event):
+            self.winner = event.winner
+
+    subscriber = Subscriber()
+    winner = ScoringCore(PLAYER1, PLAYER2, [subscriber]).play_match()
+    assert subscriber.winner is winner
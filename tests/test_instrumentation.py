@@ -0,0 +1,39 @@
+import io
+import time
+import contextlib
+
+import pytest
+
+from instrumentation import Instrumentation, INSTRUMENTS
+from player_database import Tennisplayer
+from tennis3 import Match
+
+
+def test_nested_timers_are_subtracted_from_the_outer_phase():
+    instruments = Instrumentation()
+    instruments.enable()
+    with instruments.timer("simulate"):
+        time.sleep(0.02)
+        with instruments.timer("render"):
+            time.sleep(0.03)
+            with instruments.timer("sleep"):
+                time.sleep(0.04)
+    assert instruments.times["simulate"] == pytest.approx(0.02, abs = 0.015)
+    assert instruments.times["render"] == pytest.approx(0.03, abs = 0.015)
+    assert instruments.times["sleep"] == pytest.approx(0.04, abs = 0.015)
+    assert instruments.active == {}
+
+
+def test_phases_add_up_to_the_match_time():
+    INSTRUMENTS.enable()
+    try:
+        match = Match(Tennisplayer("A Ett", 0.65, 0, 0), Tennisplayer("B Två", 0.62, 0, 0), None)
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            match.simulate_match(0.001, None, display_mode = 2)
+        elapsed = time.perf_counter() - started
+        assert INSTRUMENTS.times["sleep"] > 0
+        assert sum(INSTRUMENTS.times.values()) == pytest.approx(elapsed, rel = 0.05)
+    finally:
+        INSTRUMENTS.disable()
+        INSTRUMENTS.reset()
@@ -0,0 +1,62 @@
+import random
+
+from leaderboard import Leaderboard
+from player_database import PlayerDatabase, Tennisplayer
+
+
+def toplist(players, order):
+    # players sorted like the leaderboard: win rate, then the order they were added in
+    return sorted(players, key = lambda player: (-player.win_rate(), order[player]))
+
+
+def test_follows_a_full_sort_through_results_and_changes():
+    rng = random.Random(3)
+    players = []
+    for i in range(200):
+        matches_played = rng.randrange(8)
+        players.append(Tennisplayer(f"S Spelare{i}", 0.6, rng.randint(0, matches_played), matches_played))
+    leaderboard = Leaderboard(players)
+    order = {player: i for i, player in enumerate(sorted(players, key = lambda p: p.win_rate(), reverse = True))}
+    assert list(leaderboard) == toplist(order, order)
+
+    for step in range(1500):
+        winner, loser = rng.sample(list(order), 2)
+        leaderboard.record_result(winner, loser)
+        if step % 100 == 0:
+            removed = rng.choice(list(order))
+            leaderboard.remove(removed)
+            del order[removed]
+            added = Tennisplayer(f"N Ny{step}", 0.6, rng.randrange(3), 3)
+            leaderboard.add(added)
+            order[added] = len(players) + step
+        expected = toplist(order, order)
+        if step % 25 == 0:
+            assert list(leaderboard) == expected
+            assert len(leaderboard) == len(expected)
+            assert all(leaderboard.rank(player) == rank for rank, player in enumerate(expected, start = 1))
+            assert [leaderboard[i] for i in (0, 7, -1)] == [expected[i] for i in (0, 7, -1)]
+            assert leaderboard[5:30] == expected[5:30] and leaderboard[::9] == expected[::9]
+            assert leaderboard.top(10) == expected[:10] and leaderboard.rank_range(3, 8) == expected[2:8]
+
+
+def test_empty_and_single_player():
+    leaderboard = Leaderboard()
+    assert len(leaderboard) == 0 and list(leaderboard) == [] and leaderboard.top(3) == []
+    player = Tennisplayer("A Ett", 0.6, 1, 2)
+    leaderboard.add(player)
+    assert player in leaderboard and leaderboard.rank(player) == 1 and leaderboard[0] is player
+    leaderboard.remove(player)
+    assert player not in leaderboard and len(leaderboard) == 0
+
+
+def test_database_leaderboard_follows_record_result(player_file):
+    database = PlayerDatabase(player_file)
+    database.load_players()
+    leaderboard = database.leaderboard()
+    assert list(leaderboard) == database.sorted_players
+    last = database.sorted_players[-1]
+    for _ in range(100):
+        database.record_result(last, database.sorted_players[0])
+    assert leaderboard.rank(last) == 1
+    database.update_file()
+    assert list(database.leaderboard()) == database.sorted_players
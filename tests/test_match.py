@@ -0,0 +1,40 @@
+import io
+import random
+import contextlib
+
+from player_database import Tennisplayer
+from scoring import ScoringCore
+from tennis3 import Match
+
+
+PLAYER1 = Tennisplayer("A Ett", 0.66, 0, 0)
+PLAYER2 = Tennisplayer("B Två", 0.61, 0, 0)
+
+
+def test_reused_core_plays_like_a_new_one():
+    # one Match playing game after game gives the same results as a new core for every game
+    match = Match(PLAYER1, PLAYER2, None)
+    rng = random.Random(8)
+    reference = random.Random(8)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(200):
+            server, receiver = (PLAYER1, PLAYER2) if i % 2 else (PLAYER2, PLAYER1)
+            if i % 3:
+                assert match.simulate_game(server, receiver, 0, None, rng = rng) is \
+                       ScoringCore(PLAYER1, PLAYER2, rng = reference).play_game(server, receiver)
+            else:
+                winner, games = match.simulate_set(server, receiver, 0, None, rng = rng)
+                assert (winner, games) == ScoringCore(PLAYER1, PLAYER2, rng = reference).play_set(server, receiver)
+            assert match.simulate_point(server, receiver, 0, rng = rng) is \
+                   ScoringCore(PLAYER1, PLAYER2, rng = reference).play_point(server, receiver)
+
+
+def test_core_is_built_again_when_the_arguments_change():
+    match = Match(PLAYER1, PLAYER2, None)
+    with contextlib.redirect_stdout(io.StringIO()):
+        match.simulate_game(PLAYER1, PLAYER2, 0, None)
+        core = match.core
+        match.simulate_game(PLAYER1, PLAYER2, 0, None)
+        assert match.core is core
+        match.simulate_game(PLAYER1, PLAYER2, 0, None, display_mode = 2)
+        assert match.core is not core
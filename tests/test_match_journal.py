@@ -0,0 +1,101 @@
+import os
+
+import pytest
+
+import match_journal
+from match_journal import MatchJournal, compact
+from player_database import PlayerDatabase
+
+
+def stats(file_path):
+    # {name: (matches_won, matches_played)} as a new process would load them
+    database = PlayerDatabase(file_path)
+    database.load_players()
+    return {player.name: (player.matches_won, player.matches_played) for player in database.players}
+
+
+def expected(before, results):
+    after = dict(before)
+    for winner, loser in results:
+        after[winner] = (after[winner][0] + 1, after[winner][1] + 1)
+        after[loser] = (after[loser][0], after[loser][1] + 1)
+    return after
+
+
+RESULTS = [("J Sinner", "C Alcaraz"), ("T Fritz", "J Sinner"), ("A Zverev", "D Medvedev")]
+
+
+def test_pending_results_are_replayed(player_file):
+    before = stats(player_file)
+    journal = MatchJournal(player_file)
+    for winner, loser in RESULTS:
+        journal.record(winner, loser)
+    assert journal.pending() == RESULTS
+    assert stats(player_file) == expected(before, RESULTS)
+
+
+def test_compact_folds_the_journal(player_file):
+    before = stats(player_file)
+    journal = MatchJournal(player_file)
+    for winner, loser in RESULTS:
+        journal.record(winner, loser)
+    compact(player_file)
+    assert journal.pending() == []
+    assert stats(player_file) == expected(before, RESULTS)
+    with open(journal.journal_path, encoding = "utf-8") as file:
+        assert file.read() == f"F\t{match_journal.file_hash(player_file)}\n"
+
+
+@pytest.mark.parametrize("failing_replace", [1, 2])
+def test_crash_during_fold(player_file, monkeypatch, failing_replace):
+    # the process dies at the first os.replace (player file not replaced yet) or the second (player file replaced,
+    # journal not restarted). Either way every result is counted exactly once, and compacting again fixes it up
+    before = stats(player_file)
+    journal = MatchJournal(player_file)
+    for winner, loser in RESULTS:
+        journal.record(winner, loser)
+
+    replace = os.replace
+    calls = []
+
+    def crashing_replace(source, target):
+        calls.append(source)
+        if len(calls) == failing_replace:
+            raise KeyboardInterrupt
+        replace(source, target)
+
+    monkeypatch.setattr(match_journal.os, "replace", crashing_replace)
+    with pytest.raises(KeyboardInterrupt):
+        compact(player_file)
+    monkeypatch.setattr(match_journal.os, "replace", replace)
+
+    assert stats(player_file) == expected(before, RESULTS)
+    compact(player_file)
+    assert stats(player_file) == expected(before, RESULTS)
+    assert journal.pending() == []
+
+
+def test_torn_line_is_ignored_and_removed(player_file):
+    before = stats(player_file)
+    journal = MatchJournal(player_file)
+    journal.record(*RESULTS[0])
+    with open(journal.journal_path, "ab") as file:
+        file.write(b"R\tJ Sin") # a write cut off by a crash
+    assert journal.pending() == RESULTS[:1]
+
+    journal.record(*RESULTS[1])
+    assert journal.pending() == RESULTS[:2]
+    with open(journal.journal_path, encoding = "utf-8") as file:
+        assert "J Sin\n" not in file.read()
+    assert stats(player_file) == expected(before, RESULTS[:2])
+
+
+def test_update_file_keeps_results_from_other_processes(player_file):
+    before = stats(player_file)
+    database = PlayerDatabase(player_file)
+    database.load_players()
+    players = {player.name: player for player in database.players}
+    MatchJournal(player_file).record(*RESULTS[0]) # another process
+    database.record_result(players[RESULTS[1][0]], players[RESULTS[1][1]])
+    database.update_file()
+    assert stats(player_file) == expected(before, RESULTS[:2])
@@ -0,0 +1,58 @@
+import time
+import random
+
+import pytest
+
+from match_probability import game_win_probability, match_win_probability, set_win_probability, win_probability_matrix
+from player_database import Tennisplayer
+
+
+def reference_set(hold1, hold2, games_p1, games_p2, player1_serves):
+    # the set played out game by game, the way Match plays it
+    if games_p1 >= 6 and games_p1 - games_p2 >= 2:
+        return 1.0
+    if games_p2 >= 6 and games_p2 - games_p1 >= 2:
+        return 0.0
+    won = hold1 if player1_serves else 1 - hold2
+    if games_p1 == games_p2 == 6:
+        return won
+    return won * reference_set(hold1, hold2, games_p1 + 1, games_p2, not player1_serves) + \
+           (1 - won) * reference_set(hold1, hold2, games_p1, games_p2 + 1, not player1_serves)
+
+
+@pytest.mark.parametrize("p1, p2", [(0.62, 0.62), (0.71, 0.58), (0.35, 0.9)])
+def test_set_and_match_agree_with_playing_out_every_game(p1, p2):
+    hold1, hold2 = game_win_probability(p1), game_win_probability(p2)
+    for games_p1 in range(7):
+        for games_p2 in range(7):
+            if max(games_p1, games_p2) == 6 and abs(games_p1 - games_p2) >= 2:
+                continue
+            for player1_serves in (True, False):
+                assert set_win_probability(p1, p2, games_p1, games_p2, player1_serves) == \
+                       pytest.approx(reference_set(hold1, hold2, games_p1, games_p2, player1_serves), abs = 1e-12)
+
+    for first in (True, False):
+        s = reference_set(hold1, hold2, 0, 0, first)
+        assert match_win_probability(p1, p2, player1_serves_first = first) == pytest.approx(s * s + 2 * s * s * (1 - s))
+        assert match_win_probability(p1, p2, 1, 1, first) == pytest.approx(s)
+    assert match_win_probability(p1, p2) + match_win_probability(p2, p1) == pytest.approx(1)
+
+
+def test_game_probability_closed_form():
+    p = 0.64
+    q = 1 - p
+    expected = p ** 4 * (1 + 4 * q + 10 * q * q) + 20 * p ** 3 * q ** 3 * p * p / (p * p + q * q)
+    assert game_win_probability(p) == pytest.approx(expected)
+
+
+def test_full_matrix_of_50_players_in_milliseconds():
+    rng = random.Random(2)
+    players = [Tennisplayer(f"S Spelare{i}", round(rng.uniform(0.55, 0.72), 4), 0, 0) for i in range(50)]
+    started = time.perf_counter()
+    matrix = win_probability_matrix(players)
+    assert time.perf_counter() - started < 0.25
+    for i in range(50):
+        assert matrix[i][i] == 0.5
+        for j in range(50):
+            assert matrix[i][j] + matrix[j][i] == pytest.approx(1)
+    assert matrix[3][7] == pytest.approx(match_win_probability(players[3].serve_win_prob, players[7].serve_win_prob))
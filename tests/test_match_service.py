@@ -0,0 +1,30 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from match_service import MatchService
+
+
+def test_broken_player_file_is_read_once(player_file, capsys):
+    service = MatchService(player_file, pool = None)
+    players = service.database.players
+    with open(player_file, "a", encoding = "utf-8") as file:
+        file.write("\nX Trasig\ninte ett tal\n1\n2")
+    os.utime(player_file, ns = (0, 1)) # a new mtime even on coarse clocks
+    for _ in range(3):
+        service.refresh()
+    assert service.database.players is players # the players from before are kept
+    assert capsys.readouterr().out.count("Felaktigt format") == 1
+
+
+def test_simulate_answers_with_the_same_outcomes_for_the_same_seed(player_file):
+    async def run():
+        with ThreadPoolExecutor(max_workers = 2) as pool:
+            service = MatchService(player_file, pool, batch_window = 0)
+            first = await service.simulate({"player1": "1", "player2": "c alcaraz", "matches": 50, "seed": 3})
+            second = await service.simulate({"player1": "J Sinner", "player2": "2", "matches": 50, "seed": 3})
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second
+    assert first["player1_wins"] + first["player2_wins"] == 50
@@ -0,0 +1,60 @@
+import pytest
+
+from conftest import HEADER, write_players
+from player_database import Tennisplayer
+from player_store import NAME_SIZE, PlayerStore, export_text, import_text
+
+
+def stats(players):
+    return [(p.name, p.serve_win_prob, p.matches_won, p.matches_played) for p in players]
+
+
+def read_text(file_path):
+    with open(file_path, "r", encoding = "utf-8") as file:
+        lines = file.read().splitlines()
+    return lines[:5], [Tennisplayer(lines[line], float(lines[line + 1]), int(lines[line + 2]), int(lines[line + 3]))
+                       for line in range(5, len(lines) - 3, 4)]
+
+
+def test_text_round_trip_sorts_like_update_file(tmp_path, roster):
+    # 2/3 and 667/1000 are both 0.667 when rounded, the exact rates still put 667/1000 first
+    players = roster + [Tennisplayer("N Djokovic", 0.7, 2, 3), Tennisplayer("H Hurkacz", 0.66, 667, 1000),
+                        Tennisplayer("B Shelton", 0.65, 0, 0)]
+    text_path = str(tmp_path / "playerdata.txt")
+    write_players(text_path, players)
+    with import_text(text_path, str(tmp_path / "players.tps")) as store:
+        assert stats(store) == stats(players)
+        export_text(store, str(tmp_path / "export.txt"))
+
+    header, exported = read_text(str(tmp_path / "export.txt"))
+    assert header == HEADER
+    assert stats(exported) == stats(sorted(players, key = lambda p: p.win_rate(), reverse = True))
+    assert [p.name for p in exported].index("H Hurkacz") < [p.name for p in exported].index("N Djokovic")
+    assert exported[-1].name == "B Shelton"
+
+
+def test_names_up_to_the_record_size(tmp_path):
+    longest = "Å" * (NAME_SIZE // 2) # two bytes per character in utf-8
+    with PlayerStore.create(str(tmp_path / "players.tps"), [Tennisplayer(longest, 0.6, 1, 2)]) as store:
+        assert store.read(0).name == longest
+        assert store.find(longest) == 0
+        with pytest.raises(ValueError):
+            store.append(Tennisplayer(longest + "a", 0.6, 0, 0))
+        assert len(store) == 1
+
+
+def test_append_resizes_the_file_and_survives_reopening(tmp_path, roster):
+    store_path = str(tmp_path / "players.tps")
+    with PlayerStore.create(store_path, roster[:2], "\n".join(HEADER) + "\n") as store:
+        store.find("J Sinner") # builds the name index before the append
+        for player in roster[2:]:
+            store.append(player)
+        assert store.find("T Fritz") == len(roster) - 1
+        store.record_result(store.find("T Fritz"), 0)
+
+    with PlayerStore(store_path) as store:
+        assert len(store) == len(roster)
+        assert store.header_text.splitlines() == HEADER
+        assert stats(store)[:-1] == [(p.name, p.serve_win_prob, p.matches_won, p.matches_played + (p is roster[0]))
+                                     for p in roster[:-1]]
+        assert store.read_stats(len(roster) - 1) == (41, 81)
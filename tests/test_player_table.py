@@ -0,0 +1,39 @@
+from conftest import write_players
+from player_database import PlayerDatabase, Tennisplayer
+from player_store import import_text
+from player_table import PlayerTable
+
+
+def stats(players):
+    return [(p.name, p.serve_win_prob, p.matches_won, p.matches_played, p.win_percentage()) for p in players]
+
+
+def test_from_store_sorts_and_ranks_like_player_database(tmp_path, roster):
+    # ties with C Alcaraz (3/4) and between the two players without matches keep the file order
+    players = roster + [Tennisplayer("N Djokovic", 0.7, 30, 40), Tennisplayer("B Shelton", 0.65, 0, 0),
+                        Tennisplayer("Å Rune", 0.63, 0, 0)]
+    text_path = str(tmp_path / "playerdata.txt")
+    write_players(text_path, players)
+    database = PlayerDatabase(text_path)
+    database.load_players()
+
+    with import_text(text_path, str(tmp_path / "players.tps")) as store:
+        table = PlayerTable.from_store(store)
+    assert stats(table) == stats(database.players)
+    assert stats(table.sorted_players()) == stats(database.sorted_players)
+    ranks = table.ranks()
+    for rank, player in enumerate(database.sorted_players, start = 1):
+        assert ranks[[p.name for p in database.players].index(player.name)] == rank
+        assert database.leaderboard().rank(player) == rank
+
+
+def test_views_write_through_to_the_table(roster):
+    table = PlayerTable.from_players(roster)
+    fritz = table[-1]
+    for _ in range(100):
+        table.record_result(fritz.index, 0)
+    assert (fritz.matches_won, fritz.matches_played) == (140, 180)
+    assert table[0].matches_played == 255
+    assert table.sorted_players()[0] == fritz
+    fritz.matches_played = 560
+    assert fritz.win_rate() == 0.25 and table.ranks()[fritz.index] == len(roster)
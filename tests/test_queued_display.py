@@ -0,0 +1,57 @@
+import io
+import contextlib
+
+import pytest
+
+from player_database import Tennisplayer
+from tennis3 import Match
+
+
+class QueueWindow:
+    # stands in for the tk window, its mainloop reads states until the finished one like render_frame
+    def __init__(self, state_queue):
+        self.state_queue = state_queue
+        self.states = []
+
+    def mainloop(self):
+        while True:
+            state = self.state_queue.get(timeout = 10)
+            self.states.append(state)
+            if state.finished:
+                return
+
+
+class QueueDisplay:
+    def render_from_queue(self, state_queue, frame_rate):
+        self.window = QueueWindow(state_queue)
+
+
+class FailingRng:
+    # gives some numbers and then fails, like a simulation that hits a bug in the middle of the match
+    def __init__(self, numbers):
+        self.numbers = numbers
+
+    def random(self):
+        self.numbers -= 1
+        if self.numbers < 0:
+            raise RuntimeError("slut på slumptal")
+        return 0.3
+
+
+PLAYER1 = Tennisplayer("A Ett", 0.65, 0, 0)
+PLAYER2 = Tennisplayer("B Två", 0.62, 0, 0)
+
+
+def test_queued_match_returns_the_winner():
+    display = QueueDisplay()
+    with contextlib.redirect_stdout(io.StringIO()):
+        winner = Match(PLAYER1, PLAYER2, display).simulate_match_queued(0, display)
+    assert winner in (PLAYER1, PLAYER2)
+    assert display.window.states[-1].finished
+
+
+def test_error_in_the_simulation_stops_the_gui_and_is_raised():
+    display = QueueDisplay()
+    with contextlib.redirect_stdout(io.StringIO()), pytest.raises(RuntimeError, match = "slut på slumptal"):
+        Match(PLAYER1, PLAYER2, display).simulate_match_queued(0, display, rng = FailingRng(25))
+    assert display.window.states[-1].finished
@@ -0,0 +1,25 @@
+import pytest
+
+from player_database import Tennisplayer
+from random_streams import RandomStreams, derive_seed, simulate_matches_parallel
+
+
+PLAYER1 = Tennisplayer("A Ett", 0.67, 0, 0)
+PLAYER2 = Tennisplayer("B Två", 0.63, 0, 0)
+
+
+def test_streams_depend_only_on_seed_and_key():
+    streams = RandomStreams(42)
+    first = [streams.stream(3).random() for _ in range(3)]
+    assert first == [RandomStreams(42).stream(3).random() for _ in range(3)]
+    assert streams.stream(3).random() != streams.stream(4).random()
+    assert RandomStreams(43).stream(3).random() != first[0]
+    assert derive_seed(42, 1, 2) != derive_seed(42, 2, 1)
+
+
+@pytest.mark.parametrize("workers, chunk_size", [(2, 100), (3, 37), (1, 7)])
+def test_parallel_matches_same_for_any_workers(workers, chunk_size):
+    # the winners only depend on the seed, not on how the matches are split over processes
+    serial = simulate_matches_parallel(PLAYER1, PLAYER2, 300, seed = 5, workers = 1, chunk_size = 300)
+    assert simulate_matches_parallel(PLAYER1, PLAYER2, 300, seed = 5, workers = workers, chunk_size = chunk_size) == serial
+    assert simulate_matches_parallel(PLAYER1, PLAYER2, 300, seed = 6, workers = 1) != serial
@@ -0,0 +1,40 @@
+import gzip
+
+import pytest
+
+from player_database import PlayerDatabase
+from result_import import import_results
+
+
+def load(file_path):
+    database = PlayerDatabase(file_path)
+    database.load_players()
+    return database
+
+
+def test_import_counts_results_and_bad_lines(player_file, tmp_path):
+    results = tmp_path / "results.jsonl.gz"
+    with gzip.open(results, "wt", encoding = "utf-8") as file:
+        file.write('{"winner": "J Sinner", "loser": "C Alcaraz"}\n{"winner": "t fritz", "loser": "J Sinner"}\n'
+                   '{"winner": "Okänd", "loser": "J Sinner"}\n{broken\n\n')
+    database = load(player_file)
+    stats = import_results(database, [str(results)])
+    assert (stats.lines, stats.imported, stats.malformed, stats.unknown) == (4, 2, 1, 1)
+    players = {player.name: player for player in load(player_file).players}
+    assert (players["J Sinner"].matches_won, players["J Sinner"].matches_played) == (121, 157)
+
+
+@pytest.mark.parametrize("contents, name", [(b"winner,loser\n\xff\xfe,x\n", "bad.csv"),
+                                            (b"not gzip", "bad.csv.gz"),
+                                            (gzip.compress(b"J Sinner,C Alcaraz\n" * 200)[:60], "cut.csv.gz")])
+def test_unreadable_file_stops_the_import_with_its_path(player_file, tmp_path, contents, name):
+    good = tmp_path / "good.csv"
+    good.write_text("J Sinner,C Alcaraz\n", encoding = "utf-8")
+    bad = tmp_path / name
+    bad.write_bytes(contents)
+    with open(player_file, "rb") as file:
+        before = file.read()
+    with pytest.raises(OSError, match = name):
+        import_results(load(player_file), [str(good), str(bad)])
+    with open(player_file, "rb") as file:
+        assert file.read() == before
@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+from match_format import FORMATS
+from player_database import Tennisplayer
+from scoring import ScoringCore
+
+
+class Result:
+    # keeps the set score of the match, doesn't turn off the fast path
+    def match_won(self, event):
+        self.sets = (event.sets_p1, event.sets_p2)
+
+
+class SetScores(Result):
+    # follows the sets, so the match is played on the event path
+    def __init__(self):
+        self.set_games = []
+
+    def set_won(self, event):
+        self.set_games.append((event.games_p1, event.games_p2))
+
+
+def play(player1, player2, subscriber, seed, match_format):
+    # (winner, set score, next random number) of one match
+    rng = random.Random(seed)
+    winner = ScoringCore(player1, player2, [subscriber], rng = rng, match_format = match_format).play_match()
+    return winner, subscriber.sets, rng.random()
+
+
+@pytest.mark.parametrize("format_name", sorted(FORMATS))
+@pytest.mark.parametrize("serve_win_probs", [(0.64, 0.64), (0.71, 0.58), (0.45, 0.9)])
+def test_fast_path_matches_event_path(format_name, serve_win_probs):
+    # same winner, same set score and the same random numbers used, for every format
+    match_format = FORMATS[format_name]
+    player1 = Tennisplayer("A Ett", serve_win_probs[0], 0, 0)
+    player2 = Tennisplayer("B Två", serve_win_probs[1], 0, 0)
+    for seed in range(60):
+        events = SetScores()
+        assert play(player1, player2, Result(), seed, match_format) == play(player1, player2, events, seed, match_format)
+        assert max(events.sets) == match_format.sets_to_win
+        assert len(events.set_games) == sum(events.sets)
+
+
+def test_subscriber_to_in_match_events_uses_the_event_path():
+    player1 = Tennisplayer("A Ett", 0.65, 0, 0)
+    player2 = Tennisplayer("B Två", 0.62, 0, 0)
+    core = ScoringCore(player1, player2, [SetScores()], rng = random.Random(1))
+    core.play_sets_fast = None # would raise if the fast path were taken
+    core.play_match()
@@ -0,0 +1,27 @@
+import pytest
+
+from season import Season, round_robin_schedule
+
+
+def test_same_result_for_any_number_of_workers(roster):
+    # season s always uses stream (s,), so the distributions only depend on the seed
+    season = Season(roster, round_robin_schedule(len(roster)))
+    serial = season.simulate(250, workers = 1, seed = 4)
+    parallel = season.simulate(250, workers = 2, seed = 4)
+    assert parallel.position_counts == serial.position_counts
+    assert parallel.win_rate_counts == serial.win_rate_counts
+    assert parallel.first_season_won == serial.first_season_won
+
+
+def test_every_player_gets_a_position_every_season(roster):
+    result = Season(roster, round_robin_schedule(len(roster), rounds = 2)).simulate(150, workers = 1, seed = 1)
+    for probabilities in result.position_probabilities().values():
+        assert sum(probabilities.values()) == pytest.approx(1)
+    # every player meets the five others twice
+    assert result.matches_played == [player.matches_played + 10 for player in roster]
+
+
+@pytest.mark.parametrize("seasons", [0, -2])
+def test_rejects_fewer_than_one_season(roster, seasons):
+    with pytest.raises(ValueError):
+        Season(roster, round_robin_schedule(len(roster))).simulate(seasons)
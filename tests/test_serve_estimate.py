@@ -0,0 +1,79 @@
+import gzip
+import json
+import math
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from player_database import PlayerDatabase
+from serve_estimate import CHUNK_SIZE, estimate_serve_probabilities, write_back
+
+
+def write_jsonl(file_path, rows):
+    with open(file_path, "w", encoding = "utf-8") as file:
+        for row in rows:
+            file.write((row if isinstance(row, str) else json.dumps(row)) + "\n")
+
+
+def points(server, receiver, won, played, day = "2024-05-01"):
+    return [{"server": server, "receiver": receiver, "won": int(i < won), "date": day} for i in range(played)]
+
+
+def test_bad_first_jsonl_line_keeps_the_rest(tmp_path, roster):
+    # the columns come from every line of a chunk, not only the first one
+    log = str(tmp_path / "points.jsonl")
+    write_jsonl(log, ["{not json", {"foo": 1}] + points("J Sinner", "C Alcaraz", 70, 100))
+    estimates, served, table = estimate_serve_probabilities(roster, [log], prior_points = 1e-9)
+    assert (table.lines, table.malformed, table.unknown) == (102, 2, 0)
+    assert served[0] == 100
+    assert estimates[0] == pytest.approx(0.7)
+
+
+def test_malformed_csv_lines_are_skipped(tmp_path, roster):
+    log = str(tmp_path / "games.csv.gz")
+    rows = ["server,receiver,points_won,points_played"] + ["J Sinner,C Alcaraz,4,6"] * (CHUNK_SIZE + 10)
+    rows += ["J Sinner,C Alcaraz,7,6", "J Sinner,C Alcaraz,x,6", "J Sinner", "Okänd Spelare,C Alcaraz,4,5", "J Sinner,C Alcaraz,2.5,5"]
+    with gzip.open(log, "wt", encoding = "utf-8") as file:
+        file.write("\n".join(rows))
+    estimates, served, table = estimate_serve_probabilities(roster, [log])
+    assert table.lines == CHUNK_SIZE + 15
+    assert (table.malformed, table.unknown) == (4, 1)
+    assert served[0] == 6 * (CHUNK_SIZE + 10)
+
+
+def test_time_decay_over_a_long_span_stays_finite(tmp_path, roster):
+    # a short half life over decades used to overflow 2 ** (days / half_life)
+    log = str(tmp_path / "points.jsonl")
+    rows = points("J Sinner", "C Alcaraz", 2, 10, "2000-01-01") + points("J Sinner", "C Alcaraz", 8, 10, "2024-12-31")
+    write_jsonl(log, rows)
+    estimates, served, _ = estimate_serve_probabilities(roster, [log], half_life = 7, prior_points = 1e-9)
+    assert np.all(np.isfinite(estimates)) and np.all(np.isfinite(served))
+    assert served[0] == pytest.approx(10)
+    assert estimates[0] == pytest.approx(0.8)
+
+    as_of = date(2024, 12, 31) + timedelta(days = 7)
+    _, served, _ = estimate_serve_probabilities(roster, [log], half_life = 7, as_of = as_of, prior_points = 1e-9)
+    assert served[0] == pytest.approx(5)
+
+
+def test_decay_doesnt_depend_on_line_order(tmp_path, roster):
+    log = str(tmp_path / "points.jsonl")
+    rows = points("J Sinner", "C Alcaraz", 6, 10, "2024-01-01") + points("J Sinner", "C Alcaraz", 3, 10, "2024-03-01")
+    write_jsonl(log, rows)
+    forward = estimate_serve_probabilities(roster, [log], half_life = 30)
+    write_jsonl(log, rows[::-1])
+    backward = estimate_serve_probabilities(roster, [log], half_life = 30)
+    assert forward[0] == pytest.approx(backward[0])
+    assert forward[1] == pytest.approx(backward[1])
+
+
+def test_write_back_skips_estimates_that_arent_finite(player_file):
+    database = PlayerDatabase(player_file)
+    database.load_players()
+    n = len(database.players)
+    estimates = [math.nan] + [0.6] * (n - 1)
+    served = [500] * (n - 1) + [math.inf]
+    changed = write_back(database, estimates, served, save = False)
+    assert [player for player, _ in changed] == database.players[1:n - 1]
+    assert all(math.isfinite(player.serve_win_prob) for player in database.players)
@@ -0,0 +1,25 @@
+import pytest
+
+from tournament import Tournament
+
+
+@pytest.mark.parametrize("tournament_format", ["round_robin", "knockout"])
+def test_same_result_for_any_number_of_workers(roster, tournament_format):
+    # the chunks have fixed streams, so the finishing positions only depend on the seed
+    tournament = Tournament(roster, tournament_format)
+    serial = tournament.simulate(250, workers = 1, seed = 9)
+    assert tournament.simulate(250, workers = 2, seed = 9).counts == serial.counts
+    assert tournament.simulate(250, workers = 3, seed = 9).counts == serial.counts
+
+
+@pytest.mark.parametrize("tournament_format", ["round_robin", "knockout"])
+def test_every_player_finishes_every_event(roster, tournament_format):
+    result = Tournament(roster, tournament_format).simulate(120, workers = 1, seed = 1)
+    for probabilities in result.probabilities().values():
+        assert sum(probabilities.values()) == pytest.approx(1)
+
+
+@pytest.mark.parametrize("repetitions", [0, -3])
+def test_rejects_fewer_than_one_repetition(roster, repetitions):
+    with pytest.raises(ValueError):
+        Tournament(roster).simulate(repetitions)
@@ -0,0 +1,152 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from match_probability import win_probability_matrix
+from random_streams import RandomStreams
+
+
+CHUNK_SIZE = 100 # events per pool task, fixed so results only depend on the seed and not on the number of workers
+
+
+def knockout_positions(n_players):
+    # finishing positions in a knockout: 1 for the winner, 2 for the final loser, 3 for the semifinal losers, 5, 9, ...
+    positions = [1, 2]
+    while positions[-1] < n_players:
+        positions.append(positions[-1] * 2 - 1)
+    return [position for position in positions if position <= n_players]
+
+
+def seeded_bracket(n_players):
+    # draw for a seeded knockout, seed 1 meets the lowest seed and seed 1 and 2 can only meet in the final
+    # seeds higher than n_players are byes (None)
+    seeds = [1]
+    while len(seeds) < n_players:
+        size = len(seeds) * 2
+        seeds = [seed for pair in seeds for seed in (pair, size + 1 - pair)]
+    return [seed - 1 if seed <= n_players else None for seed in seeds]
+
+
+def play_round_robin(probabilities, rng):
+    # plays one round robin, returns finishing position of every player (1 = winner)
+    # players with the same number of wins are ordered by drawing lots
+    n = len(probabilities)
+    wins = [0] * n
+    for i in range(n):
+        row = probabilities[i]
+        for j in range(i + 1, n):
+            if rng.random() < row[j]:
+                wins[i] += 1
+            else:
+                wins[j] += 1
+
+    order = sorted(range(n), key = lambda i: (-wins[i], rng.random()))
+    positions = [0] * n
+    for position, i in enumerate(order, start = 1):
+        positions[i] = position
+    return positions
+
+
+def play_knockout(probabilities, bracket, rng):
+    # plays one seeded knockout, returns finishing position of every player (1 = winner, 2 = final, 3 = semifinal ...)
+    positions = [0] * len(probabilities)
+    remaining = bracket
+    while len(remaining) > 1:
+        next_round = []
+        eliminated_position = len(remaining) // 2 + 1
+        for player1, player2 in zip(remaining[::2], remaining[1::2]):
+            if player1 is None or player2 is None: # bye
+                next_round.append(player2 if player1 is None else player1)
+                continue
+            if rng.random() < probabilities[player1][player2]:
+                winner, loser = player1, player2
+            else:
+                winner, loser = player2, player1
+            positions[loser] = eliminated_position
+            next_round.append(winner)
+        remaining = next_round
+    positions[remaining[0]] = 1
+    return positions
+
+
+def play_events(tournament_format, probabilities, repetitions, seed, chunk):
+    # plays repetitions events with the random stream of the chunk and counts finishing positions, runs in the worker processes
+    rng = RandomStreams(seed).stream(chunk)
+    n = len(probabilities)
+    counts = [[0] * (n + 1) for _ in range(n)]
+    bracket = seeded_bracket(n)
+
+    for _ in range(repetitions):
+        if tournament_format == "knockout":
+            positions = play_knockout(probabilities, bracket, rng)
+        else:
+            positions = play_round_robin(probabilities, rng)
+        for player, position in enumerate(positions):
+            counts[player][position] += 1
+    return counts
+
+
+class TournamentResult:
+    # class for storing how often every player finished in every position
+    def __init__(self, players, tournament_format, counts, repetitions):
+        self.players = players
+        self.tournament_format = tournament_format
+        self.counts = counts # counts[i][position] for players[i]
+        self.repetitions = repetitions
+
+    def positions(self):
+        # the finishing positions that can occur in this format
+        if self.tournament_format == "knockout":
+            return knockout_positions(len(self.players))
+        return list(range(1, len(self.players) + 1))
+
+    def probabilities(self):
+        # {player name: {position: probability}}
+        return {player.name: {position: self.counts[i][position] / self.repetitions for position in self.positions()}
+                for i, player in enumerate(self.players)}
+
+    def display(self, top_positions = 3):
+        # presents the players with their probability of finishing in the first positions
+        positions = self.positions()[:top_positions]
+        header = "Placering Namn                    " + "".join(f"{'Plats ' + str(position):>10}" for position in positions)
+        print("\n" + len(header)*"=" + "\n" + header + "\n" + len(header)*"=")
+        for i, player in enumerate(self.players, start = 1):
+            shares = "".join(f"{self.counts[i - 1][position] / self.repetitions:>10.3f}" for position in positions)
+            print(f"{i:^9} {player.name:24}{shares}")
+
+
+class Tournament:
+    """ class that repeats a round robin or a seeded knockout between the players many times. The events are spread over
+        a process pool in chunks and every match winner is drawn from the exact probability in match_probability, which
+        gives the same outcome distribution as playing the match with Match.simulate_match"""
+    def __init__(self, sorted_players, tournament_format = "round_robin", cache = None):
+        # sorted_players decides the seeding in a knockout (PlayerDatabase.sorted_players), cache is an optional
+        # ProbabilityCache the win probabilities are read from
+        if tournament_format not in ("round_robin", "knockout"):
+            raise ValueError(f"Okänt turneringsformat: {tournament_format}")
+        self.players = list(sorted_players)
+        self.tournament_format = tournament_format
+        self.cache = cache
+
+    def simulate(self, repetitions, workers = None, seed = None):
+        # plays the event repetitions times and returns a TournamentResult
+        if repetitions < 1:
+            raise ValueError("Antalet upprepningar måste vara minst 1.")
+        seed = RandomStreams(seed).seed
+        probabilities = win_probability_matrix(self.players, self.cache)
+        chunks = [(self.tournament_format, probabilities, min(CHUNK_SIZE, repetitions - start), seed, chunk)
+                  for chunk, start in enumerate(range(0, repetitions, CHUNK_SIZE))]
+
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(chunks) == 1:
+            results = [play_events(*chunk) for chunk in chunks]
+        else:
+            with ProcessPoolExecutor(max_workers = workers) as pool:
+                results = list(pool.map(play_events, *zip(*chunks)))
+
+        n = len(self.players)
+        counts = [[0] * (n + 1) for _ in range(n)]
+        for chunk_counts in results:
+            for i in range(n):
+                for position, count in enumerate(chunk_counts[i]):
+                    counts[i][position] += count
+        return TournamentResult(self.players, self.tournament_format, counts, repetitions)